@@ -0,0 +1,93 @@
+"""
+Бенчмарк сборки сообщений: пропускная способность экранирования
+и разбиения длинных текстов на части по 4096 символов.
+
+Запуск:
+    python benchmarks/bench_message_builder.py [--size-kb 1024] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.message_builder import MessageBuilder, escape_html, escape_markdown, split_message
+
+
+def _escape_by_concatenation(text: str) -> str:
+    """Прежняя реализация: посимвольная конкатенация (для сравнения)"""
+    escape_chars = r'_*[]()~`>#+-=|{}.!'
+    result = ""
+    for char in text:
+        if char in escape_chars:
+            result += '\\' + char
+        else:
+            result += char
+    return result
+
+
+def _escape_by_translate(text: str) -> str:
+    """str.translate с расширяющей таблицей (для сравнения)"""
+    return text.translate(_TRANSLATE_TABLE)
+
+
+_TRANSLATE_TABLE = str.maketrans({char: "\\" + char for char in "\\_*[]()~`>#+-=|{}.!"})
+
+
+def _sample_text(size: int) -> str:
+    """Текст записей с разметкой, кириллицей, эмодзи и короткими строками"""
+    line = "Заметка #работа: купить *хлеб* и [молоко] (до 18:00) - срочно! 📝 snake_case.\n"
+    return (line * (size // len(line) + 1))[:size]
+
+
+def _measure(func, text: str, repeat: int) -> float:
+    """Лучшее время из repeat запусков, секунды"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _build_listing(text: str):
+    builder = MessageBuilder(parse_mode='Markdown')
+    for line in text.split("\n"):
+        builder.add(f"• {builder.escape(line)}")
+    return builder.chunks()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, default=1024, help="Размер входного текста, КБ")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов на каждый замер")
+    args = parser.parse_args()
+
+    text = _sample_text(args.size_kb * 1024)
+    megabytes = len(text.encode("utf-8")) / 1024 / 1024
+
+    cases = [
+        ("escape_markdown v1", lambda t: escape_markdown(t)),
+        ("escape_markdown v2", lambda t: escape_markdown(t, version=2)),
+        ("escape_html", escape_html),
+        ("str.translate v2 (для сравнения)", _escape_by_translate),
+        ("split_message 4096", split_message),
+        ("MessageBuilder listing", _build_listing),
+    ]
+    # Квадратичная реализация на больших входах слишком медленная - меряем на 1/16 текста
+    legacy_text = text[:len(text) // 16]
+    legacy_mb = len(legacy_text.encode("utf-8")) / 1024 / 1024
+
+    print(f"Вход: {megabytes:.2f} МБ, {len(text)} символов, лучший из {args.repeat} запусков")
+    for name, func in cases:
+        seconds = _measure(func, text, args.repeat)
+        print(f"{name:<34} {seconds * 1000:9.2f} мс  {megabytes / seconds:9.1f} МБ/с")
+
+    seconds = _measure(_escape_by_concatenation, legacy_text, args.repeat)
+    print(f"{'посимвольная конкатенация (1/16)':<34} {seconds * 1000:9.2f} мс  {legacy_mb / seconds:9.1f} МБ/с")
+
+
+if __name__ == "__main__":
+    main()
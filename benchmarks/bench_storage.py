@@ -0,0 +1,296 @@
+"""
+Бенчмарк хранилища: NoteManager и QuestionManager на синтетических
+данных от 10³ до 10⁶ записей.
+
+Записи распределены по пользователям неравномерно (у немногих активных
+пользователей - большая часть записей), как в реальном боте. Замеряются
+загрузка хранилища, добавление/изменение/удаление записи, последние
+записи, поиск и статистика (так, как их делают команды /search и /stats),
+обход напоминаний и операции с вопросами GlassPen.
+
+Результаты сохраняются в JSON ({бэкенд: {размер: {операция: времена}}}),
+чтобы сравнивать коммиты и будущие хранилища: --compare печатает
+отношение времён к сохранённому ранее отчёту. Новое хранилище
+добавляется функцией в BACKENDS.
+
+Запуск:
+    python benchmarks/bench_storage.py [--sizes 1000,10000,100000] [--backends json]
+        [--repeat 3] [--write-ops 5] [--read-ops 200] [--json out.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.models import Note
+from src.core.note_manager import NoteManager
+from src.core.question_manager import QuestionManager
+from src.core.reminders import ReminderScheduler
+
+WORDS = ["молоко", "отчёт", "встреча", "книга", "идея", "звонок", "план", "код", "спорт", "врач",
+         "проект", "отпуск", "ремонт", "подарок", "лекция", "рецепт", "бюджет", "фильм"]
+TAGS = ["#дом", "#работа", "#покупки", "#идеи", "#здоровье", "#учёба", "#семья"]
+CATEGORIES = ["Без категории", "Работа", "Дом", "Покупки", "Идеи", "Здоровье"]
+
+# Доля записей с признаками (как в данных живого бота)
+IMPORTANT_SHARE = 0.05
+REMINDER_SHARE = 0.02
+PENDING_SHARE = 0.3
+
+# Записей на пользователя в среднем
+NOTES_PER_USER = 100
+
+# Бэкенд: директория с данными в формате JSON-хранилища → (NoteManager, QuestionManager)
+Backend = Callable[[str], Tuple[Any, Any]]
+
+
+def _json_backend(workdir: str) -> Tuple[NoteManager, QuestionManager]:
+    """Текущее хранилище: notes.json и glasspen_questions.json"""
+    return NoteManager(os.path.join(workdir, "notes.json")), QuestionManager(workdir)
+
+
+BACKENDS: Dict[str, Backend] = {
+    'json': _json_backend,
+}
+
+
+# --- Данные ---
+
+def generate_dataset(workdir: str, size: int, seed: int) -> Dict[str, Any]:
+    """
+    Пишет в workdir notes.json и glasspen_questions.json.
+
+    Returns:
+        Описание набора: пользователи (по убыванию активности), числа записей и вопросов
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    users = [100_000 + index for index in range(max(10, size // NOTES_PER_USER))]
+    # Активность пользователей по закону Ципфа
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(users))]
+
+    notes: Dict[str, List[Dict[str, Any]]] = {}
+    for user_id in rng.choices(users, weights, k=size):
+        created = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        note = {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "user_id": user_id,
+            "text": f"{' '.join(rng.sample(WORDS, 4)).capitalize()} {rng.choice(TAGS)}",
+            "created_at": created.isoformat(),
+            "updated_at": created.isoformat(),
+            "category": rng.choice(CATEGORIES),
+            "tags": [rng.choice(TAGS)],
+            "is_important": rng.random() < IMPORTANT_SHARE,
+        }
+        if rng.random() < REMINDER_SHARE:
+            note["reminder_at"] = (now + timedelta(minutes=rng.randrange(-600, 60 * 24 * 30))).isoformat()
+        notes.setdefault(str(user_id), []).append(note)
+
+    questions = []
+    question_count = max(100, size // 10)
+    for index in range(question_count):
+        user_id = rng.choice(users)
+        created = now - timedelta(seconds=rng.randrange(90 * 24 * 3600))
+        questions.append({
+            "id": f"q{index}_{user_id}",
+            "user_id": user_id,
+            "username": f"user{user_id}",
+            "first_name": "Читатель",
+            "question_text": f"Вопрос про {rng.choice(WORDS)}?",
+            "created_at": created.replace(tzinfo=None).isoformat(),
+            "status": "new" if rng.random() < PENDING_SHARE else "answered",
+            "admin_comment": "",
+            "answered_at": "",
+        })
+
+    with open(os.path.join(workdir, "notes.json"), "w", encoding="utf-8") as f:
+        json.dump(notes, f, ensure_ascii=False)
+    with open(os.path.join(workdir, "glasspen_questions.json"), "w", encoding="utf-8") as f:
+        json.dump(questions, f, ensure_ascii=False)
+
+    ranked = sorted(users, key=lambda user_id: -len(notes.get(str(user_id), [])))
+    return {'users': ranked, 'notes': size, 'questions': question_count}
+
+
+# --- Замеры ---
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'n': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 4),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 4),
+        'min_ms': round(ordered[0] * 1000, 4),
+        'max_ms': round(ordered[-1] * 1000, 4),
+    }
+
+
+def _measure(func: Callable[..., Any], args_list: List[tuple]) -> Dict[str, float]:
+    """Время каждого вызова func(*args)"""
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - started)
+    return _summary(samples)
+
+
+def _stats(manager, user_id: int) -> Dict[str, Any]:
+    """Статистика пользователя так, как её считает /stats"""
+    notes = manager.get_all_notes(user_id)
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    return {
+        'total': len(notes),
+        'categories': Counter(note.category for note in notes).most_common(1),
+        'important': sum(1 for note in notes if note.is_important),
+        'tags': Counter(tag for note in notes for tag in note.tags).most_common(3),
+        'week': sum(1 for note in notes if note.created_at > week_ago),
+    }
+
+
+def _search(manager, user_id: int, query: str):
+    """Первая страница поиска так, как её строит /search"""
+    return manager.get_notes_from_cursor(user_id, None, 10, match=lambda note: query in note.text.lower())
+
+
+def bench_size(backend: Backend, size: int, args) -> Dict[str, Any]:
+    """Все замеры для одного размера набора"""
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        dataset = generate_dataset(workdir, size, args.seed)
+        notes, questions = backend(workdir)
+        users = dataset['users']
+        # Запросы чаще идут от активных пользователей: выбираем с тем же перекосом
+        read_users = rng.choices(users, [1 / (rank + 1) ** 0.8 for rank in range(len(users))], k=args.read_ops)
+        write_users = read_users[:args.write_ops]
+
+        results: Dict[str, Any] = {'dataset': {key: value for key, value in dataset.items() if key != 'users'}}
+        results['load'] = _measure(notes._load_all_notes, [()] * args.repeat)
+
+        added = [Note(user_id=user_id, text=f"Бенчмарк {index} {rng.choice(TAGS)}")
+                 for index, user_id in enumerate(write_users)]
+        results['add_note'] = _measure(notes.add_note, [(note,) for note in added])
+        results['update_note'] = _measure(
+            notes.update_note, [(note.user_id, note.id, {'text': note.text + " изм."}) for note in added]
+        )
+        results['delete_note'] = _measure(notes.delete_note, [(note.user_id, note.id) for note in added])
+
+        results['recent'] = _measure(notes.get_recent_notes, [(user_id, 10) for user_id in read_users])
+        results['search'] = _measure(_search, [(notes, user_id, rng.choice(WORDS)) for user_id in read_users])
+        results['stats'] = _measure(_stats, [(notes, user_id) for user_id in read_users])
+        results['top_user_stats'] = _measure(_stats, [(notes, users[0])] * args.repeat)
+
+        results['reminder_scan'] = _measure(notes.get_notes_with_reminders, [()] * args.repeat)
+        scheduler = ReminderScheduler(notes)
+        results['reminder_heap_build'] = _measure(scheduler.load, [()] * args.repeat)
+
+        results['save_question'] = _measure(
+            questions.save_question,
+            [(user_id, f"user{user_id}", "Читатель", "Вопрос из бенчмарка?") for user_id in write_users]
+        )
+        results['get_pending_questions'] = _measure(questions.get_pending_questions, [()] * args.repeat)
+        results['pending_page'] = _measure(questions.get_pending_page, [(None, 10)] * args.read_ops)
+    return results
+
+
+# --- Отчёт ---
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_results(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    for backend, sizes in report['results'].items():
+        for size, ops in sizes.items():
+            dataset = ops['dataset']
+            print(f"\n[{backend}] записей: {dataset['notes']}, вопросов: {dataset['questions']}")
+            header = f"{'операция':<24}{'n':>6}{'среднее, мс':>14}{'p95, мс':>12}"
+            print(header + (f"{'к базе':>10}" if baseline else ""))
+            base_ops = (baseline or {}).get('results', {}).get(backend, {}).get(size, {})
+            for name, stats in ops.items():
+                if name == 'dataset':
+                    continue
+                line = f"{name:<24}{stats['n']:>6}{stats['mean_ms']:>14.3f}{stats['p95_ms']:>12.3f}"
+                base = base_ops.get(name)
+                if base and base['mean_ms']:
+                    line += f"{stats['mean_ms'] / base['mean_ms']:>9.2f}x"
+                print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк хранилища записей и вопросов")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Размеры наборов через запятую (10⁶ - 1000000, нужно несколько ГБ памяти)")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Хранилища через запятую")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов для тяжёлых операций (загрузка, обходы)")
+    parser.add_argument("--write-ops", type=int, default=5, help="Операций записи на размер")
+    parser.add_argument("--read-ops", type=int, default=200, help="Операций чтения на размер")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно генератора данных")
+    parser.add_argument("--json", help="Сохранить отчёт в JSON-файл")
+    parser.add_argument("--compare", help="Сравнить с ранее сохранённым JSON-отчётом")
+    args = parser.parse_args()
+
+    # Менеджеры логируют каждую запись - в замер это не должно попадать
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("src").setLevel(logging.WARNING)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    backends = [name.strip() for name in args.backends.split(",")]
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        parser.error(f"неизвестные хранилища: {', '.join(unknown)}; доступны: {', '.join(BACKENDS)}")
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'write_ops': args.write_ops,
+            'read_ops': args.read_ops,
+        },
+        'results': {},
+    }
+    for backend in backends:
+        report['results'][backend] = {}
+        for size in sizes:
+            print(f"[{backend}] {size} записей...", file=sys.stderr)
+            report['results'][backend][str(size)] = bench_size(BACKENDS[backend], size, args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"База: коммит {baseline['meta'].get('commit')}, {baseline['meta'].get('timestamp')}")
+    _print_results(report, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nОтчёт сохранён: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""
+Нагрузочный стенд: настоящие HelperBot и GlasspenBot с их обработчиками,
+но вместо Telegram - поддельный Bot API внутри процесса.
+
+Много пользователей одновременно присылают смесь действий (/new с текстом
+записи, /list, листание страниц кнопками, /search, /stats, вопрос автору
+в GlassPen и /questions администратора). Обновления проходят весь путь
+через application.process_update: фильтры, ConversationHandler, метрики
+обработчиков, хранилище. Ответы бота принимает FakeBotAPI; последняя
+inline-клавиатура каждого чата запоминается, чтобы листание нажимало
+настоящие кнопки.
+
+Записи, вопросы и настройки пишутся во временную директорию.
+
+Запуск:
+    python benchmarks/load_harness.py [--users 200] [--updates 5000] [--concurrency 50]
+        [--mix new=30,list=15,page=15,search=10,stats=5,question=20,questions=5]
+        [--notes-per-user 30] [--api-latency-ms 0] [--tracemalloc] [--json report.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram import Update
+from telegram.request import BaseRequest, RequestData
+
+from src.bots.glasspen_bot.bot import GlasspenBot
+from src.bots.glasspen_bot.callbacks import callbacks as glasspen_callbacks
+from src.bots.helper_bot.bot import HelperBot
+from src.bots.helper_bot.callbacks import callbacks as helper_callbacks
+from src.core.models import Note
+from src.core.note_manager import note_manager
+from src.core.question_manager import question_manager
+from src.core.user_settings import user_settings
+
+DEFAULT_MIX = "new=30,list=15,page=15,search=10,stats=5,question=20,questions=5"
+
+# Действия и бот, которому они адресованы
+ACTIONS = {
+    'new': 'helper',
+    'list': 'helper',
+    'page': 'helper',
+    'search': 'helper',
+    'stats': 'helper',
+    'question': 'glasspen',
+    'questions': 'glasspen',
+}
+
+# Кнопки листания списка записей
+PAGE_ROUTES = {'list_older', 'list_newer', 'page'}
+
+ADMIN_ID = 1
+FIRST_USER_ID = 1000
+
+WORDS = ["молоко", "отчёт", "встреча", "книга", "идея", "звонок", "план", "код", "спорт", "врач"]
+TAGS = ["#дом", "#работа", "#покупки", "#идеи", "#здоровье"]
+
+
+class FakeBotAPI(BaseRequest):
+    """
+    Bot API внутри процесса: отвечает на запросы бота так, как ответил бы
+    Telegram, и считает вызовы по методам. Сети нет - в замер попадает
+    только работа бота (и задержка api_latency, если задана).
+    """
+
+    def __init__(self, bot_id: int, username: str, api_latency: float = 0.0):
+        self.bot_user = {"id": bot_id, "is_bot": True, "first_name": username, "username": username}
+        self.api_latency = api_latency
+        self.calls: Dict[str, int] = defaultdict(int)
+        # chat_id → последняя inline-клавиатура (для нажатия кнопок)
+        self.keyboards: Dict[int, List[str]] = {}
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return 5.0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=BaseRequest.DEFAULT_NONE, write_timeout=BaseRequest.DEFAULT_NONE,
+                         connect_timeout=BaseRequest.DEFAULT_NONE,
+                         pool_timeout=BaseRequest.DEFAULT_NONE) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] += 1
+        params = request_data.parameters if request_data else {}
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+        if api_method == "getMe":
+            result: Any = {**self.bot_user, "can_join_groups": False,
+                           "can_read_all_group_messages": False, "supports_inline_queries": False}
+        elif api_method in ("sendMessage", "editMessageText"):
+            result = self._message(params)
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode("utf-8")
+
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Сообщение бота в ответ на sendMessage/editMessageText"""
+        chat_id = int(params.get("chat_id", 0))
+        markup = params.get("reply_markup") or {}
+        rows = markup.get("inline_keyboard")
+        if rows is not None:
+            self.keyboards[chat_id] = [button["callback_data"] for row in rows for button in row
+                                       if "callback_data" in button]
+        message = {
+            "message_id": params.get("message_id") or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": self.bot_user,
+            "text": params.get("text", ""),
+        }
+        if rows is not None:
+            message["reply_markup"] = markup
+        return message
+
+
+class UpdateFactory:
+    """Обновления Telegram от имени симулированных пользователей"""
+
+    def __init__(self):
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1_000_000)
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+    def message(self, bot, user_id: int, text: str) -> Update:
+        data = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            data["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return Update.de_json({"update_id": next(self._update_ids), "message": data}, bot)
+
+    def callback(self, bot, user_id: int, callback_data: str, api: FakeBotAPI) -> Update:
+        update_id = next(self._update_ids)
+        data = {
+            "id": str(update_id),
+            "from": self._user(user_id),
+            "chat_instance": str(user_id),
+            "data": callback_data,
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": api.bot_user,
+                "text": "…",
+            },
+        }
+        return Update.de_json({"update_id": update_id, "callback_query": data}, bot)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Разбирает смесь действий "new=30,list=15,..." в веса"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise ValueError(f"неизвестное действие {name!r}, доступны: {', '.join(ACTIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadHarness:
+    """Оба бота на поддельном API и прогон смеси действий"""
+
+    def __init__(self, users: int, concurrency: int, api_latency: float, seed: int):
+        self.users = [FIRST_USER_ID + index for index in range(users)]
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self.updates = UpdateFactory()
+        self.apis = {
+            'helper': FakeBotAPI(bot_id=10, username="helper_load_bot", api_latency=api_latency),
+            'glasspen': FakeBotAPI(bot_id=20, username="glasspen_load_bot", api_latency=api_latency),
+        }
+        self.bots = {
+            'helper': HelperBot("load:helper", {'admin_ids': [ADMIN_ID]}),
+            'glasspen': GlasspenBot("load:glasspen", {'admin_ids': [ADMIN_ID], 'admin_chat_id': ADMIN_ID}),
+        }
+        for name, bot in self.bots.items():
+            bot.request_factory = lambda api=self.apis[name]: api
+            bot.use_polling = False
+
+        # Задержки обработки по действиям, секунды
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.processed = 0
+
+    async def start(self):
+        for bot in self.bots.values():
+            await bot.start()
+
+    async def stop(self):
+        for bot in self.bots.values():
+            await bot.stop()
+
+    async def _process(self, bot_name: str, update: Update):
+        await self.bots[bot_name].application.process_update(update)
+        self.processed += 1
+
+    def handler_errors(self) -> int:
+        """Ошибки обработчиков, дошедшие до обработчика ошибок ботов"""
+        return sum(bot.metrics['errors'] for bot in self.bots.values())
+
+    async def run_action(self, action: str, user_id: int):
+        """Одно действие пользователя (одно или два обновления); замеряется целиком"""
+        bot_name = ACTIONS[action]
+        bot = self.bots[bot_name].application.bot
+        api = self.apis[bot_name]
+        started = time.perf_counter()
+
+        if action == 'new':
+            await self._process(bot_name, self.updates.message(bot, user_id, "/new"))
+            words = " ".join(self.random.sample(WORDS, 3))
+            text = f"{words.capitalize()} {self.random.choice(TAGS)}"
+            await self._process(bot_name, self.updates.message(bot, user_id, text))
+        elif action == 'list':
+            await self._process(bot_name, self.updates.message(bot, user_id, "/list"))
+        elif action == 'page':
+            # Если на экране нет кнопок листания, пользователь сначала открывает список
+            buttons = self._page_buttons(api, user_id)
+            if not buttons:
+                await self._process(bot_name, self.updates.message(bot, user_id, "/list"))
+                buttons = self._page_buttons(api, user_id)
+            if buttons:
+                update = self.updates.callback(bot, user_id, self.random.choice(buttons), api)
+                await self._process(bot_name, update)
+        elif action == 'search':
+            command = f"/search {self.random.choice(WORDS)}"
+            await self._process(bot_name, self.updates.message(bot, user_id, command))
+        elif action == 'stats':
+            await self._process(bot_name, self.updates.message(bot, user_id, "/stats"))
+        elif action == 'question':
+            entry = glasspen_callbacks.pack('ask_question')
+            await self._process(bot_name, self.updates.callback(bot, user_id, entry, api))
+            text = f"Когда выйдет новая глава про {self.random.choice(WORDS)}?"
+            await self._process(bot_name, self.updates.message(bot, user_id, text))
+        elif action == 'questions':
+            await self._process(bot_name, self.updates.message(bot, ADMIN_ID, "/questions"))
+
+        self.latencies[action].append(time.perf_counter() - started)
+
+    @staticmethod
+    def _page_buttons(api: FakeBotAPI, user_id: int) -> List[str]:
+        """Кнопки листания на последней клавиатуре чата"""
+        buttons = []
+        for data in api.keyboards.get(user_id, []):
+            try:
+                resolved = helper_callbacks.resolve(data)
+            except ValueError:
+                continue
+            if resolved is not None and resolved[0].name in PAGE_ROUTES:
+                buttons.append(data)
+        return buttons
+
+    async def run(self, total: int, mix: Dict[str, float]) -> float:
+        """
+        Прогоняет total действий. Пользователи поделены между воркерами,
+        поэтому действия одного пользователя идут по порядку, как в чате.
+        """
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        workers = min(self.concurrency, len(self.users))
+        per_worker = [total // workers + (1 if index < total % workers else 0) for index in range(workers)]
+
+        async def worker(index: int):
+            own_users = self.users[index::workers]
+            for _ in range(per_worker[index]):
+                action = self.random.choices(names, weights)[0]
+                await self.run_action(action, self.random.choice(own_users))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index) for index in range(workers)))
+        return time.perf_counter() - started
+
+
+def _seed_notes(path: str, users: List[int], per_user: int, seed: int):
+    """Стартовые записи пользователей (чтобы у /list были страницы) одним файлом"""
+    rng = random.Random(seed)
+    data = {}
+    for user_id in users:
+        notes = []
+        for index in range(per_user):
+            words = " ".join(rng.sample(WORDS, 3))
+            note = Note(user_id=user_id, text=f"{words} {index} {rng.choice(TAGS)}")
+            notes.append(note.to_dict())
+        data[str(user_id)] = notes
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max в миллисекундах"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'count': len(ordered),
+        'p50_ms': round(pick(0.50), 3),
+        'p95_ms': round(pick(0.95), 3),
+        'p99_ms': round(pick(0.99), 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss в Linux - килобайты, в macOS - байты
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def main_async(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        notes_path = os.path.join(tmp, "notes.json")
+        users = [FIRST_USER_ID + index for index in range(args.users)]
+        _seed_notes(notes_path, users, args.notes_per_user, args.seed)
+        note_manager.use_storage(notes_path)
+        user_settings.use_storage(os.path.join(tmp, "user_settings.json"))
+        question_manager.use_storage(tmp)
+
+        harness = LoadHarness(args.users, args.concurrency, args.api_latency_ms / 1000, args.seed)
+        await harness.start()
+        try:
+            if args.warmup:
+                await harness.run(args.warmup, mix)
+                harness.latencies.clear()
+                harness.processed = 0
+            errors_before = harness.handler_errors()
+
+            if args.tracemalloc:
+                tracemalloc.start()
+            elapsed = await harness.run(args.updates, mix)
+            traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+            tracemalloc.stop()
+            errors = harness.handler_errors() - errors_before
+        finally:
+            await harness.stop()
+
+        all_latencies = [value for values in harness.latencies.values() for value in values]
+        report = {
+            'users': args.users,
+            'concurrency': args.concurrency,
+            'actions': len(all_latencies),
+            'updates': harness.processed,
+            'errors': errors,
+            'elapsed_s': round(elapsed, 3),
+            'updates_per_s': round(harness.processed / elapsed, 1) if elapsed else 0.0,
+            'latency': _percentiles(all_latencies),
+            'latency_by_action': {action: _percentiles(values)
+                                  for action, values in sorted(harness.latencies.items())},
+            'api_calls': {name: dict(api.calls) for name, api in harness.apis.items()},
+            'max_rss_mb': round(_max_rss_mb(), 1),
+            'notes_stored': sum(len(notes) for notes in note_manager._notes_cache.values()),
+        }
+        if traced_peak is not None:
+            report['traced_peak_mb'] = round(traced_peak / (1024 * 1024), 1)
+        return report
+
+
+def _print_report(report: Dict[str, Any]):
+    print(f"Пользователей: {report['users']}, параллельно: {report['concurrency']}")
+    print(f"Действий: {report['actions']}, обновлений: {report['updates']}, ошибок: {report['errors']}")
+    print(f"Время: {report['elapsed_s']} с, {report['updates_per_s']} обновлений/с")
+    print(f"Память: пик RSS {report['max_rss_mb']} МБ"
+          + (f", пик tracemalloc {report['traced_peak_mb']} МБ" if 'traced_peak_mb' in report else ""))
+    print()
+    print(f"{'действие':<12}{'число':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    rows = list(report['latency_by_action'].items()) + [('всего', report['latency'])]
+    for action, stats in rows:
+        print(f"{action:<12}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный стенд ботов на поддельном Bot API")
+    parser.add_argument("--users", type=int, default=200, help="Число симулированных пользователей")
+    parser.add_argument("--updates", type=int, default=5000, help="Число действий в замере")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременно активных пользователей")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Веса действий: имя=вес через запятую")
+    parser.add_argument("--notes-per-user", type=int, default=30, help="Записей у пользователя до начала")
+    parser.add_argument("--warmup", type=int, default=200, help="Действий до начала замера")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="Задержка ответа Bot API")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно генератора действий")
+    parser.add_argument("--tracemalloc", action="store_true", help="Считать пик выделенной памяти (медленнее)")
+    parser.add_argument("--json", help="Сохранить отчёт в JSON-файл")
+    parser.add_argument("--log-level", default="WARNING", help="Уровень логов ботов")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+    report = asyncio.run(main_async(args))
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nОтчёт сохранён: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
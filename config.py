@@ -38,20 +38,71 @@ class DatabaseConfig:
     url: str = "sqlite:///data/bots.db"
     echo: bool = False
 
+@dataclass
+class MetricsConfig:
+    """Конфигурация экспорта метрик (OpenMetrics)"""
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 9464
+
+@dataclass
+class LoopMonitorConfig:
+    """Конфигурация монитора задержек event loop"""
+    enabled: bool = True
+    interval_ms: float = 10.0
+    threshold_ms: float = 100.0
+
+@dataclass
+class PersistenceConfig:
+    """Конфигурация хранения состояния ботов (user_data, диалоги)"""
+    enabled: bool = True
+    directory: str = "data/state"
+    update_interval: float = 5.0
+
+@dataclass
+class LoggingConfig:
+    """Конфигурация записи логов"""
+    async_mode: bool = True
+    queue_size: int = 10000
+    drop_policy: str = "drop_new"
+    json_format: bool = False
+    # Доли выборки по событиям; None - значения по умолчанию
+    sample_rates: Dict[str, float] = None
+
 @dataclass
 class AppConfig:
     """Основная конфигурация приложения"""
     name: str = "Glasspen Bot System"
     version: str = "2.0.0"
     log_level: str = "INFO"
+    run_mode: str = "inprocess"
+    # Сколько бот дообрабатывает принятые обновления при остановке (секунды)
+    drain_timeout: float = 10.0
     bots: Dict[str, BotConfig] = field(default_factory=dict)
     database: DatabaseConfig = field(default_factory=DatabaseConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    loop_monitor: LoopMonitorConfig = field(default_factory=LoopMonitorConfig)
+    persistence: PersistenceConfig = field(default_factory=PersistenceConfig)
+    logging: LoggingConfig = field(default_factory=LoggingConfig)
     
     def __init__(self):
         # Инициализируем словарь ботов до загрузки конфигурации
         self.bots = {}
         self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
         
+        # Логи пишутся в фоновом потоке через ограниченную очередь
+        self.logging = LoggingConfig(
+            async_mode=os.getenv("LOG_ASYNC", "true").lower() == "true",
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            drop_policy=os.getenv("LOG_DROP_POLICY", "drop_new").lower(),
+            json_format=os.getenv("LOG_FORMAT", "text").lower() == "json",
+            sample_rates=self._parse_sample_rates(os.getenv("LOG_SAMPLE", ""))
+        )
+        
+        # Режим работы: inprocess (все боты в одном процессе) или multiprocess
+        self.run_mode = os.getenv("RUN_MODE", "inprocess").lower()
+        self.drain_timeout = float(os.getenv("DRAIN_TIMEOUT", "10"))
+        
         # Загружаем конфигурацию ботов из .env
         self._load_bots_config()
         
@@ -61,6 +112,27 @@ class AppConfig:
             url=os.getenv("DATABASE_URL", "sqlite:///data/bots.db"),
             echo=os.getenv("DATABASE_ECHO", "false").lower() == "true"
         )
+        
+        # Экспорт метрик (по умолчанию выключен)
+        self.metrics = MetricsConfig(
+            enabled=os.getenv("METRICS_ENABLED", "false").lower() == "true",
+            host=os.getenv("METRICS_HOST", "127.0.0.1"),
+            port=int(os.getenv("METRICS_PORT", "9464"))
+        )
+        
+        # Монитор блокировок event loop
+        self.loop_monitor = LoopMonitorConfig(
+            enabled=os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true",
+            interval_ms=float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "10")),
+            threshold_ms=float(os.getenv("LOOP_MONITOR_THRESHOLD_MS", "100"))
+        )
+        
+        # Состояние ботов между перезапусками (SQLite, файл на каждого бота)
+        self.persistence = PersistenceConfig(
+            enabled=os.getenv("PERSISTENCE_ENABLED", "true").lower() == "true",
+            directory=os.getenv("PERSISTENCE_DIR", "data/state"),
+            update_interval=float(os.getenv("PERSISTENCE_UPDATE_INTERVAL", "5"))
+        )
     
     def _parse_admin_ids(self, admin_str: str) -> List[int]:
         """
@@ -99,6 +171,19 @@ class AppConfig:
             logging.warning(f"Не удалось распарсить CSV admin_ids: {admin_str}, ошибка: {e}")
             return []
     
+    def _parse_sample_rates(self, sample_str: str) -> Dict[str, float]:
+        """Разбор доли выборки событий: "handler.done=0.01,note.added=0.1" """
+        if not sample_str.strip():
+            return None
+        rates = {}
+        for part in sample_str.split(','):
+            event, _, rate = part.partition('=')
+            try:
+                rates[event.strip()] = float(rate)
+            except ValueError:
+                logging.warning(f"Неверная доля выборки для события {event.strip()}: {rate}")
+        return rates
+    
     def _load_bots_config(self):
         """Загрузка конфигурации ботов из переменных окружения"""
         
@@ -169,7 +254,25 @@ class AppConfig:
         print(f"🤖 {self.name} v{self.version}")
         print("="*60)
         print(f"📊 Уровень логов: {self.log_level}")
+        if self.logging.async_mode:
+            print(f"📝 Запись логов: фоновый поток, очередь {self.logging.queue_size}, {self.logging.drop_policy}")
+        else:
+            print("📝 Запись логов: синхронная")
+        if self.logging.json_format:
+            print("📝 Формат файлов логов: JSON")
+        if self.logging.sample_rates:
+            print(f"📝 Выборка событий: {self.logging.sample_rates}")
+        print(f"⚙️  Режим работы: {self.run_mode}")
+        print(f"⏳ Завершение обработки при остановке: до {self.drain_timeout} с")
         print(f"🗄️  База данных: {'Включена' if self.database.enabled else 'Выключена'}")
+        if self.metrics.enabled:
+            print(f"📈 Метрики: http://{self.metrics.host}:{self.metrics.port}/metrics")
+        else:
+            print("📈 Метрики: Выключены")
+        if self.persistence.enabled:
+            print(f"💾 Состояние ботов: {self.persistence.directory}")
+        else:
+            print("💾 Состояние ботов: Не сохраняется")
         
         print(f"\n🔧 Зарегистрированные боты ({len(self.bots)}):")
         for bot_name, bot_config in self.bots.items():
@@ -6,9 +6,19 @@ __version__ = "0.2.0"
 __author__ = "Kornely Prutkov"
 __email__ = "your.email@ayaweb7.gmailcom"
 
-# Экспорт основных компонентов
-from .bot.bot import get_bot
-from .bot.handlers.command_handlers import start_command
-
 # Указываем, что импортировать при "from src import *"
 __all__ = ['get_bot', 'start_command']
+
+
+def __getattr__(name):
+    """
+    Экспорт основных компонентов по первому обращению: иначе любой
+    импорт src.* тянул бы за собой обработчики и telegram.ext.
+    """
+    if name == 'get_bot':
+        from .bot.bot import get_bot
+        return get_bot
+    if name == 'start_command':
+        from .bot.handlers.command_handlers import start_command
+        return start_command
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -52,25 +52,21 @@ class GlasspenBot(BaseBot):
         )
         
         # Импортируем обработчики
+        # Импорт модулей обработчиков заодно привязывает их к маршрутам callbacks
         from .handlers.commands import (
             cmd_start,
             cmd_help,
             channel_command,
-            handle_main_menu,
-            handle_faq_menu,
-            handle_faq_answer,
             handle_ask_question,
             handle_question_input,
-            handle_cancel,
-            handle_start,
-            handle_show_channel
+            handle_cancel
         )
         
         from .handlers.admin_commands import (
             admin_questions,
-            admin_answer,
-            handle_admin_callback  # ← ДОБАВИТЬ ЭТОТ ИМПОРТ
+            admin_answer
         )
+        from .callbacks import callbacks
         
         # Определяем состояния для ConversationHandler
         ASKING_QUESTION = 1
@@ -78,7 +74,7 @@ class GlasspenBot(BaseBot):
         # Создаём ConversationHandler для обработки вопросов
         question_conv_handler = ConversationHandler(
             entry_points=[
-                CallbackQueryHandler(handle_ask_question, pattern="^ask_question$")
+                CallbackQueryHandler(handle_ask_question, pattern=callbacks.pattern_for("ask_question"))
             ],
             states={
                 ASKING_QUESTION: [
@@ -86,10 +82,13 @@ class GlasspenBot(BaseBot):
                 ]
             },
             fallbacks=[
-                CallbackQueryHandler(handle_cancel, pattern="^cancel$"),
+                CallbackQueryHandler(handle_cancel, pattern=callbacks.pattern_for("cancel")),
                 CommandHandler("start", cmd_start)
             ],
-            per_message=False
+            per_message=False,
+            # Незаконченный вопрос переживает перезапуск, если у бота есть хранилище состояния
+            name="glasspen_question",
+            persistent=bool(self.config.get('state_path'))
         )
         
         # Собираем все обработчики
@@ -99,12 +98,8 @@ class GlasspenBot(BaseBot):
             CommandHandler("channel", channel_command),
             CommandHandler("questions", admin_questions),
             CommandHandler("answer", admin_answer),
-            CallbackQueryHandler(handle_main_menu, pattern="^main_menu$"),
-            CallbackQueryHandler(handle_show_channel, pattern="^show_channel$"),
-            CallbackQueryHandler(handle_faq_menu, pattern="^show_faq$"),
-            CallbackQueryHandler(handle_faq_answer, pattern="^faq:"),
-            CallbackQueryHandler(handle_admin_callback, pattern="^admin_"),  # ← ДОБАВИТЬ ЭТОТ ОБРАБОТЧИК
-            CallbackQueryHandler(handle_cancel, pattern="^cancel$"),
+            # Все inline-кнопки, кроме входа в диалог вопроса
+            callbacks.handler(),
             question_conv_handler
         ]
         
@@ -0,0 +1,25 @@
+"""
+Таблица callback-кнопок GlassPen Bot.
+Обработчики привязываются в handlers/commands.py и handlers/admin_commands.py.
+"""
+
+from src.core.callback_router import CallbackRouter
+from src.core.cursor import decode_cursor
+
+callbacks = CallbackRouter("glasspen", version=1)
+
+for _name in ('main_menu', 'show_channel', 'show_faq', 'cancel', 'admin_refresh',
+              # Вход в диалог вопроса - обрабатывается ConversationHandler
+              'ask_question'):
+    callbacks.add_route(_name)
+
+callbacks.add_route('faq', str)
+callbacks.add_route('admin_answer', str)
+# Следующая страница очереди вопросов: курсор последнего показанного вопроса
+callbacks.add_route('admin_more', decode_cursor)
+
+# Кнопки старого формата в уже отправленных сообщениях
+for _name in ('main_menu', 'show_channel', 'show_faq', 'cancel', 'admin_refresh', 'ask_question'):
+    callbacks.legacy(_name, _name, exact=True)
+callbacks.legacy('faq:', 'faq', separator=':')
+callbacks.legacy('admin_answer_', 'admin_answer')
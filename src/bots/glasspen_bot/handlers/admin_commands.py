@@ -3,35 +3,39 @@
 question_text
 """
 import logging
+from datetime import datetime
+from typing import Optional
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, CommandHandler
 
+from src.core.cursor import Cursor, encode_cursor
 from src.core.question_manager import question_manager
+from src.core.message_builder import escape_markdown
+from src.core.replies import remember_message, safe_edit_message_text
+from src.bots.glasspen_bot.callbacks import callbacks
 
 logger = logging.getLogger(__name__)
 
-def escape_markdown(text: str) -> str:
+# Вопросов на одной странице /questions
+QUESTIONS_PER_PAGE = 10
+
+async def _respond(update: Update, text: str, reply_markup=None):
     """
-    Экранирует спецсимволы Markdown
+    Ответ на команду или обновление сообщения при нажатии кнопки.
+    Повторное «Обновить» без изменений не отправляет запрос к API.
     """
-    if not text:
-        return ""
-    
-    # Список символов для экранирования
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
-    
-    # Экранируем каждый символ
-    result = ""
-    for char in text:
-        if char in escape_chars:
-            result += '\\' + char
-        else:
-            result += char
-    
-    return result
+    if update.callback_query:
+        await safe_edit_message_text(update.callback_query, text, reply_markup=reply_markup)
+    else:
+        message = await update.message.reply_text(text, reply_markup=reply_markup)
+        remember_message(message, text, reply_markup)
 
-async def admin_questions(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показывает неотвеченные вопросы (только для админа)"""
+async def admin_questions(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                          cursor: Optional[Cursor] = None):
+    """
+    Показывает неотвеченные вопросы (только для админа).
+    cursor - последний вопрос предыдущей страницы (кнопка «Далее»).
+    """
     user = update.effective_user
     
     # Проверяем, админ ли
@@ -41,26 +45,24 @@ async def admin_questions(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not admin_ids and hasattr(context, 'application') and hasattr(context.application, 'bot_data'):
         admin_ids = context.application.bot_data.get('admin_ids', [])
     
-    logger.info(f"=== DEBUG admin_questions ===")
-    logger.info(f"Пользователь: {user.id}, Имя: {user.first_name}")
-    logger.info(f"admin_ids из bot_data: {admin_ids}")
-    logger.info(f"Пользователь в списке админов: {user.id in admin_ids}")
+    logger.debug("admin_questions: пользователь %s, admin_ids %s", user.id, admin_ids)
     
     if user.id not in admin_ids:
-        await update.message.reply_text("⛔ У вас нет доступа к этой команде.")
+        await _respond(update, "⛔ У вас нет доступа к этой команде.")
         return
     
-    questions = question_manager.get_pending_questions()
+    total = question_manager.count_pending()
+    questions, has_more = question_manager.get_pending_page(cursor, QUESTIONS_PER_PAGE)
     
-    logger.info(f"Найдено неотвеченных вопросов: {len(questions)}")
+    logger.debug("Найдено неотвеченных вопросов: %s", total)
     
     if not questions:
-        await update.message.reply_text("📭 Нет новых вопросов.")
+        await _respond(update, "📭 Нет новых вопросов." if cursor is None else "📭 Больше вопросов нет.")
         return
     
-    response = f"📨 Неотвеченные вопросы: {len(questions)}\n\n"
+    response = f"📨 Неотвеченные вопросы: {total}\n\n"
     
-    for i, q in enumerate(questions[:-10], 1):  # Ограничиваем 10
+    for i, q in enumerate(questions, 1):
         # Форматируем дату
         created_at = q['created_at']
         if 'T' in created_at:
@@ -71,7 +73,7 @@ async def admin_questions(update: Update, context: ContextTypes.DEFAULT_TYPE):
             datetime_str = created_at[:16]
         
         # ИСПРАВЛЕНИЕ: Экранируем спецсимволы в тексте вопроса
-        question_text = escape_markdown(q['question_text'])
+        question_text = escape_markdown(q['question_text'], version=2)
         # Убираем Markdown символы для безопасности
         question_text = question_text.replace('*', '').replace('_', '').replace('`', '')
         
@@ -91,18 +93,29 @@ async def admin_questions(update: Update, context: ContextTypes.DEFAULT_TYPE):
         keyboard.append([
             InlineKeyboardButton(
                 f"Ответить: {q['question_text'][:10]}...",
-                callback_data=f"admin_answer_{q['id']}"
+                callback_data=callbacks.pack("admin_answer", q['id'])
             )
         ])
     
+    if has_more:
+        # Курсор последнего показанного вопроса: ответы на вопросы не сдвигают страницу
+        last = questions[-1]
+        try:
+            more_data = callbacks.pack("admin_more", encode_cursor(datetime.fromisoformat(last['created_at']), last['id']))
+        except ValueError:
+            more_data = None
+        if more_data:
+            keyboard.append([InlineKeyboardButton("Далее ▶️", callback_data=more_data)])
+    
     keyboard.append([
-        InlineKeyboardButton("Обновить", callback_data="admin_refresh"),
-        InlineKeyboardButton("Главное меню", callback_data="main_menu")
+        InlineKeyboardButton("Обновить", callback_data=callbacks.pack("admin_refresh")),
+        InlineKeyboardButton("Главное меню", callback_data=callbacks.pack("main_menu"))
     ])
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await update.message.reply_text(
+    await _respond(
+        update,
         response,
         # parse_mode="Markdown",
         reply_markup=reply_markup
@@ -118,8 +131,7 @@ async def admin_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not admin_ids and hasattr(context, 'application') and hasattr(context.application, 'bot_data'):
         admin_ids = context.application.bot_data.get('admin_ids', [])
     
-    logger.info(f"=== DEBUG admin_answer ===")
-    logger.info(f"Пользователь: {user.id} в админах: {user.id in admin_ids}")
+    logger.debug("admin_answer: пользователь %s, admin_ids %s", user.id, admin_ids)
     
     if user.id not in admin_ids:
         await update.message.reply_text("⛔ Нет доступа.")
@@ -139,7 +151,7 @@ async def admin_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     question_id = context.args[0]
     comment = " ".join(context.args[1:])
     
-    logger.info(f"Пытаемся отметить вопрос {question_id} как отвеченный")
+    logger.debug("Пытаемся отметить вопрос %s как отвеченный", question_id)
     
     success = question_manager.mark_as_answered(question_id, comment)
     
@@ -180,39 +192,44 @@ async def admin_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
-async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка callback от админ-кнопок"""
-    query = update.callback_query
-    data = query.data
-    
-    logger.info(f"=== DEBUG handle_admin_callback ===")
-    logger.info(f"Callback data: {data}")
-    
+async def _answer_admin_callback(query):
+    """Убирает «часики» у админ-кнопки"""
     try:
         await query.answer()
     except Exception as e:
         logger.warning(f"Не удалось ответить на callback: {e}")
         # Продолжаем выполнение даже если callback устарел
-    
-    if data == "admin_refresh":
-        # Обновляем список вопросов
-        await admin_questions(update, context)
-    elif data.startswith("admin_answer_"):
-        # Показываем форму для ответа на конкретный вопрос
-        question_id = data[13:]  # Убираем "admin_answer_"
-        
-        await query.edit_message_text(
-            f"✏️ *Ответ на вопрос* `{question_id}`\n\n"
-            f"Введите ответ в формате:\n"
-            f"`/answer {question_id} ваш_комментарий`\n\n"
-            f"*Пример:*\n"
-            f"`/answer {question_id} Ответил пользователю в личке`",
-            parse_mode="Markdown"
-        )
-    elif data == "main_menu":
-        # Возврат в главное меню
-        from .commands import handle_main_menu
-        await handle_main_menu(update, context)
+
+
+@callbacks.bind('admin_refresh')
+async def handle_admin_refresh(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Кнопка «Обновить» - перерисовывает список вопросов"""
+    await _answer_admin_callback(update.callback_query)
+    await admin_questions(update, context)
+
+
+@callbacks.bind('admin_more')
+async def handle_admin_more(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor: Cursor):
+    """Кнопка «Далее» - следующая страница очереди вопросов"""
+    await _answer_admin_callback(update.callback_query)
+    await admin_questions(update, context, cursor)
+
+
+@callbacks.bind('admin_answer')
+async def handle_admin_answer_button(update: Update, context: ContextTypes.DEFAULT_TYPE, question_id: str):
+    """Показывает форму для ответа на конкретный вопрос"""
+    query = update.callback_query
+    await _answer_admin_callback(query)
+    
+    await safe_edit_message_text(
+        query,
+        f"✏️ *Ответ на вопрос* `{question_id}`\n\n"
+        f"Введите ответ в формате:\n"
+        f"`/answer {question_id} ваш_комментарий`\n\n"
+        f"*Пример:*\n"
+        f"`/answer {question_id} Ответил пользователю в личке`",
+        parse_mode="Markdown"
+    )
 
 
 def get_admin_handlers():
@@ -7,6 +7,9 @@ import logging
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, ConversationHandler
 from src.core.question_manager import question_manager
+from src.utils.structured_logging import log_event
+from src.core.replies import safe_edit_message_text
+from src.bots.glasspen_bot.callbacks import callbacks
 
 logger = logging.getLogger(__name__)
 
@@ -55,26 +58,6 @@ FAQ_DATA = {
 
 
 # ========== КОМАНДЫ ==========
-def escape_markdown(text: str) -> str:
-    """
-    Экранирует спецсимволы Markdown
-    """
-    if not text:
-        return ""
-    
-    # Список символов для экранирования
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
-    
-    # Экранируем каждый символ
-    result = ""
-    for char in text:
-        if char in escape_chars:
-            result += '\\' + char
-        else:
-            result += char
-    
-    return result
-
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -147,6 +130,7 @@ async def cmd_channel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ========== CALLBACK ОБРАБОТЧИКИ ==========
 
+@callbacks.bind('main_menu')
 async def handle_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Показ главного меню (обработка callback)
@@ -154,13 +138,15 @@ async def handle_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         "🏠 *Главное меню:*\n\n"
         "Выберите действие:",
         parse_mode="Markdown",
         reply_markup=get_main_menu_keyboard()
     )
 
+@callbacks.bind('show_channel')
 async def handle_show_channel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Обработка кнопки "Скопировать ссылку на канал"
@@ -179,7 +165,8 @@ async def handle_show_channel(update: Update, context: ContextTypes.DEFAULT_TYPE
         "Подписывайтесь, чтобы быть в курсе новых публикаций!"
     )
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         channel_text,
         # parse_mode="Markdown",
         reply_markup=get_main_menu_keyboard()
@@ -187,6 +174,7 @@ async def handle_show_channel(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 
 
+@callbacks.bind('show_faq')
 async def handle_faq_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Показ меню с частыми вопросами
@@ -194,7 +182,8 @@ async def handle_faq_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         "❓ *Частые вопросы:*\n\n"
         "Выберите вопрос, чтобы увидеть ответ:",
         parse_mode="Markdown",
@@ -202,16 +191,14 @@ async def handle_faq_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
-async def handle_faq_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
+@callbacks.bind('faq')
+async def handle_faq_answer(update: Update, context: ContextTypes.DEFAULT_TYPE, faq_id: str):
     """
     Показ ответа на выбранный вопрос FAQ
     """
     query = update.callback_query
     await query.answer()
     
-    # Извлекаем номер вопроса из callback_data (формат: faq:1)
-    faq_id = query.data.split(":")[1]
-    
     if faq_id in FAQ_DATA:
         faq = FAQ_DATA[faq_id]
         
@@ -220,7 +207,8 @@ async def handle_faq_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"*Ответ:* {faq['answer']}"
         )
         
-        await query.edit_message_text(
+        await safe_edit_message_text(
+            query,
             response_text,
             parse_mode="Markdown",
             reply_markup=get_back_to_faq_keyboard()
@@ -238,7 +226,8 @@ async def handle_ask_question(update: Update, context: ContextTypes.DEFAULT_TYPE
     query = update.callback_query
     await query.answer()
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         "✏️ *Задайте вопрос автору канала:*\n\n"
         "Напишите ваш вопрос в одном сообщении.\n"
         "Автор получит его и ответит в ближайшее время.\n\n"
@@ -255,13 +244,8 @@ async def handle_question_input(update: Update, context: ContextTypes.DEFAULT_TY
     user = update.effective_user
     user_question = update.message.text
     
-    # ДОБАВИМ ОТЛАДОЧНЫЙ ВЫВОД
-    logger.info(f"=== DEBUG: handle_question_input вызван ===")
-    logger.info(f"bot_data keys: {list(context.bot_data.keys()) if context.bot_data else 'Нет bot_data'}")
-    logger.info(f"application: {hasattr(context, 'application')}")
-    
-    if hasattr(context, 'application') and context.application:
-        logger.info(f"application.bot_data: {context.application.bot_data if hasattr(context.application, 'bot_data') else 'Нет bot_data'}")
+    # Отладочный вывод (аргументы форматируются только при уровне DEBUG)
+    logger.debug("handle_question_input: ключи bot_data %s", context.bot_data.keys() if context.bot_data else None)
     
     # Сохраняем вопрос
     question_id = question_manager.save_question(
@@ -279,12 +263,12 @@ async def handle_question_input(update: Update, context: ContextTypes.DEFAULT_TY
         if not admin_id and hasattr(context, 'application') and hasattr(context.application, 'bot_data'):
             admin_id = context.application.bot_data.get('admin_id')
         
-        logger.info(f"=== DEBUG: Найден admin_id = {admin_id} ===")
+        logger.debug("Найден admin_id = %s", admin_id)
         
         # ВРЕМЕННО: если admin_id всё равно None, используем хардкод
         if not admin_id:
             admin_id = 7156086085  # ← ВАШ ID для теста
-            logger.info(f"=== DEBUG: Используем хардкод admin_id = {admin_id} ===")
+            logger.debug("Используем хардкод admin_id = %s", admin_id)
         
         if admin_id:
             try:
@@ -298,13 +282,12 @@ async def handle_question_input(update: Update, context: ContextTypes.DEFAULT_TY
                     f"Текст вопроса:\n{user_question[:500]}"
                 )
                 
-                logger.info(f"=== DEBUG: Отправляем уведомление админу {admin_id} ===")
-                
                 await context.bot.send_message(
                     chat_id=int(admin_id),
                     text=notification
                 )
-                logger.info(f"Уведомление отправлено админу {admin_id}")
+                log_event(logger, "question.notified", "Уведомление отправлено админу %s", admin_id,
+                          question_id=question_id)
             except Exception as e:
                 logger.error(f"Не удалось отправить уведомление админу: {e}")
                 logger.error(f"Тип ошибки: {type(e).__name__}")
@@ -333,6 +316,7 @@ async def handle_question_input(update: Update, context: ContextTypes.DEFAULT_TY
 
 
 
+@callbacks.bind('cancel')
 async def handle_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Отмена задания вопроса
@@ -340,7 +324,8 @@ async def handle_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         "❌ Ввод вопроса отменен.",
         reply_markup=get_main_menu_keyboard()
     )
@@ -356,7 +341,8 @@ async def handle_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         "✅ Возврат на старт.",
         reply_markup=get_main_menu_keyboard()
     )
@@ -374,19 +360,19 @@ def get_main_menu_keyboard() -> InlineKeyboardMarkup:
         [
             InlineKeyboardButton(
                 "Скопировать ссылку на канал",
-                callback_data="show_channel"
+                callback_data=callbacks.pack("show_channel")
             )
         ],
         [
             InlineKeyboardButton(
                 "Ответы на частые вопросы",
-                callback_data="show_faq"
+                callback_data=callbacks.pack("show_faq")
             )
         ],
         [
             InlineKeyboardButton(
                 "Задать вопрос автору канала",
-                callback_data="ask_question"
+                callback_data=callbacks.pack("ask_question")
             )
         ]
     ])
@@ -401,36 +387,36 @@ def get_faq_menu_keyboard() -> InlineKeyboardMarkup:
         [
             InlineKeyboardButton(
                 "Можно ли на вашем канале разместить свои стихи?",
-                callback_data="faq:1"
+                callback_data=callbacks.pack("faq", "1")
             )
         ],
         [
             InlineKeyboardButton(
                 "Какие требования для присылаемых стихов?",
-                callback_data="faq:2"
+                callback_data=callbacks.pack("faq", "2")
             )
         ],
         [
             InlineKeyboardButton(
                 "Как часто выходят новые публикации?",
-                callback_data="faq:3"
+                callback_data=callbacks.pack("faq", "3")
             )
         ],
         [
             InlineKeyboardButton(
                 "Задайте свой вопрос автору канала",
-                callback_data="faq:4"
+                callback_data=callbacks.pack("faq", "4")
             )
         ],
         [
             InlineKeyboardButton(
                 "Вакантный вопрос", 
-                callback_data="faq:5"
+                callback_data=callbacks.pack("faq", "5")
             )
         ],
         [
-            InlineKeyboardButton("Назад", callback_data="show_faq"),
-            InlineKeyboardButton("Главное меню", callback_data="main_menu")
+            InlineKeyboardButton("Назад", callback_data=callbacks.pack("show_faq")),
+            InlineKeyboardButton("Главное меню", callback_data=callbacks.pack("main_menu"))
         ]
     ])
     return keyboard
@@ -442,8 +428,8 @@ def get_back_to_faq_keyboard() -> InlineKeyboardMarkup:
     """
     keyboard = InlineKeyboardMarkup([
         [
-            InlineKeyboardButton("Назад", callback_data="show_faq"),
-            InlineKeyboardButton("Главное меню", callback_data="main_menu")
+            InlineKeyboardButton("Назад", callback_data=callbacks.pack("show_faq")),
+            InlineKeyboardButton("Главное меню", callback_data=callbacks.pack("main_menu"))
         ]
     ])
     return keyboard
@@ -454,7 +440,7 @@ def get_cancel_keyboard() -> InlineKeyboardMarkup:
     Кнопка отмены для диалога
     """
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("Отмена", callback_data="cancel")]
+        [InlineKeyboardButton("Отмена", callback_data=callbacks.pack("cancel"))]
     ])
     return keyboard
 
@@ -464,7 +450,7 @@ def get_start_keyboard() -> InlineKeyboardMarkup:
     Кнопка возврата на старт
     """
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("Старт", callback_data="main_menu")]
+        [InlineKeyboardButton("Старт", callback_data=callbacks.pack("main_menu"))]
     ])
     return keyboard
 
@@ -505,7 +491,7 @@ def get_handlers():
     
     question_conv_handler = ConversationHandler(
         entry_points=[
-            CallbackQueryHandler(handle_ask_question, pattern="^ask_question$")
+            CallbackQueryHandler(handle_ask_question, pattern=callbacks.pattern_for("ask_question"))
         ],
         states={
             ASKING_QUESTION: [
@@ -513,7 +499,7 @@ def get_handlers():
             ]
         },
         fallbacks=[
-            CallbackQueryHandler(handle_cancel, pattern="^cancel$"),
+            CallbackQueryHandler(handle_cancel, pattern=callbacks.pattern_for("cancel")),
             CommandHandler("start", cmd_start)
         ],
         allow_reentry=True
@@ -523,11 +509,6 @@ def get_handlers():
         CommandHandler("start", cmd_start),
         CommandHandler("help", cmd_help),
         CommandHandler("channel", cmd_channel),
-        CallbackQueryHandler(handle_main_menu, pattern="^main_menu$"),
-        CallbackQueryHandler(handle_show_channel, pattern="^show_channel$"),
-        CallbackQueryHandler(handle_faq_menu, pattern="^show_faq$"),
-        CallbackQueryHandler(handle_faq_answer, pattern="^faq:"),
         question_conv_handler,
-        CallbackQueryHandler(handle_cancel, pattern="^cancel$"),
-        CallbackQueryHandler(handle_start, pattern="^main_menu$")
+        callbacks.handler()
     ]
\ No newline at end of file
@@ -3,9 +3,15 @@
 """
 
 import logging
+from typing import List
 from telegram.ext import CallbackQueryHandler
 
 from src.core.base_bot import BaseBot
+from src.core.digest import digest_scheduler
+from src.core.message_builder import escape_markdown
+from src.core.models import Note
+from src.core.reminders import reminder_scheduler
+from src.core.timezones import to_local
 from src.bots.helper_bot.handlers.commands import (
     get_handlers,
     handle_inline_buttons  # <-- ДОБАВЬТЕ ЭТУ СТРОКУ!
@@ -34,6 +40,45 @@ class HelperBot(BaseBot):
         await super().setup()
         logger.info(f"Helper Bot (простая версия) настроен. Админы: {self.config.get('admin_ids', [])}")
     
+    async def start(self):
+        """Запуск бота и доставки напоминаний"""
+        await super().start()
+        if self.is_running:
+            reminder_scheduler.start(self.deliver_reminders)
+            digest_scheduler.start(self.deliver_digest)
+    
+    async def on_drain(self, timeout: float):
+        """Остановка доставки напоминаний; уже поставленные сводки дожидаются"""
+        await reminder_scheduler.stop()
+        await digest_scheduler.stop()
+    
+    async def deliver_reminders(self, user_id: int, notes: List[Note]) -> bool:
+        """Отправляет напоминание владельцу записей; несколько - одной сводкой"""
+        if len(notes) == 1:
+            note = notes[0]
+            text = (
+                f"⏰ *Напоминание*\n\n{escape_markdown(note.text)}\n\n"
+                f"ID: `{note.id[:8]}`"
+            )
+        else:
+            lines = [f"⏰ *Напоминания ({len(notes)}):*", ""]
+            for note in notes:
+                preview = note.text[:80] + "..." if len(note.text) > 80 else note.text
+                lines.append(f"• *{to_local(note.reminder_at, note.user_id).strftime('%d.%m %H:%M')}* - {escape_markdown(preview)}")
+                lines.append(f"   ID: `{note.id[:8]}`")
+            text = "\n".join(lines)
+        
+        return await self.send_message(
+            chat_id=user_id,
+            text=text,
+            parse_mode='Markdown',
+            reply_markup=get_main_keyboard()
+        )
+    
+    async def deliver_digest(self, user_id: int, text: str) -> bool:
+        """Отправляет ежедневную сводку"""
+        return await self.send_message(chat_id=user_id, text=text, parse_mode='Markdown')
+    
     async def send_welcome_message(self, chat_id: int):
         """Отправить приветственное сообщение (опционально)"""
         welcome_text = """
@@ -0,0 +1,43 @@
+"""
+Таблица callback-кнопок Helper Bot.
+Здесь объявлены форматы всех кнопок; обработчики привязываются
+в handlers/commands.py через callbacks.bind().
+"""
+
+from src.core.callback_router import CallbackRouter
+from src.core.cursor import decode_cursor
+
+callbacks = CallbackRouter("helper", version=1, auto_answer=True)
+
+# Меню и общие действия
+for _name in ('main_menu', 'cancel', 'new_note', 'list_notes', 'today_notes',
+              'stats', 'categories', 'help', 'noop'):
+    callbacks.add_route(_name)
+
+# Действия с записью: аргумент - короткий ID записи
+for _name in ('view', 'edit', 'delete', 'delete_confirm', 'category_new'):
+    callbacks.add_route(_name, str)
+
+# Без категории - меню выбора, с категорией - смена категории
+callbacks.add_route('category', str, str, min_args=1)
+callbacks.add_route('important', str, str, min_args=1)
+callbacks.add_route('page', int)
+
+# Постраничный вывод с курсором последней показанной записи
+for _name in ('list_older', 'list_newer', 'search_more', 'today_more'):
+    callbacks.add_route(_name, decode_cursor)
+
+# Кнопки старого формата в уже отправленных сообщениях
+for _name in ('main_menu', 'cancel', 'new_note', 'list_notes', 'today_notes',
+              'stats', 'categories', 'help'):
+    callbacks.legacy(_name, _name, exact=True)
+callbacks.legacy('current_page', 'noop', exact=True)
+callbacks.legacy('current', 'noop', exact=True)
+callbacks.legacy('view_', 'view')
+callbacks.legacy('edit_', 'edit')
+callbacks.legacy('delete_', 'delete')
+callbacks.legacy('delete_confirm_', 'delete_confirm')
+callbacks.legacy('category_', 'category')
+callbacks.legacy('category_new_', 'category_new')
+callbacks.legacy('important_', 'important')
+callbacks.legacy('page_', 'page')
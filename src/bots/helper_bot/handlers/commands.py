@@ -4,14 +4,26 @@
 """
 
 import logging
-from datetime import datetime
-from telegram import Update
+from datetime import date, datetime, timedelta
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 
+from src.core.cursor import Cursor, encode_cursor
+from src.core.digest import DIGEST_TIME_KEY, parse_digest_time
+from src.core.message_builder import escape_markdown
 from src.core.models import Note
 from src.core.note_manager import note_manager
+from src.core.recurrence import RULE_ALIASES, describe_rule, next_occurrence, normalize_rule
+from src.core.replies import remember_message, safe_edit_message_text, stream_reply
+from src.core.timezones import (
+    TIMEZONE_KEY, from_local, get_zone, local_date, local_day_bounds, local_now, to_local, utc_now, zone_name
+)
+from src.core.user_settings import user_settings
 from src.bots.helper_bot.keyboards.main_menu import get_main_keyboard, get_notes_keyboard
-from typing import Optional  # Для аннотации _find_note_by_short_id
+from src.bots.helper_bot.callbacks import callbacks
+from src.bots.helper_bot.views import render_note, render_notes_page, render_notes_from_cursor
+from src.utils.structured_logging import log_event
+from typing import Optional, Tuple
 
 # Добавьте эти импорты в начало commands.py, если их там нет:
 from src.bots.helper_bot.keyboards.inline_keyboards import (
@@ -57,7 +69,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown',
         reply_markup=get_main_keyboard()
     )
-    logger.info(f"[Helper] Старт для {user.id}")
+    log_event(logger, "helper.start", "[Helper] Старт для %s", user.id)
 
 # 2. ========== Полная справка по командам ==========
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -216,9 +228,9 @@ async def _handle_new_note_input(update, context, text, user_id):
         success_msg = f"""
 ✅ *Запись сохранена!*
 
-📅 {saved_note.created_at.strftime('%d.%m.%Y %H:%M')}
-🏷️ Категория: {saved_note.category}
-{"🏷️ Теги: " + ", ".join([f"#{t}" for t in saved_note.tags]) if saved_note.tags else ""}
+📅 {to_local(saved_note.created_at, saved_note.user_id).strftime('%d.%m.%Y %H:%M')}
+🏷️ Категория: {escape_markdown(saved_note.category)}
+{"🏷️ Теги: " + ", ".join([f"#{escape_markdown(t)}" for t in saved_note.tags]) if saved_note.tags else ""}
 
 ID: `{saved_note.id[:8]}`
 """
@@ -250,56 +262,27 @@ async def list_entries_command(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return
     
-    # Сортируем по дате (новые сверху)
-    all_notes.sort(key=lambda x: x.created_at, reverse=True)
-    
     # Определяем запрошенную страницу
     page = 0
     if context.args and context.args[0].isdigit():
         page = int(context.args[0]) - 1
-        page = max(0, page)  # Не меньше 0
-    
-    # Сохраняем все записи в контексте для быстрого доступа по короткому ID
-    context.user_data['notes_cache'] = {note.id[:8]: note for note in all_notes}
-    
-    # Разбиваем на страницы (по 5 записей на страницу)
-    notes_per_page = 5
-    total_pages = (len(all_notes) + notes_per_page - 1) // notes_per_page  # Округление вверх
-    
-    # Проверяем, что запрошенная страница существует
-    if page >= total_pages:
-        page = total_pages - 1
-    
-    start_idx = page * notes_per_page
-    end_idx = start_idx + notes_per_page
-    page_notes = all_notes[start_idx:end_idx]
-    
-    # Формируем текст сообщения
-    message_text = f"📋 *Ваши записи* (страница {page+1}/{total_pages})\n\n"
-    message_text += f"Всего записей: *{len(all_notes)}*\n"
-    
-    if total_pages > 1:
-        message_text += "Используйте кнопки ниже для навигации.\n"
     
-    message_text += "\n┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈\n"
-    
-    # Получаем inline-клавиатуру для этой страницы
-    reply_markup = get_notes_list_keyboard(
-        notes=page_notes,
-        page=page,
-        total_pages=total_pages
-    )
+    # Текст и клавиатура страницы (из кэша, если записи не менялись)
+    message_text, reply_markup, page = render_notes_page(user.id, page)
     
     # Отправляем или редактируем сообщение
     if update.message:  # Если команда вызвана из чата
-        await update.message.reply_text(
+        message = await update.message.reply_text(
             message_text,
             parse_mode='Markdown',
             reply_markup=reply_markup
         )
+        # Повторное нажатие кнопки с тем же содержимым не будет редактировать сообщение
+        remember_message(message, message_text, reply_markup, 'Markdown')
     else:  # Если это callback от кнопки пагинации
         query = update.callback_query
-        await query.edit_message_text(
+        await safe_edit_message_text(
+            query,
             message_text,
             parse_mode='Markdown',
             reply_markup=reply_markup
@@ -339,48 +322,81 @@ async def view_note_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # 6.1. ========== Показывает запись с inline-кнопками действий ==========
 async def _show_note_with_buttons(update, context, note, user_id):
     """Показывает запись с inline-кнопками действий"""
-    # Форматируем полный текст записи
-    full_text = f"""
-📄 *Запись `{note.id[:8]}`*
-
-*Создана:* {note.created_at.strftime('%d.%m.%Y в %H:%M')}
-*Изменена:* {note.updated_at.strftime('%d.%m.%Y в %H:%M')}
-*Категория:* {note.category}
-*Важность:* {'⭐ ВАЖНАЯ' if note.is_important else 'Обычная'}
-"""
-    
-    if note.tags:
-        tags_str = " ".join([f"#{t}" for t in note.tags])
-        full_text += f"*Теги:* {tags_str}\n"
-    
-    if note.reminder_at:
-        reminder_str = note.reminder_at.strftime('%d.%m.%Y в %H:%M')
-        full_text += f"*⏰ Напоминание:* {reminder_str}\n"
-    
-    if note.comment:
-        full_text += f"*💬 Комментарий:* {note.comment}\n"
-    
-    full_text += f"\n*Текст записи:*\n{note.text}"
-    
-    # Получаем клавиатуру действий
-    reply_markup = get_note_actions_keyboard(note.id[:8], note.category)
+    full_text, reply_markup = render_note(note)
     
     # Отправляем или редактируем сообщение
     if update.message:  # Команда из чата
-        await update.message.reply_text(
+        message = await update.message.reply_text(
             full_text,
             parse_mode='Markdown',
             reply_markup=reply_markup
         )
+        # Повторное нажатие кнопки с тем же содержимым не будет редактировать сообщение
+        remember_message(message, full_text, reply_markup, 'Markdown')
     else:  # Callback от inline-кнопки
         query = update.callback_query
-        await query.edit_message_text(
+        await safe_edit_message_text(
+            query,
             full_text,
             parse_mode='Markdown',
             reply_markup=reply_markup
         )
 
 # 7. ========== Поиск записи по тексту ==========
+# Результатов поиска на одной странице
+SEARCH_RESULTS_PER_PAGE = 10
+
+
+def _search_preview(note: Note, search_query: str) -> str:
+    """Фрагмент текста записи вокруг найденного запроса"""
+    preview = note.text[:60] + "..." if len(note.text) > 60 else note.text
+    
+    # Подсветка найденного текста в preview (простая версия)
+    if search_query in preview.lower():
+        # Находим позицию поискового запроса
+        idx = preview.lower().find(search_query)
+        if idx >= 0:
+            # Вырезаем фрагмент с контекстом
+            start = max(0, idx - 20)
+            end = min(len(preview), idx + len(search_query) + 20)
+            if start > 0:
+                preview = "..." + preview[start:end] + "..."
+            else:
+                preview = preview[start:end] + "..."
+    return preview
+
+
+def _render_search_page(user_id: int, search_query: str,
+                        cursor: Optional[Cursor] = None) -> Optional[Tuple[str, Optional[InlineKeyboardMarkup]]]:
+    """
+    Страница результатов поиска, продолжающая обход с курсора.
+    Возвращает None, если ничего не найдено.
+    """
+    found_notes, has_more = note_manager.get_notes_from_cursor(
+        user_id, cursor, SEARCH_RESULTS_PER_PAGE,
+        match=lambda note: search_query in note.text.lower()
+    )
+    if not found_notes:
+        return None
+    
+    title = "Результаты поиска" if cursor is None else "Результаты поиска (продолжение)"
+    search_text = f"🔍 *{title}* «{escape_markdown(search_query)}»\n\n"
+    
+    for i, note in enumerate(found_notes, 1):
+        date_str = to_local(note.created_at, note.user_id).strftime('%d.%m %H:%M')
+        search_text += f"{i}. `{note.id[:8]}` *{date_str}* - {escape_markdown(_search_preview(note, search_query))}\n"
+    
+    search_text += f"\nИспользуйте `/view ID` для просмотра полного текста."
+    
+    reply_markup = None
+    if has_more:
+        last = found_notes[-1]
+        reply_markup = InlineKeyboardMarkup([[
+            InlineKeyboardButton("Ещё ▶️", callback_data=callbacks.pack('search_more', encode_cursor(last.created_at, last.id)))
+        ]])
+    return search_text, reply_markup
+
+
 async def search_notes_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Ищет записи по тексту"""
     user = update.effective_user
@@ -393,83 +409,100 @@ async def search_notes_command(update: Update, context: ContextTypes.DEFAULT_TYP
         return
     
     search_query = " ".join(context.args).lower()
-    all_notes = note_manager.get_all_notes(user.id)
+    page = _render_search_page(user.id, search_query)
     
-    # Простой поиск по тексту
-    found_notes = [
-        note for note in all_notes
-        if search_query in note.text.lower()
-    ]
-    
-    if not found_notes:
+    if page is None:
         await update.message.reply_text(
             f"🔍 По запросу \"{search_query}\" ничего не найдено.",
             reply_markup=get_main_keyboard()
         )
         return
     
-    # Показываем найденные записи
-    search_text = f"🔍 *Найдено записей: {len(found_notes)}*\n\n"
-    
-    for i, note in enumerate(found_notes[:10], 1):  # Ограничиваем 10 результатами
-        date_str = note.created_at.strftime('%d.%m %H:%M')
-        preview = note.text[:60] + "..." if len(note.text) > 60 else note.text
-        
-        # Подсветка найденного текста в preview (простая версия)
-        if search_query in preview.lower():
-            # Находим позицию поискового запроса
-            idx = preview.lower().find(search_query)
-            if idx >= 0:
-                # Вырезаем фрагмент с контекстом
-                start = max(0, idx - 20)
-                end = min(len(preview), idx + len(search_query) + 20)
-                if start > 0:
-                    preview = "..." + preview[start:end] + "..."
-                else:
-                    preview = preview[start:end] + "..."
-        
-        search_text += f"{i}. `{note.id[:8]}` *{date_str}* - {preview}\n"
-    
-    if len(found_notes) > 10:
-        search_text += f"\n... и ещё {len(found_notes) - 10} записей.\n"
-    
-    search_text += f"\nИспользуйте `/view ID` для просмотра полного текста."
-    
-    # Сохраняем найденные записи в кэш для быстрого доступа
-    context.user_data['notes_cache'] = {note.id[:8]: note for note in found_notes}
+    # Запрос нужен кнопке «Ещё»: в callback_data помещается только курсор
+    context.user_data['search_query'] = search_query
+    search_text, reply_markup = page
     
     await update.message.reply_text(
         search_text,
         parse_mode='Markdown',
-        reply_markup=get_main_keyboard()
+        reply_markup=reply_markup or get_main_keyboard()
     )
 
+
+@callbacks.bind('search_more')
+async def _on_search_more(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor: Cursor):
+    """Следующая страница результатов поиска"""
+    query = update.callback_query
+    search_query = context.user_data.get('search_query')
+    page = _render_search_page(query.from_user.id, search_query, cursor) if search_query else None
+    
+    if page is None:
+        await safe_edit_message_text(query, "🔍 Больше результатов нет. Повторите поиск командой /search.")
+        return
+    
+    search_text, reply_markup = page
+    await safe_edit_message_text(query, search_text, parse_mode='Markdown', reply_markup=reply_markup)
+
 # 8. ========== Записи за Сегодня ==========
+# Записей за день на одной странице
+TODAY_NOTES_PER_PAGE = 20
+
+
+def _render_day_page(user_id: int, day: date,
+                     cursor: Optional[Cursor] = None) -> Optional[Tuple[str, Optional[InlineKeyboardMarkup]]]:
+    """Страница записей за день (новые сверху); None, если записей нет"""
+    day_start, day_end = local_day_bounds(day, user_id)
+    day_notes, has_more = note_manager.get_notes_from_cursor(
+        user_id, cursor, TODAY_NOTES_PER_PAGE, since=day_start, until=day_end
+    )
+    if not day_notes:
+        return None
+    
+    today_text = f"📅 *Записи за сегодня ({day.strftime('%d.%m.%Y')}):*\n\n"
+    for i, note in enumerate(day_notes, 1):
+        time_str = to_local(note.created_at, note.user_id).strftime('%H:%M')
+        preview = note.text[:60] + "..." if len(note.text) > 60 else note.text
+        today_text += f"{i}. *{time_str}* - {escape_markdown(preview)}\n"
+    
+    reply_markup = None
+    if has_more:
+        last = day_notes[-1]
+        reply_markup = InlineKeyboardMarkup([[
+            InlineKeyboardButton("Ещё ▶️", callback_data=callbacks.pack('today_more', encode_cursor(last.created_at, last.id)))
+        ]])
+    return today_text, reply_markup
+
+
 async def today_entries_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает записи за сегодня"""
     user = update.effective_user
-    today = datetime.now().date()
+    today = local_now(user.id).date()
     
-    all_notes = note_manager.get_all_notes(user.id)
-    today_notes = [
-        note for note in all_notes
-        if note.created_at.date() == today
-    ]
+    page = _render_day_page(user.id, today)
     
-    if not today_notes:
+    if page is None:
         await update.message.reply_text(
             "📅 Сегодня ещё нет записей.\n\nСоздайте первую с помощью /new",
             reply_markup=get_main_keyboard()
         )
         return
     
-    today_text = f"📅 *Записи за сегодня ({today.strftime('%d.%m.%Y')}):*\n\n"
-    for i, note in enumerate(today_notes, 1):
-        time_str = note.created_at.strftime('%H:%M')
-        preview = note.text[:60] + "..." if len(note.text) > 60 else note.text
-        today_text += f"{i}. *{time_str}* - {preview}\n"
+    today_text, reply_markup = page
+    await update.message.reply_text(today_text, parse_mode='Markdown', reply_markup=reply_markup)
+
+
+@callbacks.bind('today_more')
+async def _on_today_more(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor: Cursor):
+    """Следующая страница записей за день (день берётся из курсора)"""
+    query = update.callback_query
+    page = _render_day_page(query.from_user.id, local_date(cursor[0], query.from_user.id), cursor)
+    
+    if page is None:
+        await safe_edit_message_text(query, "📅 Больше записей за этот день нет.")
+        return
     
-    await update.message.reply_text(today_text, parse_mode='Markdown')
+    today_text, reply_markup = page
+    await safe_edit_message_text(query, today_text, parse_mode='Markdown', reply_markup=reply_markup)
 
 # ---- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ----
 
@@ -477,26 +510,10 @@ async def today_entries_command(update: Update, context: ContextTypes.DEFAULT_TY
 def _find_note_by_short_id(user_id: int, short_id: str, context) -> Optional[Note]:
     """
     Находит запись по короткому ID.
-    Сначала ищет в кэше context.user_data['notes_cache'],
-    потом среди всех записей пользователя.
+    Поиск идёт через общий кэш NoteManager, который сбрасывается
+    при изменении записей пользователя.
     """
-    # Пытаемся найти в кэше (из /list или /search)
-    if 'notes_cache' in context.user_data:
-        note = context.user_data['notes_cache'].get(short_id)
-        if note:
-            return note
-    
-    # Ищем среди всех записей пользователя
-    all_notes = note_manager.get_all_notes(user_id)
-    for note in all_notes:
-        if note.id.startswith(short_id):
-            # Обновляем кэш для будущих обращений
-            if 'notes_cache' not in context.user_data:
-                context.user_data['notes_cache'] = {}
-            context.user_data['notes_cache'][short_id] = note
-            return note
-    
-    return None
+    return note_manager.find_note_by_short_id(user_id, short_id)
 
 # ---- УПРАВЛЕНИЕ ЗАПИСЯМИ (отдельные команды) ----
 
@@ -527,7 +544,7 @@ async def set_category_command(update: Update, context: ContextTypes.DEFAULT_TYP
     else:
         # Запрашиваем категорию
         await update.message.reply_text(
-            f"Текущая категория: *{last_note.category}*\n\n"
+            f"Текущая категория: *{escape_markdown(last_note.category)}*\n\n"
             "Введите новую категорию:",
             parse_mode='Markdown'
         )
@@ -604,11 +621,11 @@ async def edit_note_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         response = f"""
 *✅ Запись обновлена!*
 
-*Было:* {old_preview}
-*Стало:* {new_preview}
+*Было:* {escape_markdown(old_preview)}
+*Стало:* {escape_markdown(new_preview)}
 
 ID: `{note.id[:8]}`
-Время изменения: {datetime.now().strftime('%H:%M')}
+Время изменения: {local_now(user.id).strftime('%H:%M')}
 """
         await update.message.reply_text(
             response,
@@ -644,7 +661,7 @@ async def set_category_command(update: Update, context: ContextTypes.DEFAULT_TYP
         else:
             # Ничего не указано - показываем текущую категорию
             await update.message.reply_text(
-                f"*Текущая категория:* {last_note.category}\n\n"
+                f"*Текущая категория:* {escape_markdown(last_note.category)}\n\n"
                 "Используйте: `/set_category ID новая_категория`\n"
                 f"Пример: `/set_category {last_note.id[:8]} Работа`",
                 parse_mode='Markdown'
@@ -679,10 +696,10 @@ async def set_category_command(update: Update, context: ContextTypes.DEFAULT_TYP
 *✅ Категория изменена!*
 
 Запись: `{note.id[:8]}`
-Старая категория: {note.category}
-Новая категория: *{updated_note.category if updated_note else new_category}*
+Старая категория: {escape_markdown(note.category)}
+Новая категория: *{escape_markdown(updated_note.category if updated_note else new_category)}*
 
-Текст записи: {note.text[:60]}...
+Текст записи: {escape_markdown(note.text[:60])}...
 """
         await update.message.reply_text(
             response,
@@ -745,7 +762,7 @@ async def mark_important_command(update: Update, context: ContextTypes.DEFAULT_T
 {icon} *{status}*
 
 Запись: `{note.id[:8]}`
-Текст: {note.text[:80]}...
+Текст: {escape_markdown(note.text[:80])}...
 
 Используйте снова эту команду, чтобы { 'снять отметку' if new_importance else 'вернуть отметку' }.
 """
@@ -794,11 +811,11 @@ async def delete_note_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         warning = f"""
 *⚠️ Вы действительно хотите удалить эту запись?*
 
-`{note.id[:8]}` - *{note.created_at.strftime('%d.%m.%Y %H:%M')}*
-Категория: {note.category}
+`{note.id[:8]}` - *{to_local(note.created_at, note.user_id).strftime('%d.%m.%Y %H:%M')}*
+Категория: {escape_markdown(note.category)}
 {"⭐ ВАЖНАЯ" if note.is_important else ""}
 
-*Текст:* {preview}
+*Текст:* {escape_markdown(preview)}
 
 Если ДА, используйте команду:
 `/delete {note.id[:8]} confirm`
@@ -819,8 +836,8 @@ async def delete_note_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 *🗑️ Запись удалена!*
 
 ID: `{note.id[:8]}`
-Дата создания: {note.created_at.strftime('%d.%m.%Y')}
-Текст: {note.text[:60]}...
+Дата создания: {to_local(note.created_at, note.user_id).strftime('%d.%m.%Y')}
+Текст: {escape_markdown(note.text[:60])}...
 
 Запись удалена безвозвратно.
 """
@@ -856,36 +873,40 @@ async def categories_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     for note in all_notes:
         category_stats[note.category] += 1
     
-    # Сортируем по количеству записей (убывание)
+    await stream_reply(
+        update.message,
+        _category_lines(category_stats, len(all_notes)),
+        parse_mode='Markdown',
+        reply_markup=get_main_keyboard()
+    )
+
+
+def _category_lines(category_stats, total_notes: int):
+    """Строки ответа /categories (по убыванию числа записей)"""
     sorted_categories = sorted(
         category_stats.items(),
         key=lambda x: x[1],
         reverse=True
     )
     
-    # Формируем ответ
-    categories_text = "🏷️ *Ваши категории:*\n\n"
+    yield "🏷️ *Ваши категории:*"
+    yield ""
     
-    total_notes = len(all_notes)
     for category, count in sorted_categories:
         percentage = (count / total_notes) * 100
         bar_length = int(percentage / 5)  # 5% на один символ
         bar = "█" * bar_length + "░" * (20 - bar_length)
         
-        categories_text += f"*{category}*\n"
-        categories_text += f"`{bar}` {count} зап. ({percentage:.1f}%)\n\n"
-    
-    categories_text += f"*Всего записей:* {total_notes}\n\n"
-    categories_text += "*Использование:*\n"
-    categories_text += "• `/list` - все записи\n"
-    categories_text += f"• `/search категория` - искать в категории\n"
-    categories_text += "• `/set_category ID новая_категория` - изменить"
+        yield f"*{escape_markdown(category)}*"
+        yield f"`{bar}` {count} зап. ({percentage:.1f}%)"
+        yield ""
     
-    await update.message.reply_text(
-        categories_text,
-        parse_mode='Markdown',
-        reply_markup=get_main_keyboard()
-    )
+    yield f"*Всего записей:* {total_notes}"
+    yield ""
+    yield "*Использование:*"
+    yield "• `/list` - все записи"
+    yield "• `/search категория` - искать в категории"
+    yield "• `/set_category ID новая_категория` - изменить"
 
 # 18. ========== Статистика по записям ==========
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -901,7 +922,6 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     from collections import defaultdict, Counter
-    from datetime import datetime, timedelta
     
     # Базовая статистика
     total_notes = len(all_notes)
@@ -921,7 +941,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     top_tags = tag_counts.most_common(3)
     
     # По времени (последние 7 дней)
-    week_ago = datetime.now() - timedelta(days=7)
+    week_ago = utc_now() - timedelta(days=7)
     recent_notes = [n for n in all_notes if n.created_at > week_ago]
     
     # Формируем ответ
@@ -955,8 +975,8 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         avg_per_day = total_notes / max(days_diff, 1)
         
         stats_text += f"\n*Временные метки:*\n"
-        stats_text += f"• Первая запись: {oldest.created_at.strftime('%d.%m.%Y')}\n"
-        stats_text += f"• Последняя запись: {newest.created_at.strftime('%d.%m.%Y')}\n"
+        stats_text += f"• Первая запись: {to_local(oldest.created_at, oldest.user_id).strftime('%d.%m.%Y')}\n"
+        stats_text += f"• Последняя запись: {to_local(newest.created_at, newest.user_id).strftime('%d.%m.%Y')}\n"
         stats_text += f"• Период: {days_diff} дней\n"
         stats_text += f"• В среднем: {avg_per_day:.1f} зап./день"
     
@@ -970,71 +990,237 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def yesterday_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает записи за вчера"""
     user = update.effective_user
-    from datetime import datetime, timedelta
-    
-    yesterday = (datetime.now() - timedelta(days=1)).date()
-    all_notes = note_manager.get_all_notes(user.id)
     
-    yesterday_notes = [
-        note for note in all_notes
-        if note.created_at.date() == yesterday
-    ]
+    yesterday = local_now(user.id).date() - timedelta(days=1)
+    day_start, day_end = local_day_bounds(yesterday, user.id)
     
-    if not yesterday_notes:
+    if not note_manager.get_notes_from_cursor(user.id, None, 1, since=day_start, until=day_end)[0]:
         await update.message.reply_text(
             f"📅 Вчера ({yesterday.strftime('%d.%m.%Y')}) записей не было.",
             reply_markup=get_main_keyboard()
         )
         return
     
-    yesterday_text = f"📅 *Записи за вчера ({yesterday.strftime('%d.%m.%Y')}):*\n\n"
+    await stream_reply(
+        update.message,
+        _yesterday_lines(user.id, yesterday),
+        parse_mode='Markdown',
+        reply_markup=get_main_keyboard()
+    )
+
+
+def _yesterday_lines(user_id: int, day: date):
+    """Строки ответа /yesterday; записи читаются из индекса порциями"""
+    day_start, day_end = local_day_bounds(day, user_id)
+    yield f"📅 *Записи за вчера ({day.strftime('%d.%m.%Y')}):*"
+    yield ""
     
-    for i, note in enumerate(yesterday_notes, 1):
-        time_str = note.created_at.strftime('%H:%M')
+    count = 0
+    for count, note in enumerate(note_manager.iter_notes(user_id, since=day_start, until=day_end), 1):
+        time_str = to_local(note.created_at, note.user_id).strftime('%H:%M')
         preview = note.text[:70] + "..." if len(note.text) > 70 else note.text
         
-        yesterday_text += f"{i}. *{time_str}* - {preview}\n"
+        yield f"{count}. *{time_str}* - {escape_markdown(preview)}"
         
         if note.category != "Общее":
-            yesterday_text += f"   🏷️ {note.category}\n"
+            yield f"   🏷️ {escape_markdown(note.category)}"
         
         if note.is_important:
-            yesterday_text += "   ⭐ Важная\n"
+            yield "   ⭐ Важная"
         
-        yesterday_text += f"   ID: `{note.id[:8]}`\n\n"
+        yield f"   ID: `{note.id[:8]}`"
+        yield ""
+    
+    yield f"*Всего записей:* {count}"
+
+# 20. ========== Напоминания ==========
+_REMINDER_UNITS = {'m': 'minutes', 'м': 'minutes', 'h': 'hours', 'ч': 'hours', 'd': 'days', 'д': 'days'}
+
+REMINDER_HELP = """
+*⏰ Напоминания*
+
+`/set_reminder ID время` - напомнить о записи
+`/set_reminder время` - напомнить о последней записи
+`/set_reminder ID время daily` - повторять (daily, weekdays, weekly)
+`/set_reminder ID cron 0 9 * * 1-5` - повторять по cron-выражению
+`/set_reminder ID off` - отменить напоминание
+`/digest 08:00` - ежедневная сводка важных записей (`/digest off` - отключить)
+`/timezone Europe/Moscow` - часовой пояс для времени напоминаний и сводки
+
+*Формат времени:*
+• `18:30` - сегодня (или завтра, если время прошло)
+• `25.12 09:00` или `25.12.2025 09:00` - в указанный день
+• `+30m`, `+2h`, `+1d` - через 30 минут, 2 часа, 1 день
+"""
+
+
+def _parse_reminder_time(args, now: datetime) -> Optional[datetime]:
+    """Разбирает время напоминания из аргументов команды; None - формат не распознан"""
+    text = " ".join(args).strip().lower()
+    if not text:
+        return None
+    
+    if text.startswith('+'):
+        amount, unit = text[1:-1], text[-1:]
+        if not amount.isdigit() or unit not in _REMINDER_UNITS:
+            return None
+        try:
+            return now + timedelta(**{_REMINDER_UNITS[unit]: int(amount)})
+        except OverflowError:
+            return None
+    
+    for fmt in ('%d.%m.%Y %H:%M', '%H:%M'):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if fmt == '%H:%M':
+            due = datetime.combine(now.date(), parsed.time())
+            return due if due > now else due + timedelta(days=1)
+        return parsed
+    
+    # Дата без года - ближайшая в будущем: в этом году или в следующих
+    # (29.02 ищется до ближайшего високосного года)
+    for year in range(now.year, now.year + 5):
+        try:
+            due = datetime.strptime(f"{text} {year}", '%d.%m %H:%M %Y')
+        except ValueError:
+            continue
+        if due > now:
+            return due
+    return None
+
+
+async def set_reminder_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Устанавливает или отменяет напоминание для записи"""
+    user = update.effective_user
+    args = list(context.args or [])
+    # Время в команде - местное время пользователя
+    now = local_now(user.id)
+    
+    if not args:
+        await update.message.reply_text(REMINDER_HELP, parse_mode='Markdown', reply_markup=get_main_keyboard())
+        return
+    
+    # Первый аргумент - ID записи, если это не время и не правило повторения
+    time_args = args[:-1] if len(args) > 1 and args[-1].lower() in RULE_ALIASES else args
+    note = None
+    # "off", "cron" и время - ключевые слова, а не ID: относятся к последней записи
+    keyword = args[0].lower() in ('cron', 'off')
+    if not keyword and _parse_reminder_time(time_args, now) is None:
+        note = _find_note_by_short_id(user.id, args[0], context)
+        if not note:
+            await update.message.reply_text(
+                f"❌ Запись с ID `{escape_markdown(args[0])}` не найдена.",
+                parse_mode='Markdown'
+            )
+            return
+        args = args[1:]
+    else:
+        recent = note_manager.get_recent_notes(user.id, limit=1)
+        if not recent:
+            await update.message.reply_text(
+                "У вас ещё нет записей. Сначала создайте запись с помощью /new",
+                reply_markup=get_main_keyboard()
+            )
+            return
+        note = recent[0]
     
-    yesterday_text += f"*Всего записей:* {len(yesterday_notes)}"
+    if [arg.lower() for arg in args] == ['off']:
+        note_manager.update_note(user.id, note.id, {'reminder_at': None, 'reminder_rule': None})
+        await update.message.reply_text(f"🔕 Напоминание для записи `{note.id[:8]}` отменено.", parse_mode='Markdown')
+        return
+    
+    # Правило повторения: "cron ..." или слово после времени (daily, будни...)
+    rule = None
+    try:
+        if args and args[0].lower() == 'cron':
+            rule = normalize_rule(" ".join(args[1:]))
+            due = next_occurrence(rule, now, now)
+        else:
+            if len(args) > 1 and args[-1].lower() in RULE_ALIASES:
+                rule = normalize_rule(args[-1])
+                args = args[:-1]
+            due = _parse_reminder_time(args, now)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    
+    if due is None:
+        await update.message.reply_text(REMINDER_HELP, parse_mode='Markdown')
+        return
+    if due <= now:
+        await update.message.reply_text("❌ Время напоминания уже прошло.")
+        return
     
+    note_manager.update_note(user.id, note.id, {'reminder_at': from_local(due, user.id), 'reminder_rule': rule})
+    preview = note.text[:50] + "..." if len(note.text) > 50 else note.text
+    repeat = f" и дальше {describe_rule(rule)}" if rule else ""
     await update.message.reply_text(
-        yesterday_text,
+        f"⏰ Напомню {due.strftime('%d.%m.%Y в %H:%M')}{escape_markdown(repeat)}:\n_{escape_markdown(preview)}_",
         parse_mode='Markdown',
         reply_markup=get_main_keyboard()
     )
 
-# 20. ========== Заглушка для напоминаний ==========
-async def set_reminder_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Устанавливает напоминание для записи (заглушка с пояснением)"""
-    explanation = """
-*⏰ Система напоминаний (в разработке)*
-
-Сейчас вы можете:
-1. Просматривать записи за определённый день (`/today`, `/yesterday`)
-2. Искать записи по тексту (`/search`)
-3. Отмечать важные записи (`/mark_important`)
-
-*Планируемые функции напоминаний:*
-• Установка времени напоминания для записи
-• Ежедневные утренние/вечерние напоминания
-• Напоминания о невыполненных важных задачах
-
-*Альтернатива сейчас:*
-Используйте `/mark_important` для важных записей и 
-просматривайте их регулярно через `/list`.
-"""
+
+async def digest_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Включает, переносит или отключает ежедневную сводку"""
+    user = update.effective_user
+    args = list(context.args or [])
+    
+    if not args:
+        current = user_settings.get(user.id, DIGEST_TIME_KEY)
+        status = f"приходит в *{current}*" if current else "отключена"
+        await update.message.reply_text(
+            f"📋 Ежедневная сводка {status}.\n\n"
+            "Используйте: `/digest 08:00` или `/digest off`",
+            parse_mode='Markdown'
+        )
+        return
+    
+    if args[0].lower() == 'off':
+        user_settings.set(user.id, DIGEST_TIME_KEY, None)
+        await update.message.reply_text("🔕 Ежедневная сводка отключена.")
+        return
+    
+    try:
+        at = parse_digest_time(args[0])
+    except ValueError:
+        await update.message.reply_text("❌ Укажите время в формате ЧЧ:ММ, например `/digest 08:00`", parse_mode='Markdown')
+        return
     
+    user_settings.set(user.id, DIGEST_TIME_KEY, at.strftime('%H:%M'))
     await update.message.reply_text(
-        explanation,
-        parse_mode='Markdown',
+        f"📋 Сводка важных записей будет приходить каждый день в {at.strftime('%H:%M')}.",
+        reply_markup=get_main_keyboard()
+    )
+
+
+async def timezone_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает или меняет часовой пояс пользователя"""
+    user = update.effective_user
+    args = list(context.args or [])
+    
+    if not args:
+        await update.message.reply_text(
+            f"🌍 Ваш часовой пояс: *{escape_markdown(zone_name(user.id))}*\n"
+            f"Местное время: {local_now(user.id).strftime('%d.%m.%Y %H:%M')}\n\n"
+            "Используйте: `/timezone Europe/Moscow` или `/timezone +3`",
+            parse_mode='Markdown'
+        )
+        return
+    
+    name = " ".join(args)
+    try:
+        get_zone(name)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    
+    user_settings.set(user.id, TIMEZONE_KEY, name)
+    await update.message.reply_text(
+        f"🌍 Часовой пояс изменён: {name}\n"
+        f"Местное время: {local_now(user.id).strftime('%d.%m.%Y %H:%M')}",
         reply_markup=get_main_keyboard()
     )
 
@@ -1062,137 +1248,117 @@ async def handle_regular_message(update: Update, context: ContextTypes.DEFAULT_T
 
 
 # 22. ========== INLINE-КНОПКИ: ОБРАБОТЧИК ==========
+# Форматы кнопок объявлены в callbacks.py, здесь к маршрутам привязаны
+# обработчики. Разбор callback_data и отказ для устаревших кнопок - в CallbackRouter.
 
 async def handle_inline_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Главный обработчик ВСЕХ inline-кнопок"""
-    query = update.callback_query
-    await query.answer()  # Убираем "часики" у кнопки
-    
-    data = query.data
-    user = query.from_user
-    
-    logger.info(f"[Helper] Нажата inline-кнопка: {data} пользователем {user.id}")
-    
-    # Разбираем callback_data. Формат: "действие_данные"
-    # Примеры: "view_a1b2c3d4", "page_2", "delete_confirm_a1b2c3d4"
-    
-    # 1. ПРОСМОТР записи
-    if data.startswith('view_'):
-        note_id_short = data[5:]  # Убираем "view_"
-        await _handle_view_button(query, context, note_id_short, user.id)
-    
-    # 2. УДАЛЕНИЕ записи (подтверждение)
-    elif data.startswith('delete_'):
-        # Формат: delete_a1b2c3d4 или delete_confirm_a1b2c3d4
-        parts = data.split('_')
-        note_id_short = parts[1] if len(parts) > 1 else None
-        
-        if len(parts) == 3 and parts[1] == 'confirm':
-            note_id_short = parts[2]
-            await _handle_delete_confirm(query, context, note_id_short, user.id)
-        else:
-            await _handle_delete_button(query, context, note_id_short, user.id)
-    
-    # 3. РЕДАКТИРОВАНИЕ записи
-    elif data.startswith('edit_'):
-        note_id_short = data[5:]
-        await _handle_edit_button(query, context, note_id_short, user.id)
-    
-    # 4. СМЕНА КАТЕГОРИИ
-    elif data.startswith('category_'):
-        # Формат: category_a1b2c3d4 или category_a1b2c3d4_Работа
-        parts = data.split('_')
-        note_id_short = parts[1]
-        
-        if len(parts) == 3:
-            new_category = parts[2]
-            await _handle_category_change(query, context, note_id_short, user.id, new_category)
-        else:
-            await _handle_category_button(query, context, note_id_short, user.id)
-    
-    # 5. ВАЖНОСТЬ записи
-    elif data.startswith('important_'):
-        parts = data.split('_')
-        note_id_short = parts[1]
-        action = parts[2] if len(parts) > 2 else 'toggle'
-        await _handle_important_button(query, context, note_id_short, user.id, action)
-    
-    # 6. ПАГИНАЦИЯ
-    elif data.startswith('page_'):
-        page_num = data[5:]
-        if page_num.isdigit():
-            await _handle_pagination(query, context, int(page_num), user.id)
-    
-    # 7. ВОЗВРАТ В МЕНЮ
-    elif data == 'main_menu':
-        await query.edit_message_text(
-            "🏠 Возвращаюсь в главное меню.",
-            reply_markup=get_main_keyboard()
-        )
-    
-    # 8. ОТМЕНА действия
-    elif data == 'cancel':
-        await query.edit_message_text(
-            "❌ Действие отменено.",
-            reply_markup=get_main_keyboard()
-        )
-        
-    # 9. СОЗДАНИЕ НОВОЙ ЗАПИСИ через кнопку
-    elif data == 'new_note':
-        await query.edit_message_text(
-            "📝 *Создание новой записи*\n\n"
-            "Просто напишите текст записи в чат. Можно добавить теги через #.\n\n"
-            "Или нажмите '❌ Отмена'.",
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("❌ Отмена", callback_data='main_menu')
-            ]])
-        )
-        # Устанавливаем флаг ожидания текста
-        context.user_data['waiting_for_note'] = True
-    
-    # 10. СПИСОК ЗАПИСЕЙ через кнопку
-    elif data == 'list_notes':
-        # Просто вызываем list_entries_command
-        context.args = []  # Сбрасываем аргументы
-        await list_entries_command(update, context)
-        
-    # 11. ЗАПИСИ ЗА СЕГОДНЯ через кнопку
-    elif data == 'today_notes':
-        await today_entries_command(update, context)
-    
-    # 12. СТАТИСТИКА через кнопку
-    elif data == 'stats':
-        await stats_command(update, context)
-    
-    # 13. КАТЕГОРИИ через кнопку
-    elif data == 'categories':
-        await categories_command(update, context)
-    
-    # 14. ПОМОЩЬ через кнопку
-    elif data == 'help':
-        await help_command(update, context)
-    
-    # 15. НОВАЯ КАТЕГОРИЯ (запрос на ввод)
-    elif data.startswith('category_new_'):
-        note_id_short = data[13:]  # Убираем 'category_new_'
-        await query.edit_message_text(
-            f"➕ *Новая категория для записи* `{note_id_short}`\n\n"
-            "Введите название новой категории сообщением в этот чат.",
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("❌ Отмена", callback_data=f"category_{note_id_short}")
-            ]])
-        )
-        # Сохраняем, для какой записи ждём категорию
-        context.user_data['awaiting_category_for'] = note_id_short
+    user = update.callback_query.from_user
+    logger.debug("[Helper] Нажата inline-кнопка: %s пользователем %s", update.callback_query.data, user.id)
+    await callbacks.dispatch(update, context)
+
 
+def _note_button(handler):
+    """Маршрут кнопки записи: (query, context, короткий ID, user_id, *остальные аргументы)"""
+    async def route(update: Update, context: ContextTypes.DEFAULT_TYPE, first_arg, *rest):
+        query = update.callback_query
+        await handler(query, context, first_arg, query.from_user.id, *rest)
+    return route
+
+
+@callbacks.bind('category')
+async def _on_category(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                       note_id_short: str, new_category: Optional[str] = None):
+    """Меню выбора категории или смена категории"""
+    query = update.callback_query
+    if new_category is None:
+        await _handle_category_button(query, context, note_id_short, query.from_user.id)
     else:
-        # Неизвестная кнопка
-        await query.edit_message_text(
-            "Кнопка устарела. Используйте /list для обновления списка.",
-            reply_markup=get_main_keyboard()
-        )
+        await _handle_category_change(query, context, note_id_short, query.from_user.id, new_category)
+
+
+@callbacks.bind('category_new')
+async def _on_category_new(update: Update, context: ContextTypes.DEFAULT_TYPE, note_id_short: str):
+    """Запрос на ввод новой категории"""
+    await safe_edit_message_text(
+        update.callback_query,
+        f"➕ *Новая категория для записи* `{note_id_short}`\n\n"
+        "Введите название новой категории сообщением в этот чат.",
+        parse_mode='Markdown',
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("❌ Отмена", callback_data=callbacks.pack('category', note_id_short))
+        ]])
+    )
+    # Сохраняем, для какой записи ждём категорию
+    context.user_data['awaiting_category_for'] = note_id_short
+
+
+@callbacks.bind('main_menu')
+async def _on_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Возврат в меню"""
+    await safe_edit_message_text(
+        update.callback_query,
+        "🏠 Возвращаюсь в главное меню.",
+        reply_markup=get_main_keyboard()
+    )
+
+
+@callbacks.bind('cancel')
+async def _on_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отмена действия"""
+    await safe_edit_message_text(
+        update.callback_query,
+        "❌ Действие отменено.",
+        reply_markup=get_main_keyboard()
+    )
+
+
+@callbacks.bind('new_note')
+async def _on_new_note(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Создание новой записи через кнопку"""
+    await safe_edit_message_text(
+        update.callback_query,
+        "📝 *Создание новой записи*\n\n"
+        "Просто напишите текст записи в чат. Можно добавить теги через #.\n\n"
+        "Или нажмите '❌ Отмена'.",
+        parse_mode='Markdown',
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("❌ Отмена", callback_data=callbacks.pack('main_menu'))
+        ]])
+    )
+    # Устанавливаем флаг ожидания текста
+    context.user_data['waiting_for_note'] = True
+
+
+@callbacks.bind('list_notes')
+async def _on_list_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Список записей через кнопку"""
+    context.args = []  # Сбрасываем аргументы
+    await list_entries_command(update, context)
+
+
+@callbacks.bind('noop')
+async def _on_noop(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Кнопка-индикатор (номер текущей страницы): ответ на callback уже отправлен"""
+
+
+# Кнопки меню, повторяющие команды
+callbacks.bind('today_notes')(today_entries_command)
+callbacks.bind('stats')(stats_command)
+callbacks.bind('categories')(categories_command)
+callbacks.bind('help')(help_command)
+
+
+async def _on_stale_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Неизвестная или повреждённая кнопка"""
+    await safe_edit_message_text(
+        update.callback_query,
+        "Кнопка устарела. Используйте /list для обновления списка.",
+        reply_markup=get_main_keyboard()
+    )
+
+
+callbacks.on_stale = _on_stale_button
 
 # ========== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ДЛЯ КНОПОК ==========
 
@@ -1201,34 +1367,20 @@ async def _handle_view_button(query, context, note_id_short, user_id):
     """Обработка кнопки 'Просмотреть'"""
     note = _find_note_by_short_id(user_id, note_id_short, context)
     if not note:
-        await query.edit_message_text(
+        await safe_edit_message_text(
+            query,
             f"❌ Запись `{note_id_short}` не найдена.",
             parse_mode='Markdown'
         )
         return
     
-    # Используем существующую логику view_note_command, но адаптируем для inline-сообщения
-    from src.bots.helper_bot.keyboards.inline_keyboards import get_note_actions_keyboard
-    
-    # Форматируем текст как в view_note_command
-    full_text = f"""
-📄 *Запись `{note.id[:8]}`*
-
-*Создана:* {note.created_at.strftime('%d.%m.%Y в %H:%M')}
-*Категория:* {note.category}
-*Важность:* {'⭐ ВАЖНАЯ' if note.is_important else 'Обычная'}
-"""
-    
-    if note.tags:
-        tags_str = " ".join([f"#{t}" for t in note.tags])
-        full_text += f"*Теги:* {tags_str}\n"
-    
-    full_text += f"\n*Текст записи:*\n{note.text}"
+    full_text, reply_markup = render_note(note)
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         full_text,
         parse_mode='Markdown',
-        reply_markup=get_note_actions_keyboard(note.id[:8], note.category)
+        reply_markup=reply_markup
     )
 
 # 24. ========== Подтверждение удаления ==========
@@ -1236,7 +1388,7 @@ async def _handle_delete_button(query, context, note_id_short, user_id):
     """Показать подтверждение удаления"""
     note = _find_note_by_short_id(user_id, note_id_short, context)
     if not note:
-        await query.edit_message_text("Запись не найдена.")
+        await safe_edit_message_text(query, "Запись не найдена.")
         return
     
     from src.bots.helper_bot.keyboards.inline_keyboards import get_confirmation_keyboard
@@ -1246,15 +1398,16 @@ async def _handle_delete_button(query, context, note_id_short, user_id):
     confirmation_text = f"""
 *⚠️ Удалить эту запись?*
 
-`{note.id[:8]}` - {note.created_at.strftime('%d.%m.%Y')}
-Категория: {note.category}
+`{note.id[:8]}` - {to_local(note.created_at, note.user_id).strftime('%d.%m.%Y')}
+Категория: {escape_markdown(note.category)}
 
-*Текст:* {preview}
+*Текст:* {escape_markdown(preview)}
 
 Запись будет удалена безвозвратно.
 """
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         confirmation_text,
         parse_mode='Markdown',
         reply_markup=get_confirmation_keyboard(
@@ -1270,19 +1423,21 @@ async def _handle_delete_confirm(query, context, note_id_short, user_id):
     """Подтверждённое удаление"""
     note = _find_note_by_short_id(user_id, note_id_short, context)
     if not note:
-        await query.edit_message_text("Запись уже удалена.")
+        await safe_edit_message_text(query, "Запись уже удалена.")
         return
     
     success = note_manager.delete_note(user_id, note.id)
     
     if success:
-        await query.edit_message_text(
-            f"✅ Запись `{note.id[:8]}` удалена.\n\n{note.text[:60]}...",
+        await safe_edit_message_text(
+            query,
+            f"✅ Запись `{note.id[:8]}` удалена.\n\n{escape_markdown(note.text[:60])}...",
             parse_mode='Markdown',
             reply_markup=get_main_keyboard()
         )
     else:
-        await query.edit_message_text(
+        await safe_edit_message_text(
+            query,
             "❌ Не удалось удалить запись.",
             reply_markup=get_main_keyboard()
         )
@@ -1292,41 +1447,36 @@ async def _handle_delete_confirm(query, context, note_id_short, user_id):
 
 # 26. =$=$=$=$=$=$=$=$=$=$ КНОПКИ: Обработка кнопок пагинации  =$=$=$=$=$=$=$=$=$=$
 async def _handle_pagination(query, context, page_num, user_id):
-    """Обработка нажатий кнопок пагинации"""
-    # Просто вызываем list_entries_command с нужной страницей
-    # Создаём фиктивный update с callback_query
-    class FakeUpdate:
-        def __init__(self, query):
-            self.callback_query = query
-            self.effective_user = query.from_user
-    
-    fake_update = FakeUpdate(query)
-    
-    # Устанавливаем аргументы для страницы (page_num + 1, так как пользователь видит с 1)
-    context.args = [str(page_num + 1)]
-    
-    await list_entries_command(fake_update, context)
+    """Перелистывание /list: одна страница из индекса, сообщение редактируется на месте"""
+    message_text, reply_markup, _ = render_notes_page(user_id, page_num)
+    await safe_edit_message_text(
+        query,
+        message_text,
+        parse_mode='Markdown',
+        reply_markup=reply_markup
+    )
 
 # 27. =$=$=$=$=$=$=$=$=$=$ КНОПКИ: Редактировать  =$=$=$=$=$=$=$=$=$=$
 async def _handle_edit_button(query, context, note_id_short, user_id):
     """Обработка кнопки 'Редактировать' - запрашивает новый текст"""
     note = _find_note_by_short_id(user_id, note_id_short, context)
     if not note:
-        await query.edit_message_text("Запись не найдена.")
+        await safe_edit_message_text(query, "Запись не найдена.")
         return
     
     # Сохраняем ID записи для редактирования
     context.user_data['editing_note_id'] = note.id
     context.user_data['editing_note_short_id'] = note_id_short
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         f"✏️ *Редактирование записи* `{note_id_short}`\n\n"
-        f"*Текущий текст:*\n{note.text}\n\n"
+        f"*Текущий текст:*\n{escape_markdown(note.text)}\n\n"
         "Введите новый текст сообщением в этот чат.\n"
         "Или нажмите '❌ Отмена'.",
         parse_mode='Markdown',
         reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("❌ Отмена", callback_data=f"view_{note_id_short}")
+            InlineKeyboardButton("❌ Отмена", callback_data=callbacks.pack('view', note_id_short))
         ]])
     )
 
@@ -1335,15 +1485,16 @@ async def _handle_category_button(query, context, note_id_short, user_id):
     """Показывает меню выбора категории для записи"""
     note = _find_note_by_short_id(user_id, note_id_short, context)
     if not note:
-        await query.edit_message_text("Запись не найдена.")
+        await safe_edit_message_text(query, "Запись не найдена.")
         return
     
     # Получаем категории пользователя
     user_categories = note_manager.get_categories(user_id)
     
-    await query.edit_message_text(
+    await safe_edit_message_text(
+        query,
         f"🏷️ *Выбор категории для записи* `{note_id_short}`\n\n"
-        f"Текущая категория: *{note.category}*\n\n"
+        f"Текущая категория: *{escape_markdown(note.category)}*\n\n"
         "Выберите новую категорию:",
         parse_mode='Markdown',
         reply_markup=get_categories_keyboard_for_note(note_id_short, user_categories)
@@ -1354,7 +1505,7 @@ async def _handle_category_change(query, context, note_id_short, user_id, new_ca
     """Меняет категорию записи"""
     note = _find_note_by_short_id(user_id, note_id_short, context)
     if not note:
-        await query.edit_message_text("Запись не найдена.")
+        await safe_edit_message_text(query, "Запись не найдена.")
         return
     
     # Обновляем категорию
@@ -1365,15 +1516,17 @@ async def _handle_category_change(query, context, note_id_short, user_id, new_ca
     )
     
     if success:
-        await query.edit_message_text(
-            f"✅ Категория изменена на: *{new_category}*\n\n"
+        await safe_edit_message_text(
+            query,
+            f"✅ Категория изменена на: *{escape_markdown(new_category)}*\n\n"
             f"Запись: `{note_id_short}`\n"
-            f"Текст: {note.text[:60]}...",
+            f"Текст: {escape_markdown(note.text[:60])}...",
             parse_mode='Markdown',
             reply_markup=get_note_actions_keyboard(note_id_short, new_category)
         )
     else:
-        await query.edit_message_text(
+        await safe_edit_message_text(
+            query,
             "❌ Не удалось изменить категорию.",
             reply_markup=get_note_actions_keyboard(note_id_short, note.category)
         )
@@ -1383,7 +1536,7 @@ async def _handle_important_button(query, context, note_id_short, user_id, actio
     """Переключает важность записи"""
     note = _find_note_by_short_id(user_id, note_id_short, context)
     if not note:
-        await query.edit_message_text("Запись не найдена.")
+        await safe_edit_message_text(query, "Запись не найдена.")
         return
     
     # Определяем новое значение
@@ -1399,15 +1552,17 @@ async def _handle_important_button(query, context, note_id_short, user_id, actio
     if success:
         status = "⭐ ОТМЕЧЕНА КАК ВАЖНАЯ" if new_importance else "➖ Снята отметка важности"
         
-        await query.edit_message_text(
+        await safe_edit_message_text(
+            query,
             f"{status}\n\n"
             f"Запись: `{note_id_short}`\n"
-            f"Текст: {note.text[:60]}...",
+            f"Текст: {escape_markdown(note.text[:60])}...",
             parse_mode='Markdown',
             reply_markup=get_note_actions_keyboard(note_id_short, note.category)
         )
     else:
-        await query.edit_message_text(
+        await safe_edit_message_text(
+            query,
             "❌ Не удалось изменить статус важности.",
             reply_markup=get_note_actions_keyboard(note_id_short, note.category)
         )
@@ -1440,7 +1595,7 @@ async def _handle_new_category_input(update: Update, context: ContextTypes.DEFAU
         context.user_data.pop('awaiting_category_for', None)
         
         await update.message.reply_text(
-            f"✅ Новая категория: *{text}*\n\n"
+            f"✅ Новая категория: *{escape_markdown(text)}*\n\n"
             f"Запись: `{note_id_short}`",
             parse_mode='Markdown',
             reply_markup=get_note_actions_keyboard(note_id_short, text)
@@ -1451,6 +1606,37 @@ async def _handle_new_category_input(update: Update, context: ContextTypes.DEFAU
             reply_markup=get_main_keyboard()
         )
 
+# Маршруты кнопок записей и пагинации (обработчики объявлены выше)
+callbacks.bind('view')(_note_button(_handle_view_button))
+callbacks.bind('delete')(_note_button(_handle_delete_button))
+callbacks.bind('delete_confirm')(_note_button(_handle_delete_confirm))
+callbacks.bind('edit')(_note_button(_handle_edit_button))
+callbacks.bind('important')(_note_button(_handle_important_button))
+callbacks.bind('page')(_note_button(_handle_pagination))
+
+
+@callbacks.bind('list_older')
+async def _on_list_older(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor: Cursor):
+    """«Вперёд» в /list: записи старше последней показанной"""
+    await _show_list_from_cursor(update.callback_query, cursor, newer=False)
+
+
+@callbacks.bind('list_newer')
+async def _on_list_newer(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor: Cursor):
+    """«Назад» в /list: записи новее первой показанной"""
+    await _show_list_from_cursor(update.callback_query, cursor, newer=True)
+
+
+async def _show_list_from_cursor(query, cursor: Cursor, newer: bool):
+    message_text, reply_markup = render_notes_from_cursor(query.from_user.id, cursor, newer=newer)
+    await safe_edit_message_text(
+        query,
+        message_text,
+        parse_mode='Markdown',
+        reply_markup=reply_markup
+    )
+
+
 # 45. ========== РЕГИСТРАЦИЯ ОБРАБОТЧИКОВ ==========
 def get_handlers():
     """Возвращает все обработчики для регистрации"""
@@ -1470,5 +1656,7 @@ def get_handlers():
         CommandHandler("categories", categories_command),   # <-- ДОБАВИТЬ
         CommandHandler("stats", stats_command),             # <-- ДОБАВИТЬ
         CommandHandler("set_reminder", set_reminder_command),
+        CommandHandler("digest", digest_command),
+        CommandHandler("timezone", timezone_command),
         MessageHandler(filters.TEXT & ~filters.COMMAND, handle_note_text),
     ]
\ No newline at end of file
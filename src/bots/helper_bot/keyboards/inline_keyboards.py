@@ -6,25 +6,29 @@ Inline-клавиатуры для Helper Bot.
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from typing import List, Optional
 
+from src.core.cursor import encode_cursor
+from src.bots.helper_bot.callbacks import callbacks
+
 def get_main_menu_keyboard():
     """Главное меню с inline-кнопками (альтернатива reply-клавиатуре)"""
     keyboard = [
         [
-            InlineKeyboardButton("📝 Новая запись", callback_data='new_note'),
-            InlineKeyboardButton("📖 Мои записи", callback_data='list_notes')
+            InlineKeyboardButton("📝 Новая запись", callback_data=callbacks.pack('new_note')),
+            InlineKeyboardButton("📖 Мои записи", callback_data=callbacks.pack('list_notes'))
         ],
         [
-            InlineKeyboardButton("📅 Сегодня", callback_data='today_notes'),
-            InlineKeyboardButton("📊 Статистика", callback_data='stats')
+            InlineKeyboardButton("📅 Сегодня", callback_data=callbacks.pack('today_notes')),
+            InlineKeyboardButton("📊 Статистика", callback_data=callbacks.pack('stats'))
         ],
         [
-            InlineKeyboardButton("🏷️ Категории", callback_data='categories'),
-            InlineKeyboardButton("🆘 Помощь", callback_data='help')
+            InlineKeyboardButton("🏷️ Категории", callback_data=callbacks.pack('categories')),
+            InlineKeyboardButton("🆘 Помощь", callback_data=callbacks.pack('help'))
         ]
     ]
     return InlineKeyboardMarkup(keyboard)
 
-def get_notes_list_keyboard(notes: List, page: int = 0, total_pages: int = 1):
+def get_notes_list_keyboard(notes: List, page: int = 0, total_pages: int = 1,
+                            has_newer: Optional[bool] = None, has_older: Optional[bool] = None):
     """
     Клавиатура для списка записей (/list).
     Каждая запись получает кнопки действий.
@@ -33,7 +37,14 @@ def get_notes_list_keyboard(notes: List, page: int = 0, total_pages: int = 1):
         notes: Список объектов Note для текущей страницы
         page: Текущая страница (0-based)
         total_pages: Всего страниц
+        has_newer: Есть ли записи новее страницы (по умолчанию page > 0)
+        has_older: Есть ли записи старше страницы (по умолчанию не последняя страница)
     """
+    if has_newer is None:
+        has_newer = page > 0
+    if has_older is None:
+        has_older = page < total_pages - 1
+    
     keyboard = []
     
     # Кнопки для каждой записи
@@ -45,40 +56,44 @@ def get_notes_list_keyboard(notes: List, page: int = 0, total_pages: int = 1):
         text_preview = note.text[:25] + "..." if len(note.text) > 25 else note.text
         main_button = InlineKeyboardButton(
             f"{icon}{text_preview}",
-            callback_data=f"view_{note.id[:8]}"
+            callback_data=callbacks.pack('view', note.id[:8])
         )
         
         # Кнопки действий в строке под записью
         action_buttons = [
-            InlineKeyboardButton("👁️", callback_data=f"view_{note.id[:8]}"),
-            InlineKeyboardButton("✏️", callback_data=f"edit_{note.id[:8]}"),
-            InlineKeyboardButton("🏷️", callback_data=f"category_{note.id[:8]}"),
+            InlineKeyboardButton("👁️", callback_data=callbacks.pack('view', note.id[:8])),
+            InlineKeyboardButton("✏️", callback_data=callbacks.pack('edit', note.id[:8])),
+            InlineKeyboardButton("🏷️", callback_data=callbacks.pack('category', note.id[:8])),
             InlineKeyboardButton("⭐" if not note.is_important else "➖", 
-                               callback_data=f"important_{note.id[:8]}_toggle"),
-            InlineKeyboardButton("🗑️", callback_data=f"delete_{note.id[:8]}")
+                               callback_data=callbacks.pack('important', note.id[:8], 'toggle')),
+            InlineKeyboardButton("🗑️", callback_data=callbacks.pack('delete', note.id[:8]))
         ]
         
         keyboard.append([main_button])
         keyboard.append(action_buttons)
     
     # Пагинация (если есть несколько страниц)
-    if total_pages > 1:
+    # Кнопки несут курсор крайней записи страницы: добавленные или удалённые
+    # после отрисовки записи не сдвигают следующую страницу
+    if total_pages > 1 and notes:
         nav_buttons = []
-        if page > 0:
-            nav_buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"page_{page-1}"))
+        if has_newer:
+            newer_cursor = encode_cursor(notes[0].created_at, notes[0].id)
+            nav_buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=callbacks.pack('list_newer', newer_cursor)))
         
-        nav_buttons.append(InlineKeyboardButton(f"{page+1}/{total_pages}", callback_data='current_page'))
+        nav_buttons.append(InlineKeyboardButton(f"{page+1}/{total_pages}", callback_data=callbacks.pack('noop')))
         
-        if page < total_pages - 1:
-            nav_buttons.append(InlineKeyboardButton("Вперёд ▶️", callback_data=f"page_{page+1}"))
+        if has_older:
+            older_cursor = encode_cursor(notes[-1].created_at, notes[-1].id)
+            nav_buttons.append(InlineKeyboardButton("Вперёд ▶️", callback_data=callbacks.pack('list_older', older_cursor)))
         
         if nav_buttons:
             keyboard.append(nav_buttons)
     
     # Кнопки общего назначения
     keyboard.append([
-        InlineKeyboardButton("📝 Новая запись", callback_data='new_note'),
-        InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')
+        InlineKeyboardButton("📝 Новая запись", callback_data=callbacks.pack('new_note')),
+        InlineKeyboardButton("🏠 Главное меню", callback_data=callbacks.pack('main_menu'))
     ])
     
     return InlineKeyboardMarkup(keyboard)
@@ -93,16 +108,16 @@ def get_note_actions_keyboard(note_id_short: str, current_category: str = "Об
     """
     keyboard = [
         [
-            InlineKeyboardButton("✏️ Изменить текст", callback_data=f"edit_{note_id_short}"),
-            InlineKeyboardButton("🏷️ Сменить категорию", callback_data=f"category_{note_id_short}")
+            InlineKeyboardButton("✏️ Изменить текст", callback_data=callbacks.pack('edit', note_id_short)),
+            InlineKeyboardButton("🏷️ Сменить категорию", callback_data=callbacks.pack('category', note_id_short))
         ],
         [
-            InlineKeyboardButton("⭐ Важная/Обычная", callback_data=f"important_{note_id_short}_toggle"),
-            InlineKeyboardButton("🗑️ Удалить", callback_data=f"delete_{note_id_short}")
+            InlineKeyboardButton("⭐ Важная/Обычная", callback_data=callbacks.pack('important', note_id_short, 'toggle')),
+            InlineKeyboardButton("🗑️ Удалить", callback_data=callbacks.pack('delete', note_id_short))
         ],
         [
-            InlineKeyboardButton("📋 К списку записей", callback_data='list_notes'),
-            InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')
+            InlineKeyboardButton("📋 К списку записей", callback_data=callbacks.pack('list_notes')),
+            InlineKeyboardButton("🏠 Главное меню", callback_data=callbacks.pack('main_menu'))
         ]
     ]
     return InlineKeyboardMarkup(keyboard)
@@ -121,18 +136,18 @@ def get_confirmation_keyboard(action: str, note_id: str,
     """
     keyboard = [
         [
-            InlineKeyboardButton(yes_text, callback_data=f"{action}_confirm_{note_id}"),
-            InlineKeyboardButton(no_text, callback_data='cancel')
+            InlineKeyboardButton(yes_text, callback_data=callbacks.pack(f"{action}_confirm", note_id)),
+            InlineKeyboardButton(no_text, callback_data=callbacks.pack('cancel'))
         ]
     ]
     
     if action == 'delete':
         keyboard.append([
-            InlineKeyboardButton("👁️ Просмотреть запись", callback_data=f"view_{note_id}")
+            InlineKeyboardButton("👁️ Просмотреть запись", callback_data=callbacks.pack('view', note_id))
         ])
     
     keyboard.append([
-        InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')
+        InlineKeyboardButton("🏠 Главное меню", callback_data=callbacks.pack('main_menu'))
     ])
     
     return InlineKeyboardMarkup(keyboard)
@@ -149,19 +164,24 @@ def get_categories_keyboard_for_note(note_id_short: str, user_categories: List[s
     
     # Показываем популярные категории (первые 6)
     for category in user_categories[:6]:
+        try:
+            callback_data = callbacks.pack('category', note_id_short, category)
+        except ValueError:
+            # Слишком длинное название не помещается в 64 байта callback_data
+            continue
         keyboard.append([
-            InlineKeyboardButton(f"📁 {category}", callback_data=f"category_{note_id_short}_{category}")
+            InlineKeyboardButton(f"📁 {category}", callback_data=callback_data)
         ])
     
     # Кнопка для ввода новой категории
     keyboard.append([
-        InlineKeyboardButton("➕ Новая категория", callback_data=f"category_new_{note_id_short}")
+        InlineKeyboardButton("➕ Новая категория", callback_data=callbacks.pack('category_new', note_id_short))
     ])
     
     # Кнопки отмены
     keyboard.append([
-        InlineKeyboardButton("👁️ Просмотреть запись", callback_data=f"view_{note_id_short}"),
-        InlineKeyboardButton("❌ Отмена", callback_data='cancel')
+        InlineKeyboardButton("👁️ Просмотреть запись", callback_data=callbacks.pack('view', note_id_short)),
+        InlineKeyboardButton("❌ Отмена", callback_data=callbacks.pack('cancel'))
     ])
     
     return InlineKeyboardMarkup(keyboard)
@@ -174,7 +194,7 @@ def get_pagination_keyboard(current_page: int, total_pages: int,
     Args:
         current_page: Текущая страница (0-based)
         total_pages: Всего страниц
-        base_callback: Базовое имя для callback_data
+        base_callback: Маршрут кнопок страниц (см. callbacks.py)
     """
     keyboard = []
     
@@ -182,7 +202,7 @@ def get_pagination_keyboard(current_page: int, total_pages: int,
         buttons = []
         
         if current_page > 0:
-            buttons.append(InlineKeyboardButton("◀️", callback_data=f"{base_callback}_{current_page-1}"))
+            buttons.append(InlineKeyboardButton("◀️", callback_data=callbacks.pack(base_callback, current_page - 1)))
         
         # Показываем номера страниц вокруг текущей
         start_page = max(0, current_page - 2)
@@ -190,17 +210,17 @@ def get_pagination_keyboard(current_page: int, total_pages: int,
         
         for p in range(start_page, end_page):
             if p == current_page:
-                buttons.append(InlineKeyboardButton(f"·{p+1}·", callback_data='current'))
+                buttons.append(InlineKeyboardButton(f"·{p+1}·", callback_data=callbacks.pack('noop')))
             else:
-                buttons.append(InlineKeyboardButton(str(p+1), callback_data=f"{base_callback}_{p}"))
+                buttons.append(InlineKeyboardButton(str(p+1), callback_data=callbacks.pack(base_callback, p)))
         
         if current_page < total_pages - 1:
-            buttons.append(InlineKeyboardButton("▶️", callback_data=f"{base_callback}_{current_page+1}"))
+            buttons.append(InlineKeyboardButton("▶️", callback_data=callbacks.pack(base_callback, current_page + 1)))
         
         keyboard.append(buttons)
     
     keyboard.append([
-        InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')
+        InlineKeyboardButton("🏠 Главное меню", callback_data=callbacks.pack('main_menu'))
     ])
     
     return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Готовые представления Helper Bot: текст сообщения и inline-клавиатура.
+Отрисованные пары (text, markup) кэшируются и сбрасываются при
+изменении записей пользователя (события NoteManager).
+"""
+
+from typing import List, Tuple
+
+from telegram import InlineKeyboardMarkup
+
+from src.core.cache import LRUCache
+from src.core.cursor import Cursor
+from src.core.message_builder import escape_markdown
+from src.core.events import NoteEvent
+from src.core.models import Note
+from src.core.note_index import note_key
+from src.core.note_manager import note_manager
+from src.core.timezones import TIMEZONE_KEY, to_local
+from src.core.user_settings import user_settings
+from src.bots.helper_bot.keyboards.inline_keyboards import (
+    get_notes_list_keyboard,
+    get_note_actions_keyboard
+)
+
+# Записей на странице /list
+NOTES_PER_PAGE = 5
+
+# Отрисованные сообщения: ключи помечены тегом user_id
+_views = LRUCache(maxsize=5000, ttl=3600, name="helper_views")
+
+
+def _on_note_event(event: NoteEvent):
+    """Подписчик: изменение записей пользователя сбрасывает его представления"""
+    _views.invalidate_tag(event.user_id)
+
+
+note_manager.events.subscribe(_on_note_event)
+
+
+def _on_setting(user_id: int, key: str, before, after):
+    """Подписчик: смена часового пояса меняет время в карточках пользователя"""
+    if key == TIMEZONE_KEY:
+        _views.invalidate_tag(user_id)
+
+
+user_settings.subscribe(_on_setting)
+
+
+def render_note(note: Note) -> Tuple[str, InlineKeyboardMarkup]:
+    """Карточка записи с кнопками действий"""
+    key = ('note', note.id, note.updated_at)
+    cached = _views.get(key)
+    if cached is not None:
+        return cached
+
+    text = f"""
+📄 *Запись `{note.id[:8]}`*
+
+*Создана:* {to_local(note.created_at, note.user_id).strftime('%d.%m.%Y в %H:%M')}
+*Изменена:* {to_local(note.updated_at, note.user_id).strftime('%d.%m.%Y в %H:%M')}
+*Категория:* {escape_markdown(note.category)}
+*Важность:* {'⭐ ВАЖНАЯ' if note.is_important else 'Обычная'}
+"""
+
+    if note.tags:
+        tags_str = " ".join([f"#{escape_markdown(t)}" for t in note.tags])
+        text += f"*Теги:* {tags_str}\n"
+
+    if note.reminder_at:
+        reminder_str = to_local(note.reminder_at, note.user_id).strftime('%d.%m.%Y в %H:%M')
+        text += f"*⏰ Напоминание:* {reminder_str}\n"
+
+    if note.comment:
+        text += f"*💬 Комментарий:* {escape_markdown(note.comment)}\n"
+
+    text += f"\n*Текст записи:*\n{escape_markdown(note.text)}"
+
+    rendered = (text, get_note_actions_keyboard(note.id[:8], note.category))
+    _views.set(key, rendered, tag=note.user_id)
+    return rendered
+
+
+def _render_list(page_notes: List[Note], offset: int, total: int) -> Tuple[str, InlineKeyboardMarkup]:
+    """Текст и клавиатура страницы списка, начинающейся с позиции offset"""
+    total_pages = max(1, (total + NOTES_PER_PAGE - 1) // NOTES_PER_PAGE)
+    page = min((offset + NOTES_PER_PAGE - 1) // NOTES_PER_PAGE, total_pages - 1)
+
+    text = f"📋 *Ваши записи* (страница {page+1}/{total_pages})\n\n"
+    text += f"Всего записей: *{total}*\n"
+
+    if total_pages > 1:
+        text += "Используйте кнопки ниже для навигации.\n"
+
+    text += "\n┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈┈\n"
+
+    markup = get_notes_list_keyboard(
+        notes=page_notes, page=page, total_pages=total_pages,
+        has_newer=offset > 0, has_older=offset + len(page_notes) < total
+    )
+    return text, markup
+
+
+def render_notes_page(user_id: int, page: int) -> Tuple[str, InlineKeyboardMarkup, int]:
+    """
+    Страница списка записей по номеру (/list N и старые кнопки page_N).
+
+    Args:
+        user_id: ID пользователя
+        page: Номер страницы (с 0); номер за пределами списка приводится к последней
+
+    Returns:
+        (текст, клавиатура, фактический номер страницы)
+    """
+    total = len(note_manager.get_all_notes(user_id))
+    total_pages = max(1, (total + NOTES_PER_PAGE - 1) // NOTES_PER_PAGE)
+    page = min(max(0, page), total_pages - 1)
+
+    key = ('page', user_id, page)
+    cached = _views.get(key)
+    if cached is not None:
+        return (*cached, page)
+
+    # Одна страница из упорядоченного индекса (новые сверху)
+    page_notes, total = note_manager.get_notes_page(user_id, page, NOTES_PER_PAGE)
+    rendered = _render_list(page_notes, page * NOTES_PER_PAGE, total)
+    _views.set(key, rendered, tag=user_id)
+    return (*rendered, page)
+
+
+def render_notes_from_cursor(user_id: int, cursor: Cursor,
+                             newer: bool = False) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Страница списка записей рядом с курсором (кнопки «Вперёд/Назад»).
+
+    Args:
+        user_id: ID пользователя
+        cursor: Крайняя запись предыдущей страницы
+        newer: True - страница перед курсором («Назад»), иначе после него
+    """
+    key = ('cursor', user_id, cursor, newer)
+    cached = _views.get(key)
+    if cached is not None:
+        return cached
+
+    page_notes, _ = note_manager.get_notes_from_cursor(user_id, cursor, NOTES_PER_PAGE, newer=newer)
+    if not page_notes:
+        # В этом направлении записей больше нет (например, их удалили) - первая страница
+        text, markup, _ = render_notes_page(user_id, 0)
+        return text, markup
+
+    offset = note_manager.count_newer_notes(user_id, note_key(page_notes[0]))
+    total = len(note_manager.get_all_notes(user_id))
+    rendered = _render_list(page_notes, offset, total)
+    _views.set(key, rendered, tag=user_id)
+    return rendered
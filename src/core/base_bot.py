@@ -4,19 +4,39 @@
 """
 
 import asyncio
+import functools
+import itertools
 import logging
 import os
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional
 
 # ВАЖНО: Импортируем telegram для обработки исключений
 import telegram
 from telegram import Update
-from telegram.ext import Application, ApplicationBuilder, ContextTypes
-from telegram.request import HTTPXRequest
+from telegram.ext import (
+    Application,
+    ApplicationBuilder,
+    ContextTypes,
+    CommandHandler,
+    CallbackQueryHandler,
+    ConversationHandler
+)
+from telegram.request import BaseRequest, HTTPXRequest
+
+from src.core.message_builder import split_message
+from src.core.metrics import HandlerMetrics, callback_metric_key
+from src.core.persistence import SQLitePersistence
+from src.utils.structured_logging import log_context, log_event
 
 logger = logging.getLogger(__name__)
 
+# Сколько ждать обработки принятых обновлений при остановке (секунды)
+DRAIN_TIMEOUT = 10.0
+# Как часто проверять, обработаны ли обновления
+DRAIN_POLL_INTERVAL = 0.05
+
 class BaseBot(ABC):
     """Абстрактный базовый класс для Telegram ботов"""
     
@@ -42,6 +62,19 @@ class BaseBot(ABC):
             'errors': 0,
             'start_time': None
         }
+        
+        # Метрики по каждому обработчику (вызовы, ошибки, задержки)
+        self.handler_metrics = HandlerMetrics()
+        
+        # Фабрика BaseRequest для запросов к API (например, через процесс-шлюз при шардировании)
+        self.request_factory: Optional[Callable[[], BaseRequest]] = None
+        # Получать ли обновления самому (long polling); без него обновления
+        # передаются в application.update_queue извне
+        self.use_polling = True
+        
+        # Плавная остановка: сколько обновлений сейчас обрабатывается
+        self.in_flight = 0
+        self.drain_timeout = float(config.get('drain_timeout', DRAIN_TIMEOUT))
 
     async def start(self):
         """Запуск бота с обработкой таймаутов"""
@@ -49,6 +82,11 @@ class BaseBot(ABC):
             logger.warning(f"Бот {self.name} уже запущен")
             return
         
+        if self.application is not None:
+            # Приложение осталось после restart(): запускаем его же
+            await self._resume()
+            return
+        
         max_retries = 3
         retry_delay = 5  # секунд
         
@@ -59,15 +97,29 @@ class BaseBot(ABC):
                 # Создаём приложение с увеличенными таймаутами
                 builder = ApplicationBuilder().token(self.token)
                 
-                # Настройка таймаутов
-                builder = (builder
-                    .connect_timeout(30.0)   # Таймаут подключения: 30 секунд
-                    .read_timeout(30.0)      # Таймаут чтения: 30 секунд
-                    .write_timeout(30.0)     # Таймаут записи: 30 секунд
-                    .pool_timeout(30.0))     # Таймаут пула соединений: 30 секунд
+                if self.request_factory:
+                    # Таймауты задаёт сама фабрика запросов
+                    builder = builder.request(self.request_factory())
+                else:
+                    # Настройка таймаутов
+                    builder = (builder
+                        .connect_timeout(30.0)   # Таймаут подключения: 30 секунд
+                        .read_timeout(30.0)      # Таймаут чтения: 30 секунд
+                        .write_timeout(30.0)     # Таймаут записи: 30 секунд
+                        .pool_timeout(30.0))     # Таймаут пула соединений: 30 секунд
+                
+                if not self.use_polling:
+                    builder = builder.updater(None)
+                
+                # Сохранение user_data и состояний диалогов между перезапусками
+                if self.config.get('state_path'):
+                    builder = builder.persistence(SQLitePersistence(
+                        self.config['state_path'],
+                        update_interval=float(self.config.get('state_update_interval', 5.0))
+                    ))
                 
                 # Настройка прокси (если указана в конфиге)
-                if 'proxy_url' in self.config:
+                if 'proxy_url' in self.config and not self.request_factory:
                     request = HTTPXRequest(proxy_url=self.config['proxy_url'])
                     builder = builder.request(request)
                     logger.info(f"Используется прокси: {self.config['proxy_url']}")
@@ -93,7 +145,8 @@ class BaseBot(ABC):
                             raise
                 
                 await self.application.start()
-                await self.application.updater.start_polling()
+                if self.application.updater:
+                    await self.application.updater.start_polling()
                 
                 self.is_running = True
                 self.metrics['start_time'] = asyncio.get_event_loop().time()
@@ -108,10 +161,9 @@ class BaseBot(ABC):
                 if self.application:
                     try:
                         await self.application.stop()
-                        await self.application.shutdown()
                     except:
                         pass
-                    self.application = None
+                    await self._dispose_application()
                 
                 if attempt < max_retries - 1:
                     logger.info(f"Повторная попытка через {retry_delay} секунд...")
@@ -128,16 +180,19 @@ class BaseBot(ABC):
                 if self.application:
                     try:
                         await self.application.stop()
-                        await self.application.shutdown()
                     except:
                         pass
-                    self.application = None
+                    await self._dispose_application()
                 
                 raise
 
     async def stop(self):
-        """Остановка бота"""
+        """Остановка бота: drain(), затем закрытие приложения и соединений"""
         if not self.is_running:
+            if self.application is not None:
+                # Остановлен посреди restart(): осталось закрыть приложение
+                await self._dispose_application()
+                return
             logger.warning(f"Бот {self.name} уже остановлен")
             return
         
@@ -145,10 +200,9 @@ class BaseBot(ABC):
             logger.info(f"Остановка бота: {self.name}")
             
             if self.application:
-                await self.application.updater.stop()
-                await self.application.stop()
-                await self.application.shutdown()
-                self.application = None
+                await self.drain()
+                await self._stop_application()
+                await self._dispose_application()
             
             self.is_running = False
             logger.info(f"✅ Бот {self.name} остановлен")
@@ -157,6 +211,100 @@ class BaseBot(ABC):
             logger.error(f"Ошибка при остановке бота {self.name}: {e}", exc_info=True)
             raise
     
+    async def restart(self):
+        """
+        Тёплый перезапуск: drain() и повторный запуск того же Application.
+        Пул HTTP-соединений, обработчики и persistence не пересоздаются,
+        загруженные хранилища и индексы планировщиков остаются в памяти.
+        """
+        if not self.is_running or self.application is None:
+            await self.stop()
+            await self.start()
+            return
+        
+        logger.info(f"Перезапуск бота: {self.name}")
+        await self.drain()
+        await self._stop_application()
+        self.is_running = False
+        await self.start()
+    
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Плавное завершение работы перед остановкой:
+        1. новые обновления не принимаются (polling остановлен);
+        2. принятые обновления обрабатываются не дольше timeout;
+        3. исходящие отправки дожидаются (on_drain() в дочерних классах);
+        4. состояние пользователей записывается на диск.
+        Записи и вопросы сохраняются на диск сразу при изменении.
+        
+        Returns:
+            True, если все принятые обновления обработаны в срок
+        """
+        if not self.application:
+            return True
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.drain_timeout if timeout is None else timeout)
+        
+        updater = self.application.updater
+        if updater and updater.running:
+            await updater.stop()
+        
+        update_queue = self.application.update_queue
+        while (update_queue.qsize() or self.in_flight) and loop.time() < deadline:
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+        drained = not update_queue.qsize() and not self.in_flight
+        if not drained:
+            logger.warning(
+                f"Бот {self.name}: не обработано к сроку - в очереди {update_queue.qsize()}, "
+                f"в обработке {self.in_flight}"
+            )
+        
+        await self.on_drain(max(0.0, deadline - loop.time()))
+        
+        persistence = self.application.persistence
+        if persistence and self.application.running:
+            await self.application.update_persistence()
+            await persistence.flush()
+        
+        logger.info(f"Бот {self.name}: приём обновлений остановлен, очередь {'обработана' if drained else 'прервана'}")
+        return drained
+    
+    async def on_drain(self, timeout: float):
+        """
+        Дожидается исходящих отправок бота при остановке.
+        Переопределите в дочерних классах (фоновые рассылки, очереди отправки).
+        """
+    
+    async def _stop_application(self):
+        """Останавливает обработку обновлений (обработчики дольше drain_timeout прерываются)"""
+        if not self.application.running:
+            return
+        try:
+            await asyncio.wait_for(self.application.stop(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Бот {self.name}: обработчики не завершились за {self.drain_timeout} с")
+    
+    async def _dispose_application(self):
+        """Закрывает приложение: HTTP-соединения и файл состояния"""
+        persistence = self.application.persistence
+        try:
+            await self.application.shutdown()
+        except Exception as e:
+            logger.warning(f"Ошибка при закрытии приложения {self.name}: {e}")
+        if isinstance(persistence, SQLitePersistence):
+            persistence.close()
+        self.application = None
+    
+    async def _resume(self):
+        """Повторный запуск остановленного restart() приложения"""
+        await self.application.start()
+        if self.application.updater:
+            await self.application.updater.start_polling()
+        self.is_running = True
+        self.metrics['start_time'] = asyncio.get_event_loop().time()
+        logger.info(f"✅ Бот {self.name} перезапущен без пересоздания приложения")
+    
     async def setup(self):
         """
         Настройка бота.
@@ -173,6 +321,7 @@ class BaseBot(ABC):
         # Регистрируем обработчики из дочернего класса
         handlers = self.get_handlers()
         for handler in handlers:
+            self._instrument_handler(handler)
             self.application.add_handler(handler)
         
         # Обработчик ошибок
@@ -180,6 +329,73 @@ class BaseBot(ABC):
         
         logger.debug(f"Зарегистрировано обработчиков для {self.name}: {len(handlers)}")
     
+    def _instrument_handler(self, handler):
+        """
+        Оборачивает callback обработчика для сбора метрик.
+        Для ConversationHandler оборачиваются все вложенные обработчики.
+        """
+        if isinstance(handler, ConversationHandler):
+            for inner in itertools.chain(
+                handler.entry_points,
+                *handler.states.values(),
+                handler.fallbacks
+            ):
+                self._instrument_handler(inner)
+            return
+        
+        callback = getattr(handler, 'callback', None)
+        if callback is None or getattr(callback, '_instrumented', False):
+            return
+        
+        # Ключ метрики: команда известна заранее, префикс callback - только при вызове
+        is_command = isinstance(handler, CommandHandler)
+        if is_command:
+            static_key = "/" + ",".join(sorted(handler.commands))
+        elif isinstance(handler, CallbackQueryHandler):
+            static_key = None
+        else:
+            static_key = f"message:{getattr(callback, '__name__', type(handler).__name__)}"
+        
+        handler_metrics = self.handler_metrics
+        bot_metrics = self.metrics
+        bot_name = self.name
+        bot = self
+        
+        @functools.wraps(callback)
+        async def instrumented(update, context):
+            if static_key is not None:
+                key = static_key
+            else:
+                query = getattr(update, 'callback_query', None)
+                key = callback_metric_key(query.data if query else None)
+            
+            if is_command:
+                bot_metrics['commands_processed'] += 1
+            
+            user = getattr(update, 'effective_user', None)
+            user_id = user.id if user else None
+            started = time.perf_counter()
+            failed = False
+            bot.in_flight += 1
+            with log_context(bot=bot_name, handler=key, user_id=user_id):
+                try:
+                    return await callback(update, context)
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    bot.in_flight -= 1
+                    elapsed = time.perf_counter() - started
+                    handler_metrics.observe(key, elapsed, error=failed)
+                    log_event(
+                        logger, "handler.done", "%s %s: %.1f мс", bot_name, key, elapsed * 1000,
+                        level=logging.WARNING if failed else logging.INFO,
+                        latency_ms=round(elapsed * 1000, 2), error=failed
+                    )
+        
+        instrumented._instrumented = True
+        handler.callback = instrumented
+    
     @abstractmethod
     def get_handlers(self):
         """
@@ -222,21 +438,31 @@ class BaseBot(ABC):
             **self.metrics,
             'name': self.name,
             'is_running': self.is_running,
+            'in_flight': self.in_flight,
             'uptime': (asyncio.get_event_loop().time() - self.metrics['start_time']) 
-                     if self.metrics['start_time'] else 0
+                     if self.metrics['start_time'] else 0,
+            'handlers': self.handler_metrics.snapshot()
         }
     
     async def send_message(self, chat_id: int, text: str, **kwargs):
-        """Отправить сообщение (обёртка)"""
+        """
+        Отправить сообщение (обёртка).
+        Текст длиннее лимита Telegram отправляется несколькими сообщениями,
+        клавиатура прикрепляется к последнему.
+        """
         if not self.application or not self.is_running:
             raise RuntimeError("Бот не запущен")
         
         try:
-            await self.application.bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                **kwargs
-            )
+            chunks = split_message(text)
+            reply_markup = kwargs.pop('reply_markup', None)
+            for i, chunk in enumerate(chunks):
+                await self.application.bot.send_message(
+                    chat_id=chat_id,
+                    text=chunk,
+                    reply_markup=reply_markup if i == len(chunks) - 1 else None,
+                    **kwargs
+                )
             self.metrics['messages_processed'] += 1
             return True
         except Exception as e:
@@ -8,9 +8,15 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 
 from src.core.base_bot import BaseBot
+from src.core.metrics import collect_components
 
 logger = logging.getLogger(__name__)
 
+# Режимы работы менеджера
+RUN_MODE_INPROCESS = "inprocess"        # все боты в одном процессе (для разработки)
+RUN_MODE_MULTIPROCESS = "multiprocess"  # каждая группа ботов в своём процессе
+RUN_MODES = (RUN_MODE_INPROCESS, RUN_MODE_MULTIPROCESS)
+
 class BotManager:
     """Менеджер для запуска и управления несколькими ботами"""
     
@@ -18,6 +24,30 @@ class BotManager:
         self.bots: Dict[str, BaseBot] = {}
         self.is_running = False
         self.start_time = None
+        self.metrics_server = None
+        self.loop_monitor = None
+        
+        # Многопроцессный режим
+        self.run_mode = RUN_MODE_INPROCESS
+        self.supervisor = None
+        self.worker_options: Dict[str, Any] = {}
+    
+    def set_run_mode(self, mode: str, **worker_options):
+        """
+        Выбор режима работы.
+        
+        Args:
+            mode: 'inprocess' или 'multiprocess'
+            worker_options: Настройки рабочих процессов (log_level, logging, loop_monitor)
+        """
+        if mode not in RUN_MODES:
+            raise ValueError(f"Неизвестный режим работы: {mode}. Допустимые: {', '.join(RUN_MODES)}")
+        if self.is_running:
+            raise RuntimeError("Нельзя сменить режим работающего менеджера")
+        
+        self.run_mode = mode
+        self.worker_options = worker_options
+        logger.info(f"Режим работы менеджера ботов: {mode}")
     
     def register_bot(self, bot: BaseBot):
         """Регистрация бота в менеджере"""
@@ -37,6 +67,10 @@ class BotManager:
         self.start_time = datetime.now()
         self.is_running = True
         
+        if self.run_mode == RUN_MODE_MULTIPROCESS:
+            await self._start_workers()
+            return
+        
         # Запускаем все боты параллельно
         tasks = [bot.start() for bot in self.bots.values()]
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -60,6 +94,13 @@ class BotManager:
         
         logger.info("Остановка всех ботов...")
         
+        if self.supervisor:
+            await self.supervisor.stop()
+            self.supervisor = None
+            self.is_running = False
+            logger.info("✅ Все боты остановлены")
+            return
+        
         # Останавливаем все боты
         stop_tasks = [bot.stop() for bot in self.bots.values()]
         await asyncio.gather(*stop_tasks, return_exceptions=True)
@@ -74,10 +115,13 @@ class BotManager:
         
         bot = self.bots[bot_name]
         
-        if bot.is_running:
-            await bot.stop()
+        if self.supervisor:
+            await self.supervisor.restart(self._worker_name(bot))
+            logger.info(f"✅ Процесс бота {bot_name} перезапущен")
+            return
         
-        await bot.start()
+        # Тёплый перезапуск: приложение, пул соединений и индексы переиспользуются
+        await bot.restart()
         logger.info(f"✅ Бот {bot_name} перезапущен")
     
     def get_bot(self, bot_name: str) -> Optional[BaseBot]:
@@ -86,6 +130,14 @@ class BotManager:
     
     def get_all_metrics(self) -> Dict[str, Dict]:
         """Получить метрики всех ботов"""
+        if self.supervisor:
+            # В многопроцессном режиме метрики приходят из рабочих процессов
+            remote = self.supervisor.get_bot_metrics()
+            return {
+                bot_name: remote.get(bot_name) or {**bot.get_metrics(), 'is_running': False}
+                for bot_name, bot in self.bots.items()
+            }
+        
         return {
             bot_name: bot.get_metrics()
             for bot_name, bot in self.bots.items()
@@ -93,21 +145,88 @@ class BotManager:
     
     def get_status(self) -> Dict[str, Any]:
         """Получить статус менеджера и всех ботов"""
-        running_bots = sum(1 for bot in self.bots.values() if bot.is_running)
+        bots_metrics = self.get_all_metrics()
+        running_bots = sum(1 for metrics in bots_metrics.values() if metrics['is_running'])
         
-        return {
+        status = {
             'manager_running': self.is_running,
+            'run_mode': self.run_mode,
             'total_bots': len(self.bots),
             'running_bots': running_bots,
             'uptime': (datetime.now() - self.start_time).total_seconds() 
                      if self.start_time else 0,
-            'bots': self.get_all_metrics()
+            'bots': bots_metrics,
+            'components': collect_components()
         }
+        
+        if self.supervisor:
+            status['workers'] = self.supervisor.get_status()
+        
+        return status
+    
+    def _worker_name(self, bot: BaseBot) -> str:
+        """Имя рабочего процесса бота (BOT_<NAME>_PROCESS_GROUP или имя бота)"""
+        return bot.config.get('process_group') or bot.name
+    
+    async def _start_workers(self):
+        """Запуск ботов в отдельных процессах под наблюдением супервизора"""
+        from src.core.process_supervisor import ProcessSupervisor, WorkerSpec
+        
+        specs: Dict[str, WorkerSpec] = {}
+        for bot in self.bots.values():
+            worker_name = self._worker_name(bot)
+            spec = specs.setdefault(worker_name, WorkerSpec(name=worker_name, options=self.worker_options))
+            # Для ShardedBot в процесс передаётся исходный класс - шарды создаст create_bot
+            spec.bots.append((getattr(bot, 'bot_class', type(bot)), bot.token, bot.config))
+        
+        self.supervisor = ProcessSupervisor(list(specs.values()))
+        await self.supervisor.start()
+        logger.info(f"✅ Боты запущены в {len(specs)} процессах")
+    
+    async def start_metrics_server(self, host: str = "127.0.0.1", port: int = 9464):
+        """Запуск HTTP-эндпоинта /metrics (OpenMetrics)"""
+        if self.metrics_server:
+            return
+        
+        # Импорт только при включённом экспорте - выключенный не стоит ничего
+        from src.core.metrics_server import MetricsServer
+        
+        self.metrics_server = MetricsServer(self, host=host, port=port)
+        await self.metrics_server.start()
+    
+    async def start_loop_monitor(self, interval: float = 0.01, threshold: float = 0.1):
+        """
+        Запуск монитора задержек event loop.
+        Гистограмма задержек попадает в get_status()['components']['event_loop'].
+        """
+        if self.loop_monitor:
+            return
+        
+        from src.core.loop_monitor import LoopMonitor
+        
+        self.loop_monitor = LoopMonitor(interval=interval, threshold=threshold)
+        await self.loop_monitor.start()
+    
+    async def stop_loop_monitor(self):
+        """Остановка монитора event loop"""
+        if self.loop_monitor:
+            await self.loop_monitor.stop()
+            self.loop_monitor = None
+    
+    async def stop_metrics_server(self):
+        """Остановка HTTP-эндпоинта метрик"""
+        if self.metrics_server:
+            await self.metrics_server.stop()
+            self.metrics_server = None
     
     async def health_check(self):
         """Проверка здоровья всех ботов"""
         status = self.get_status()
         
+        # В многопроцессном режиме за процессами следит супервизор
+        if self.supervisor:
+            return status
+        
         # Проверяем каждый бот
         for bot_name, bot in self.bots.items():
             if not bot.is_running:
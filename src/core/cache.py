@@ -0,0 +1,157 @@
+"""
+Ограниченный кэш с вытеснением давно неиспользуемых записей (LRU) и
+временем жизни (TTL). Общий на процесс, с учётом занимаемой памяти и
+метриками попаданий.
+"""
+
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+
+from src.core.metrics import register_collector
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'size', 'tag')
+
+    def __init__(self, value: Any, expires_at: float, size: int, tag: Optional[Hashable]):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tag = tag
+
+
+class LRUCache:
+    """
+    LRU-кэш с TTL и ограничением по числу записей и по памяти.
+
+    Записи можно помечать тегом (например, user_id) и сбрасывать
+    все записи тега разом - так кэш инвалидируется при изменении данных.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = sys.getsizeof,
+                 name: Optional[str] = None):
+        """
+        Args:
+            maxsize: Максимальное число записей
+            ttl: Время жизни записи в секундах (None - без ограничения)
+            max_bytes: Ограничение оценки занимаемой памяти (None - без ограничения)
+            sizeof: Оценка размера записи в байтах (ключ + значение)
+            name: Имя для метрик (cache_<name>); без имени метрики не публикуются
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        if name:
+            register_collector(f"cache_{name}", self.get_metrics)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Значение по ключу (или default, если его нет или оно устарело)"""
+        entry = self._data.get(key)
+        if entry is not None and entry.expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            if count:
+                self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        if count:
+            self.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, tag: Optional[Hashable] = None):
+        """Сохраняет значение, при необходимости вытесняя самые старые записи"""
+        if key in self._data:
+            self._remove(key)
+
+        size = self._sizeof(key) + self._sizeof(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+        self._data[key] = _Entry(value, expires_at, size, tag)
+        self.bytes += size
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while self._data and (
+            len(self._data) > self.maxsize
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Удаляет запись и возвращает её значение"""
+        if key not in self._data:
+            return default
+        return self._remove(key).value
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Удаляет все записи с тегом. Возвращает число удалённых записей"""
+        keys = self._tags.pop(tag, None)
+        if not keys:
+            return 0
+        for key in keys:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.size
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        """Полностью очищает кэш"""
+        self._data.clear()
+        self._tags.clear()
+        self.bytes = 0
+
+    def _remove(self, key: Hashable) -> _Entry:
+        entry = self._data.pop(key)
+        self.bytes -= entry.size
+        if entry.tag is not None:
+            keys = self._tags.get(entry.tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[entry.tag]
+        return entry
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики кэша для BotManager и экспорта"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'bytes': self.bytes,
+            'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+            'hits_total': self.hits,
+            'misses_total': self.misses,
+            'evictions_total': self.evictions,
+            'expirations_total': self.expirations,
+            'invalidations_total': self.invalidations,
+        }
+
+
+_MISSING = object()
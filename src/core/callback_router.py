@@ -0,0 +1,336 @@
+"""
+Табличный маршрутизатор callback-запросов inline-кнопок.
+
+Маршруты компилируются в префиксное дерево (trie) по символам
+callback_data, поэтому разбор нажатия занимает O(длины callback_data)
+и не зависит от числа маршрутов. Аргументы декодируются по типам,
+объявленным при регистрации маршрута.
+
+Формат callback_data: "<версия>|<маршрут>|<арг1>|<арг2>", например
+"1|view|a1b2c3d4". Последний аргумент забирает остаток строки целиком.
+Старые кнопки без версии ("view_a1b2c3d4") поддерживаются через
+таблицу legacy-префиксов. Кнопки неизвестной версии или с неверными
+аргументами отклоняются до вызова обработчика.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import CallbackQueryHandler, ContextTypes
+
+from src.core.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# Разделитель частей версионированного callback_data
+SEPARATOR = "|"
+
+# Ограничение Telegram на callback_data
+MAX_CALLBACK_BYTES = 64
+
+# Обработчик маршрута: (update, context, *аргументы)
+RouteHandler = Callable[..., Awaitable[Any]]
+
+
+class CallbackDecodeError(ValueError):
+    """callback_data не соответствует объявленным аргументам маршрута"""
+
+
+@dataclass
+class Route:
+    """Маршрут: имя, типы аргументов и обработчик"""
+    name: str
+    arg_types: Tuple[Callable[[str], Any], ...] = ()
+    # Сколько аргументов обязательно (остальные могут отсутствовать)
+    min_args: int = 0
+    handler: Optional[RouteHandler] = None
+
+    def decode(self, raw: str, separator: str) -> List[Any]:
+        """Разбирает строку аргументов по объявленным типам"""
+        if not self.arg_types:
+            if raw:
+                raise CallbackDecodeError(f"маршрут {self.name} не принимает аргументов")
+            return []
+
+        parts = raw.split(separator, len(self.arg_types) - 1) if raw else []
+        if len(parts) < self.min_args:
+            raise CallbackDecodeError(
+                f"маршрут {self.name} ожидает не менее {self.min_args} аргументов, получено {len(parts)}"
+            )
+        try:
+            return [convert(part) for convert, part in zip(self.arg_types, parts)]
+        except (TypeError, ValueError) as e:
+            raise CallbackDecodeError(f"неверный аргумент маршрута {self.name}: {e}") from e
+
+
+class _Node:
+    __slots__ = ('children', 'exact', 'prefix')
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Строка закончилась ровно здесь: (маршрут, разделитель аргументов)
+        self.exact: Optional[Tuple[Route, str]] = None
+        # Здесь заканчивается префикс, дальше идут аргументы
+        self.prefix: Optional[Tuple[Route, str]] = None
+
+
+class CallbackRouter:
+    """
+    Маршрутизатор callback-запросов одного бота.
+
+    Маршруты объявляются через add_route() (формат кнопки) и bind()
+    (обработчик) или сразу декоратором route(). Кнопки строятся через
+    pack(), а в приложение регистрируется единственный CallbackQueryHandler
+    из handler().
+    """
+
+    def __init__(self, name: str, version: int = 1, auto_answer: bool = False,
+                 on_stale: Optional[RouteHandler] = None):
+        """
+        Args:
+            name: Имя маршрутизатора для логов и метрик (callbacks_<name>)
+            version: Текущая версия формата callback_data
+            auto_answer: Отвечать на callback до вызова обработчика (убирает «часики»)
+            on_stale: Обработчик устаревших и повреждённых кнопок (update, context)
+        """
+        self.name = name
+        self.version = version
+        self.auto_answer = auto_answer
+        self.on_stale = on_stale
+
+        self._routes: Dict[str, Route] = {}
+        # legacy-префикс → (имя маршрута, разделитель аргументов, точное совпадение)
+        self._legacy: Dict[str, Tuple[str, str, bool]] = {}
+        self._root: Optional[_Node] = None
+
+        self.dispatched = 0
+        self.legacy_hits = 0
+        self.stale = 0
+        self.malformed = 0
+
+        register_collector(f"callbacks_{name}", self.get_metrics)
+
+    # --- Объявление маршрутов ---
+
+    def route(self, name: str, *arg_types: Callable[[str], Any],
+              min_args: Optional[int] = None) -> Callable[[RouteHandler], RouteHandler]:
+        """
+        Декоратор маршрута.
+
+        Args:
+            name: Имя маршрута (без разделителя)
+            *arg_types: Типы аргументов (int, str или любая функция str → значение)
+            min_args: Число обязательных аргументов (по умолчанию все)
+        """
+        def decorator(handler: RouteHandler) -> RouteHandler:
+            self.add_route(name, *arg_types, handler=handler, min_args=min_args)
+            return handler
+        return decorator
+
+    def add_route(self, name: str, *arg_types: Callable[[str], Any],
+                  handler: Optional[RouteHandler] = None, min_args: Optional[int] = None):
+        """
+        Регистрирует маршрут. Маршрут без обработчика только объявляет формат
+        кнопки - его обрабатывает отдельный handler (например, ConversationHandler).
+        """
+        if SEPARATOR in name:
+            raise ValueError(f"Имя маршрута не может содержать '{SEPARATOR}': {name}")
+        self._routes[name] = Route(
+            name=name,
+            arg_types=tuple(arg_types),
+            min_args=len(arg_types) if min_args is None else min_args,
+            handler=handler,
+        )
+        self._root = None
+
+    def bind(self, name: str) -> Callable[[RouteHandler], RouteHandler]:
+        """Декоратор: назначает обработчик ранее объявленному маршруту"""
+        def decorator(handler: RouteHandler) -> RouteHandler:
+            route = self._routes.get(name)
+            if route is None:
+                raise KeyError(f"Неизвестный маршрут {self.name}:{name}")
+            route.handler = handler
+            return handler
+        return decorator
+
+    def legacy(self, prefix: str, name: str, separator: str = "_", exact: bool = False):
+        """
+        Поддержка кнопок старого формата, уже разосланных пользователям.
+
+        Args:
+            prefix: Начало старого callback_data ("view_") или вся строка при exact
+            name: Маршрут, в который ведёт старая кнопка
+            separator: Разделитель аргументов в старом формате
+            exact: Старый callback_data должен совпасть с prefix целиком
+        """
+        self._legacy[prefix] = (name, separator, exact)
+        self._root = None
+
+    # --- Кнопки ---
+
+    def pack(self, name: str, *args: Any) -> str:
+        """Строит callback_data для маршрута"""
+        route = self._routes.get(name)
+        if route is None:
+            raise KeyError(f"Неизвестный маршрут {self.name}:{name}")
+        if not route.min_args <= len(args) <= len(route.arg_types):
+            raise ValueError(f"Маршрут {name} ожидает {route.min_args}..{len(route.arg_types)} аргументов")
+
+        values = [str(arg) for arg in args]
+        # Последний аргумент забирает остаток строки, в остальных разделитель запрещён
+        if any(SEPARATOR in value for value in values[:-1]):
+            raise ValueError(f"Аргумент маршрута {name} содержит '{SEPARATOR}'")
+
+        data = SEPARATOR.join([str(self.version), name, *values])
+        if len(data.encode("utf-8")) > MAX_CALLBACK_BYTES:
+            raise ValueError(f"callback_data длиннее {MAX_CALLBACK_BYTES} байт: {data!r}")
+        return data
+
+    # --- Разбор ---
+
+    def _compile(self) -> _Node:
+        """Строит префиксное дерево из маршрутов и legacy-префиксов"""
+        root = _Node()
+
+        def insert(key: str, route: Route, separator: str, exact: bool):
+            node = root
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+            if exact:
+                node.exact = (route, separator)
+            else:
+                node.prefix = (route, separator)
+
+        version = str(self.version)
+        for route in self._routes.values():
+            base = f"{version}{SEPARATOR}{route.name}"
+            if route.min_args == 0:
+                insert(base, route, SEPARATOR, exact=True)
+            if route.arg_types:
+                insert(base + SEPARATOR, route, SEPARATOR, exact=False)
+
+        for prefix, (name, separator, exact) in self._legacy.items():
+            route = self._routes.get(name)
+            if route is None:
+                logger.warning(f"[{self.name}] legacy-префикс {prefix!r} ведёт в неизвестный маршрут {name}")
+                continue
+            insert(prefix, route, separator, exact=exact)
+
+        self._root = root
+        return root
+
+    def resolve(self, data: Optional[str]) -> Optional[Tuple[Route, List[Any]]]:
+        """
+        Находит маршрут и декодирует аргументы.
+
+        Returns:
+            (маршрут, аргументы) или None, если маршрут не найден
+
+        Raises:
+            CallbackDecodeError: маршрут найден, но аргументы не разбираются
+        """
+        if not data:
+            return None
+        node = self._root or self._compile()
+
+        # Самый длинный префикс, после которого начинаются аргументы
+        best: Optional[Tuple[Route, str]] = None
+        best_end = 0
+        for position, char in enumerate(data):
+            if node.prefix is not None:
+                best, best_end = node.prefix, position
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            if node.exact is not None:
+                return node.exact[0], []
+            if node.prefix is not None:
+                best, best_end = node.prefix, len(data)
+
+        if best is None:
+            return None
+        route, separator = best
+        return route, route.decode(data[best_end:], separator)
+
+    def is_legacy(self, data: str) -> bool:
+        """Кнопка старого формата (без версии)"""
+        return not data.startswith(f"{self.version}{SEPARATOR}")
+
+    def matches(self, data: Optional[str]) -> bool:
+        """
+        Фильтр для CallbackQueryHandler: нажатия, которые обрабатывает
+        маршрутизатор (включая устаревшие кнопки). Маршруты без
+        обработчика остаются другим handler'ам.
+        """
+        try:
+            resolved = self.resolve(data)
+        except CallbackDecodeError:
+            return True
+        return resolved is None or resolved[0].handler is not None
+
+    def pattern_for(self, name: str) -> Callable[[Optional[str]], bool]:
+        """Фильтр CallbackQueryHandler для одного маршрута (новый и старый формат)"""
+        def check(data: Optional[str]) -> bool:
+            try:
+                resolved = self.resolve(data)
+            except CallbackDecodeError:
+                return False
+            return resolved is not None and resolved[0].name == name
+        return check
+
+    # --- Диспетчеризация ---
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик всех callback-запросов бота"""
+        query = update.callback_query
+        data = query.data if query else None
+
+        try:
+            resolved = self.resolve(data)
+        except CallbackDecodeError as e:
+            self.malformed += 1
+            logger.warning(f"[{self.name}] Повреждённая кнопка {data!r}: {e}")
+            await self._reject(update, context)
+            return
+
+        if resolved is None or resolved[0].handler is None:
+            self.stale += 1
+            logger.info(f"[{self.name}] Устаревшая кнопка {data!r}")
+            await self._reject(update, context)
+            return
+
+        route, args = resolved
+        self.dispatched += 1
+        if self.is_legacy(data):
+            self.legacy_hits += 1
+        logger.debug(f"[{self.name}] Кнопка {data!r} → {route.name}{tuple(args)}")
+
+        if self.auto_answer:
+            await query.answer()
+        return await route.handler(update, context, *args)
+
+    async def _reject(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        if self.on_stale is not None:
+            if self.auto_answer:
+                await query.answer()
+            await self.on_stale(update, context)
+        elif query is not None:
+            await query.answer("Кнопка устарела", show_alert=False)
+
+    def handler(self) -> CallbackQueryHandler:
+        """Единственный CallbackQueryHandler бота"""
+        return CallbackQueryHandler(self.dispatch, pattern=self.matches)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики маршрутизатора"""
+        return {
+            'routes': len(self._routes),
+            'dispatched_total': self.dispatched,
+            'legacy_total': self.legacy_hits,
+            'stale_total': self.stale,
+            'malformed_total': self.malformed,
+        }
@@ -0,0 +1,82 @@
+"""
+Курсоры постраничного вывода.
+
+Курсор - позиция «последней показанной записи»: (created_at, id).
+Он кодируется в компактную строку base64url и передаётся в callback_data
+кнопок «Вперёд/Назад». В отличие от номера страницы, курсор не сдвигается,
+когда список изменился после отрисовки: продолжение начинается строго
+после показанной записи.
+
+Формат (до base64url): 1 байт флагов, 8 байт времени в микросекундах
+(знаковое big-endian), затем ID - 16 байт UUID или строка UTF-8.
+"""
+
+import base64
+import binascii
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+# Курсор: (время создания, ID)
+Cursor = Tuple[datetime, str]
+
+_FLAG_AWARE = 0x01  # Время с часовым поясом (хранится в UTC)
+_FLAG_UUID = 0x02   # ID - каноническая строка UUID
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_TIME = struct.Struct(">q")
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    """Кодирует позицию (created_at, id) в строку для callback_data"""
+    flags = 0
+    if created_at.tzinfo is not None:
+        flags |= _FLAG_AWARE
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    micros = (created_at - _EPOCH) // _MICROSECOND
+
+    try:
+        parsed = uuid.UUID(item_id)
+    except ValueError:
+        parsed = None
+    if parsed is not None and str(parsed) == item_id:
+        flags |= _FLAG_UUID
+        id_bytes = parsed.bytes
+    else:
+        id_bytes = item_id.encode("utf-8")
+
+    raw = bytes([flags]) + _TIME.pack(micros) + id_bytes
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Разбирает строку курсора.
+
+    Raises:
+        ValueError: строка повреждена
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"неверный курсор: {token!r}") from e
+    if len(raw) < 1 + _TIME.size:
+        raise ValueError(f"неверный курсор: {token!r}")
+
+    flags = raw[0]
+    (micros,) = _TIME.unpack_from(raw, 1)
+    id_bytes = raw[1 + _TIME.size:]
+
+    created_at = _EPOCH + micros * _MICROSECOND
+    if flags & _FLAG_AWARE:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+
+    if flags & _FLAG_UUID:
+        if len(id_bytes) != 16:
+            raise ValueError(f"неверный курсор: {token!r}")
+        item_id = str(uuid.UUID(bytes=id_bytes))
+    else:
+        item_id = id_bytes.decode("utf-8")
+    return created_at, item_id
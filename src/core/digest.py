@@ -0,0 +1,350 @@
+"""
+Ежедневная сводка пользователю: важные записи и активность по дням.
+
+Сводка строится из двух индексов, которые поддерживаются подписчиком
+на события NoteManager: счётчики записей по дням и упорядоченный список
+важных записей каждого пользователя. Поэтому стоимость сводки не зависит
+от числа записей пользователя.
+
+Дни считаются в местном времени пользователя (src.core.timezones),
+время сводки - тоже. Время сводки задаётся настройкой digest_time ("ЧЧ:ММ"). Пользователи,
+чья сводка наступила, обрабатываются пачками, а отправка идёт через
+RateLimitedSender с общим лимитом бота.
+"""
+
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.core.events import NoteEvent, NOTE_ADDED, NOTE_DELETED
+from src.core.message_builder import escape_markdown
+from src.core.metrics import register_collector
+from src.core.note_index import NoteIndex, note_key
+from src.core.note_manager import note_manager
+from src.core.outbound import RateLimitedSender, RateLimiter
+from src.core.timezones import TIMEZONE_KEY, from_local, local_date, to_local, to_utc, utc_now
+from src.core.user_settings import user_settings
+
+logger = logging.getLogger(__name__)
+
+# Ключ настройки времени сводки
+DIGEST_TIME_KEY = "digest_time"
+
+# Важных записей в сводке
+DIGEST_IMPORTANT_LIMIT = 10
+
+# Пользователей в одной пачке генерации (между пачками event loop свободен)
+DIGEST_BATCH = 500
+
+# Темп рассылки сводок (сообщений в секунду на бота)
+DIGEST_RATE = 20.0
+
+# Дольше этого не спим даже без сводок
+MAX_SLEEP = 3600.0
+
+# Отправка сводки: (user_id, текст) → доставлено ли
+DigestDelivery = Callable[[int, str], Awaitable[bool]]
+
+
+def parse_digest_time(text: str) -> time:
+    """
+    Разбирает время сводки "ЧЧ:ММ".
+
+    Raises:
+        ValueError: неверный формат
+    """
+    return datetime.strptime(text.strip(), "%H:%M").time()
+
+
+class DigestIndex:
+    """Счётчики записей по дням и важные записи пользователей"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._day_counts: Dict[int, Dict[date, int]] = {}
+        self._important: Dict[int, NoteIndex] = {}
+        self._attached = False
+        # Загрузка хранилища, из которой построены индексы
+        self._generation: Optional[int] = None
+
+    @property
+    def is_current(self) -> bool:
+        """Индексы построены из текущей загрузки хранилища"""
+        return self._attached and self._generation == self.manager.generation
+
+    def attach(self):
+        """Строит индексы одним проходом и подписывается на изменения"""
+        self._day_counts = defaultdict(lambda: defaultdict(int))
+        important = defaultdict(list)
+        for user_id, notes in self.manager._notes_cache.items():
+            counts = self._day_counts[user_id]
+            for note in notes:
+                counts[local_date(note.created_at, user_id)] += 1
+                if note.is_important:
+                    important[user_id].append(note)
+        self._important = {user_id: NoteIndex(notes) for user_id, notes in important.items()}
+        self._generation = self.manager.generation
+
+        if not self._attached:
+            self.manager.events.subscribe(self._on_note_event)
+            user_settings.subscribe(self._on_setting)
+            self._attached = True
+
+    def _on_setting(self, user_id: int, key: str, before: Any, after: Any):
+        """Смена пояса пользователя: записи раскладываются по его новым дням"""
+        if key != TIMEZONE_KEY or not self._attached:
+            return
+        counts = defaultdict(int)
+        for note in self.manager._notes_cache.get(user_id, []):
+            counts[local_date(note.created_at, user_id)] += 1
+        self._day_counts[user_id] = counts
+
+    def _on_note_event(self, event: NoteEvent):
+        """Подписчик: точечное обновление счётчиков и важных записей"""
+        note = event.note
+        counts = self._day_counts[event.user_id]
+        important = self._important.setdefault(event.user_id, NoteIndex())
+
+        if event.kind == NOTE_ADDED:
+            counts[local_date(note.created_at, event.user_id)] += 1
+            if note.is_important:
+                important.add(note)
+        elif event.kind == NOTE_DELETED:
+            counts[local_date(note.created_at, event.user_id)] -= 1
+            if note.is_important:
+                important.remove(note_key(note))
+        elif event.changed('created_at', 'is_important'):
+            created_before = to_utc(event.changes.get('created_at', (note.created_at,))[0])
+            important_before = event.changes.get('is_important', (note.is_important,))[0]
+            if created_before != note.created_at:
+                counts[local_date(created_before, event.user_id)] -= 1
+                counts[local_date(note.created_at, event.user_id)] += 1
+            if important_before:
+                important.remove((created_before, note.id))
+            if note.is_important:
+                important.add(note)
+
+    def count_on(self, user_id: int, day: date) -> int:
+        """Записей пользователя за местный день"""
+        return self._day_counts.get(user_id, {}).get(day, 0)
+
+    def important_notes(self, user_id: int, limit: int = DIGEST_IMPORTANT_LIMIT):
+        """Важные записи пользователя (новые сверху) и их общее число"""
+        index = self._important.get(user_id)
+        if index is None:
+            return [], 0
+        return index.page(0, limit), len(index)
+
+    def build(self, user_id: int, day: date) -> Optional[str]:
+        """Текст сводки на день; None, если сообщить нечего"""
+        yesterday = self.count_on(user_id, day - timedelta(days=1))
+        important, total_important = self.important_notes(user_id)
+        if not yesterday and not important:
+            return None
+
+        lines = [f"📋 *Сводка на {day.strftime('%d.%m.%Y')}*", ""]
+        lines.append(f"📅 Вчера записей: *{yesterday}*")
+        if important:
+            lines.append("")
+            lines.append(f"⭐ *Важные записи ({total_important}):*")
+            for note in important:
+                preview = note.text[:60] + "..." if len(note.text) > 60 else note.text
+                lines.append(f"• {escape_markdown(preview)} (`{note.id[:8]}`)")
+        return "\n".join(lines)
+
+
+class DigestScheduler:
+    """
+    Расписание ежедневных сводок.
+    Куча (время, user_id) с ленивым удалением, как у планировщика напоминаний.
+    """
+
+    def __init__(self, index: DigestIndex, settings, sender: Optional[RateLimitedSender] = None):
+        """
+        Args:
+            index: Индексы для построения сводок
+            settings: Настройки пользователей (время сводки)
+            sender: Отправитель с лимитом скорости для рассылки
+        """
+        self.index = index
+        self.settings = settings
+        self.sender = sender or RateLimitedSender(RateLimiter(global_rate=DIGEST_RATE))
+
+        self._heap: List[Tuple[datetime, int]] = []
+        # user_id → ближайший срок (UTC) и местное время сводки
+        self._next: Dict[int, datetime] = {}
+        self._times: Dict[int, time] = {}
+        self._deliver: Optional[DigestDelivery] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._subscribed = False
+
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+
+        register_collector("digests", self.get_metrics)
+
+    def load(self, now: Optional[datetime] = None):
+        """Строит расписание из настроек пользователей"""
+        now = now or utc_now()
+        self._next = {}
+        self._times = {}
+        for user_id, value in self.settings.users_with(DIGEST_TIME_KEY):
+            try:
+                self._times[user_id] = parse_digest_time(value)
+                self._next[user_id] = self._next_time(user_id, self._times[user_id], now)
+            except ValueError:
+                logger.warning(f"Неверное время сводки у пользователя {user_id}: {value!r}")
+        self._heap = [(at, user_id) for user_id, at in self._next.items()]
+        heapq.heapify(self._heap)
+
+        if not self._subscribed:
+            self.settings.subscribe(self._on_setting)
+            self._subscribed = True
+
+    @staticmethod
+    def _next_time(user_id: int, at: time, now: datetime) -> datetime:
+        """Ближайший после now момент (UTC), когда у пользователя местное время at"""
+        local_now = to_local(now, user_id)
+        due = datetime.combine(local_now.date(), at)
+        if due <= local_now:
+            due += timedelta(days=1)
+        return from_local(due, user_id)
+
+    def schedule(self, user_id: int, at: Optional[time], now: Optional[datetime] = None):
+        """Назначает (или при at=None отменяет) сводку пользователя"""
+        if at is None:
+            self._next.pop(user_id, None)
+            self._times.pop(user_id, None)
+            return
+        due = self._next_time(user_id, at, now or utc_now())
+        self._times[user_id] = at
+        self._next[user_id] = due
+        heapq.heappush(self._heap, (due, user_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _on_setting(self, user_id: int, key: str, before: Any, after: Any):
+        if key == DIGEST_TIME_KEY:
+            self.schedule(user_id, parse_digest_time(after) if after else None)
+        elif key == TIMEZONE_KEY and user_id in self._times:
+            self.schedule(user_id, self._times[user_id])
+
+    def pop_due(self, now: datetime) -> List[int]:
+        """Пользователи, чья сводка наступила (расписание сдвигается на следующий местный день)"""
+        now = to_utc(now)
+        users: List[int] = []
+        while self._heap:
+            due, user_id = self._heap[0]
+            if self._next.get(user_id) != due:
+                heapq.heappop(self._heap)
+                continue
+            if due > now:
+                break
+            heapq.heappop(self._heap)
+            users.append(user_id)
+
+        for user_id in users:
+            following = self._next_time(user_id, self._times[user_id], now)
+            self._next[user_id] = following
+            heapq.heappush(self._heap, (following, user_id))
+        return users
+
+    def _next_due(self) -> Optional[datetime]:
+        while self._heap:
+            due, user_id = self._heap[0]
+            if self._next.get(user_id) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def start(self, deliver: DigestDelivery):
+        """Запускает рассылку сводок в текущем event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self.load()
+        self._deliver = deliver
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="digests")
+        logger.info(f"Рассылка сводок запущена, пользователей: {len(self._next)}")
+
+    async def stop(self):
+        """Останавливает рассылку (уже поставленные отправки дожидаются)"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.sender.drain()
+
+    async def _prepare(self):
+        """Загружает хранилище в отдельном потоке; индексы строятся, только если устарели"""
+        await asyncio.to_thread(self.index.manager.init)
+        if not self.index.is_current:
+            self.index.attach()
+
+    async def _run(self):
+        await self._prepare()
+        while True:
+            due = self._next_due()
+            delay = MAX_SLEEP if due is None else (due - utc_now()).total_seconds()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.send_batch(self.pop_due(utc_now()))
+
+    async def send_batch(self, users: List[int]):
+        """
+        Строит сводки пачками и ставит их в очередь рассылки.
+        Отправка идёт в фоне с лимитом скорости и не задерживает следующие сроки.
+        """
+        now = utc_now()
+        for start in range(0, len(users), DIGEST_BATCH):
+            for user_id in users[start:start + DIGEST_BATCH]:
+                text = self.index.build(user_id, local_date(now, user_id))
+                if text is None:
+                    self.skipped += 1
+                    continue
+                task = self.sender.submit(
+                    lambda user_id=user_id, text=text: self._deliver(user_id, text), chat_id=user_id
+                )
+                task.add_done_callback(self._count_result)
+            # Даём обработать входящие обновления между пачками
+            await asyncio.sleep(0)
+
+    def _count_result(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None and task.result():
+            self.sent += 1
+        else:
+            self.failed += 1
+            if error is not None:
+                logger.error(f"Ошибка отправки сводки: {error}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики рассылки сводок"""
+        return {
+            'scheduled': len(self._next),
+            'sent_total': self.sent,
+            'skipped_total': self.skipped,
+            'failed_total': self.failed,
+            **{f"outbound_{key}": value for key, value in self.sender.get_metrics().items()},
+        }
+
+
+# Глобальные индекс и расписание сводок
+digest_index = DigestIndex(note_manager)
+digest_scheduler = DigestScheduler(digest_index, user_settings)
@@ -0,0 +1,144 @@
+"""
+Шина событий об изменении записей.
+Производные структуры (кэши, индексы, расписание напоминаний)
+подписываются на неё и обновляются точечно, без пересканирования хранилища.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from src.core.metrics import LatencyHistogram, register_collector
+
+logger = logging.getLogger(__name__)
+
+# Типы событий
+NOTE_ADDED = "added"
+NOTE_UPDATED = "updated"
+NOTE_DELETED = "deleted"
+
+# Корзины для времени публикации: подписчики должны укладываться в микросекунды
+PUBLISH_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.01, 0.1)
+
+
+@dataclass
+class NoteEvent:
+    """Изменение одной записи"""
+    kind: str
+    user_id: int
+    note_id: str
+    # Запись после изменения (для удаления - удалённая запись)
+    note: Any = None
+    # Изменённые поля: имя -> (было, стало)
+    changes: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)
+
+    def changed(self, *fields: str) -> bool:
+        """Изменилось ли хотя бы одно из полей (добавление и удаление меняют всё)"""
+        if self.kind != NOTE_UPDATED:
+            return True
+        return any(name in self.changes for name in fields)
+
+
+SyncSubscriber = Callable[[NoteEvent], None]
+AsyncSubscriber = Callable[[NoteEvent], Awaitable[None]]
+
+
+class EventBus:
+    """
+    Шина с синхронными и асинхронными подписчиками.
+
+    Синхронные подписчики вызываются сразу внутри мутации - они должны
+    быть быстрыми (сбросить ключ кэша, поправить индекс). Асинхронные
+    запускаются отдельными задачами в текущем event loop и не задерживают
+    обработчик, изменивший запись.
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Имя шины для метрик
+        """
+        self.name = name
+        self._sync: List[SyncSubscriber] = []
+        self._async: List[AsyncSubscriber] = []
+        self._tasks: set = set()
+
+        self.publish_latency = LatencyHistogram(PUBLISH_BUCKETS)
+        self.published = 0
+        self.errors = 0
+
+        register_collector(name, self.get_metrics)
+
+    def subscribe(self, callback: SyncSubscriber):
+        """Подписка синхронного обработчика"""
+        if callback not in self._sync:
+            self._sync.append(callback)
+
+    def subscribe_async(self, callback: AsyncSubscriber):
+        """Подписка асинхронного обработчика"""
+        if callback not in self._async:
+            self._async.append(callback)
+
+    def unsubscribe(self, callback: Callable):
+        """Отписка обработчика (любого типа)"""
+        if callback in self._sync:
+            self._sync.remove(callback)
+        if callback in self._async:
+            self._async.remove(callback)
+
+    def publish(self, event: NoteEvent):
+        """Рассылает событие подписчикам"""
+        started = time.perf_counter()
+        self.published += 1
+
+        for callback in self._sync:
+            try:
+                callback(event)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Ошибка подписчика {getattr(callback, '__qualname__', callback)} "
+                             f"на событие {event.kind}: {e}", exc_info=True)
+
+        if self._async:
+            self._schedule(event)
+
+        self.publish_latency.observe(time.perf_counter() - started)
+
+    def _schedule(self, event: NoteEvent):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Изменение вне event loop (скрипты, тесты) - асинхронным подписчикам некуда идти
+            logger.debug(f"Событие {event.kind} без event loop: асинхронные подписчики пропущены")
+            return
+
+        for callback in self._async:
+            task = loop.create_task(self._run_async(callback, event))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_async(self, callback: AsyncSubscriber, event: NoteEvent):
+        try:
+            await callback(event)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Ошибка асинхронного подписчика {getattr(callback, '__qualname__', callback)} "
+                         f"на событие {event.kind}: {e}", exc_info=True)
+
+    async def drain(self):
+        """Ждёт завершения запущенных асинхронных подписчиков"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики шины: число событий, ошибки подписчиков и стоимость публикации"""
+        return {
+            'subscribers': len(self._sync) + len(self._async),
+            'async_pending': len(self._tasks),
+            'published_total': self.published,
+            'subscriber_errors_total': self.errors,
+            'publish_seconds': self.publish_latency.to_dict(),
+        }
+
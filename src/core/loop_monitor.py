@@ -0,0 +1,157 @@
+"""
+Монитор задержек event loop.
+Измеряет, насколько позже запланированного просыпается цикл, и при
+длительной блокировке снимает стек выполняющегося в цикле кода.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+from src.core.metrics import LatencyHistogram, register_collector, unregister_collector
+
+logger = logging.getLogger(__name__)
+
+# Корзины для задержек цикла мельче, чем для обработчиков
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LoopMonitor:
+    """
+    Измеряет задержку планирования event loop.
+
+    Внутри цикла работает задача, которая спит interval секунд и
+    записывает фактическое опоздание в гистограмму. Отдельный поток-сторож
+    следит за «пульсом» этой задачи: если цикл не отвечает дольше threshold,
+    сторож снимает стек потока цикла и пишет его в лог - так видно,
+    какой именно код блокирует всех ботов.
+    """
+
+    def __init__(self, interval: float = 0.01, threshold: float = 0.1,
+                 sample_cooldown: float = 5.0, max_stack_depth: int = 30):
+        """
+        Args:
+            interval: Период измерения в секундах
+            threshold: Задержка, после которой блокировка считается проблемой
+            sample_cooldown: Минимальный интервал между снимками стека
+            max_stack_depth: Сколько последних кадров стека писать в лог
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.sample_cooldown = sample_cooldown
+        self.max_stack_depth = max_stack_depth
+
+        self.lag = LatencyHistogram(LAG_BUCKETS)
+        self.stalls = 0
+        self.stack_samples = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._stall_sampled = False
+        self._last_sample_at = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Запуск измерений в текущем event loop"""
+        if self.is_running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop_event.clear()
+
+        self._task = asyncio.create_task(self._measure(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+
+        register_collector("event_loop", self.get_metrics)
+        logger.info(
+            f"Монитор event loop запущен: интервал {self.interval * 1000:.0f} мс, "
+            f"порог {self.threshold * 1000:.0f} мс"
+        )
+
+    async def stop(self):
+        """Остановка измерений"""
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+        unregister_collector("event_loop")
+
+    async def _measure(self):
+        """Задача внутри цикла: измеряет опоздание пробуждений"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+
+            self._heartbeat = time.monotonic()
+            self._stall_sampled = False
+            self.lag.observe(lag)
+
+            if lag >= self.threshold:
+                self.stalls += 1
+                logger.warning(f"Event loop был заблокирован на {lag * 1000:.0f} мс")
+
+    def _watch(self):
+        """Поток-сторож: снимает стек, пока цикл заблокирован"""
+        check_interval = max(self.threshold / 2, 0.005)
+        while not self._stop_event.wait(check_interval):
+            blocked_for = time.monotonic() - self._heartbeat - self.interval
+            if blocked_for < self.threshold or self._stall_sampled:
+                continue
+
+            now = time.monotonic()
+            self._stall_sampled = True
+            if now - self._last_sample_at < self.sample_cooldown:
+                continue
+            self._last_sample_at = now
+            self._log_stack_sample(blocked_for)
+
+    def _log_stack_sample(self, blocked_for: float):
+        """Пишет в лог стек потока event loop и имя текущей задачи"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+
+        stack = "".join(traceback.format_stack(frame)[-self.max_stack_depth:])
+        task = asyncio.current_task(self._loop) if self._loop else None
+        task_name = task.get_name() if task else "<вне задачи>"
+        coro = task.get_coro() if task else None
+        coro_name = getattr(coro, '__qualname__', repr(coro)) if coro else "-"
+
+        self.stack_samples += 1
+        logger.warning(
+            f"Event loop не отвечает уже {blocked_for * 1000:.0f} мс. "
+            f"Задача: {task_name} ({coro_name}). Стек:\n{stack}"
+        )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики монитора для BotManager и экспорта"""
+        return {
+            'lag_seconds': self.lag.to_dict(),
+            'lag_p99_seconds': self.lag.percentile(0.99),
+            'max_lag_seconds': self.lag.max,
+            'stalls_total': self.stalls,
+            'stack_samples_total': self.stack_samples,
+        }
@@ -0,0 +1,159 @@
+"""
+Сборка текстов сообщений: экранирование пользовательского текста
+и разбиение на части по лимиту Telegram.
+
+Экранирование идёт по заранее построенным таблицам замен: цепочка
+str.replace выполняется в C и на кириллице в несколько раз быстрее
+str.translate с расширяющими заменами (см. benchmarks/bench_message_builder.py).
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Лимит длины текста сообщения (в единицах UTF-16, как считает Telegram)
+MESSAGE_LIMIT = 4096
+
+# Таблицы замен: (символ, замена). Обратная косая черта и '&' идут первыми,
+# чтобы не экранировать уже вставленные последовательности повторно
+_MARKDOWN_TABLE = tuple((char, "\\" + char) for char in "_*`[")
+_MARKDOWN_V2_TABLE = tuple((char, "\\" + char) for char in "\\_*[]()~`>#+-=|{}.!")
+_HTML_TABLE = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"))
+
+
+def _apply(text: str, table: Tuple[Tuple[str, str], ...]) -> str:
+    for char, replacement in table:
+        text = text.replace(char, replacement)
+    return text
+
+
+def escape_markdown(text: str, version: int = 1) -> str:
+    """
+    Экранирует текст для parse_mode='Markdown' (version=1)
+    или 'MarkdownV2' (version=2).
+    """
+    if not text:
+        return ""
+    return _apply(text, _MARKDOWN_V2_TABLE if version == 2 else _MARKDOWN_TABLE)
+
+
+def escape_html(text: str) -> str:
+    """Экранирует текст для parse_mode='HTML'"""
+    if not text:
+        return ""
+    return _apply(text, _HTML_TABLE)
+
+
+_ESCAPERS: Dict[Optional[str], Callable[[str], str]] = {
+    None: lambda text: text or "",
+    "Markdown": escape_markdown,
+    "MarkdownV2": lambda text: escape_markdown(text, version=2),
+    "HTML": escape_html,
+}
+
+
+def escape(text: str, parse_mode: Optional[str]) -> str:
+    """Экранирует текст под режим разметки сообщения"""
+    return _ESCAPERS[parse_mode](text)
+
+
+def telegram_length(text: str) -> int:
+    """Длина текста так, как её считает Telegram (в единицах UTF-16)"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _hard_split(line: str, limit: int) -> List[str]:
+    """Режет строку длиннее лимита, не разрывая escape-последовательности"""
+    parts: List[str] = []
+    start = 0
+    size = 0
+    for position, char in enumerate(line):
+        width = 2 if ord(char) > 0xFFFF else 1
+        if size + width > limit:
+            end = position
+            # Не отрываем экранируемый символ от обратной косой черты
+            if end - start > 1 and line[end - 1] == "\\":
+                end -= 1
+            parts.append(line[start:end])
+            start = end
+            size = telegram_length(line[start:position])
+        size += width
+    parts.append(line[start:])
+    return parts
+
+
+class MessageBuilder:
+    """
+    Построчная сборка сообщения с разбиением на части не длиннее лимита.
+
+    Части режутся по границам строк; строка длиннее лимита режется
+    посимвольно. Форматирование (жирный текст, код) не должно переходить
+    через перевод строки, иначе оно может разорваться между частями.
+    """
+
+    def __init__(self, parse_mode: Optional[str] = None, limit: int = MESSAGE_LIMIT):
+        """
+        Args:
+            parse_mode: Режим разметки (определяет экранирование в add_text)
+            limit: Лимит длины одной части
+        """
+        self.parse_mode = parse_mode
+        self.limit = limit
+        self._ready: List[str] = []
+        self._parts: List[str] = []
+        self._size = 0
+
+    def escape(self, text: str) -> str:
+        """Экранирует пользовательский текст под parse_mode сообщения"""
+        return escape(text, self.parse_mode)
+
+    def add(self, line: str = "") -> "MessageBuilder":
+        """Добавляет готовую (уже отформатированную) строку"""
+        line += "\n"
+        width = telegram_length(line)
+
+        if self._size + width > self.limit:
+            self._flush()
+            if width > self.limit:
+                pieces = _hard_split(line, self.limit)
+                self._ready.extend(pieces[:-1])
+                line = pieces[-1]
+                width = telegram_length(line)
+
+        self._parts.append(line)
+        self._size += width
+        return self
+
+    def add_text(self, text: str) -> "MessageBuilder":
+        """Добавляет пользовательский текст с экранированием (может быть многострочным)"""
+        for line in self.escape(text).split("\n"):
+            self.add(line)
+        return self
+
+    def _flush(self):
+        chunk = "".join(self._parts).rstrip("\n")
+        if chunk:
+            self._ready.append(chunk)
+        self._parts = []
+        self._size = 0
+
+    def take_ready(self) -> List[str]:
+        """Забирает заполненные части (текущая незаконченная часть остаётся)"""
+        ready, self._ready = self._ready, []
+        return ready
+
+    def chunks(self) -> List[str]:
+        """Все части сообщения, включая последнюю"""
+        self._flush()
+        return self.take_ready()
+
+    def __len__(self) -> int:
+        return len(self._ready) + (1 if self._parts else 0)
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Разбивает готовый текст на части не длиннее лимита по границам строк"""
+    if telegram_length(text) <= limit:
+        return [text]
+    builder = MessageBuilder(limit=limit)
+    for line in text.split("\n"):
+        builder.add(line)
+    return builder.chunks()
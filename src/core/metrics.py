@@ -0,0 +1,211 @@
+"""
+Метрики обработчиков: счётчики вызовов, ошибок и гистограммы задержек.
+Используется BaseBot для учёта работы каждого обработчика.
+"""
+
+import bisect
+import logging
+from typing import Dict, Any, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек (в секундах)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек с фиксированными корзинами.
+
+    Память не зависит от числа наблюдений, а перцентили (p50/p95/p99)
+    оцениваются линейной интерполяцией внутри корзины.
+    """
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Последняя корзина - всё, что больше самой большой границы (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Добавляет одно наблюдение (в секундах)"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """
+        Оценка перцентиля.
+
+        Args:
+            q: Доля от 0 до 1 (например, 0.95 для p95)
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                upper = min(upper, self.max)
+                lower = min(lower, upper)
+                fraction = (rank - cumulative) / bucket_count
+                return lower + (upper - lower) * fraction
+            cumulative += bucket_count
+        return self.max
+
+    def merge(self, other: "LatencyHistogram"):
+        """Добавляет наблюдения другой гистограммы с теми же корзинами"""
+        if other.buckets != self.buckets:
+            raise ValueError("Нельзя объединить гистограммы с разными корзинами")
+        for i, bucket_count in enumerate(other.counts):
+            self.counts[i] += bucket_count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация для передачи между процессами и экспорта"""
+        return {
+            'buckets': list(self.buckets),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        """Восстанавливает гистограмму из словаря to_dict()"""
+        histogram = cls(data['buckets'])
+        histogram.counts = list(data['counts'])
+        histogram.count = data['count']
+        histogram.sum = data['sum']
+        histogram.max = data['max']
+        return histogram
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Краткая сводка: количество, среднее и перцентили в миллисекундах"""
+        return {
+            'count': self.count,
+            'avg_ms': (self.sum / self.count * 1000) if self.count else 0.0,
+            'p50_ms': self.percentile(0.50) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+            'histogram': self.to_dict(),
+        }
+
+
+class HandlerStats:
+    """Статистика одного обработчика"""
+
+    __slots__ = ('calls', 'errors', 'latency')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+
+class HandlerMetrics:
+    """
+    Реестр метрик обработчиков бота.
+    Ключ - команда ('/list'), префикс callback ('callback:view')
+    или имя обработчика сообщений ('message:handle_note_text').
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, HandlerStats] = {}
+
+    def _get(self, key: str) -> HandlerStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = HandlerStats()
+        return stats
+
+    def observe(self, key: str, duration: float, error: bool = False):
+        """
+        Учитывает один вызов обработчика.
+
+        Args:
+            key: Ключ обработчика
+            duration: Длительность вызова в секундах
+            error: Завершился ли вызов исключением
+        """
+        stats = self._get(key)
+        stats.calls += 1
+        if error:
+            stats.errors += 1
+        stats.latency.observe(duration)
+
+    def get(self, key: str) -> Optional[HandlerStats]:
+        """Статистика обработчика по ключу (или None)"""
+        return self._stats.get(key)
+
+    def reset(self):
+        """Сбрасывает всю статистику"""
+        self._stats.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Метрики всех обработчиков в виде словаря"""
+        return {
+            key: {
+                'calls': stats.calls,
+                'errors': stats.errors,
+                **stats.latency.snapshot(),
+            }
+            for key, stats in sorted(self._stats.items())
+        }
+
+
+def callback_metric_key(data: Optional[str]) -> str:
+    """
+    Ключ метрики для callback-запроса по префиксу callback_data.
+    Например: 'view_a1b2c3d4' → 'callback:view', 'faq:1' → 'callback:faq',
+    версионированный '1|view|a1b2c3d4' → 'callback:view'.
+    """
+    if not data:
+        return "callback:<empty>"
+    parts = data.split('|', 2)
+    if len(parts) > 1 and parts[0].isdigit():
+        return f"callback:{parts[1]}"
+    prefix = data.split('_', 1)[0].split(':', 1)[0]
+    return f"callback:{prefix}"
+
+
+# Реестр дополнительных источников метрик (хранилища, кэши, очереди).
+# Каждый источник возвращает плоский словарь: числа - это gauge,
+# ключи с суффиксом '_total' - счётчики, словари LatencyHistogram.to_dict() - гистограммы.
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], Dict[str, Any]]):
+    """Регистрирует источник метрик компонента (повторная регистрация заменяет старый)"""
+    _collectors[name] = collector
+
+
+def unregister_collector(name: str):
+    """Удаляет источник метрик"""
+    _collectors.pop(name, None)
+
+
+def collect_components() -> Dict[str, Dict[str, Any]]:
+    """Собирает метрики всех зарегистрированных компонентов"""
+    result = {}
+    for name, collector in list(_collectors.items()):
+        try:
+            result[name] = collector()
+        except Exception as e:
+            logger.warning(f"Не удалось собрать метрики компонента {name}: {e}")
+    return result
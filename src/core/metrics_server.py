@@ -0,0 +1,224 @@
+"""
+HTTP-эндпоинт с метриками в формате OpenMetrics (совместим с Prometheus).
+Работает в общем event loop и формирует ответ только в момент запроса.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+METRIC_PREFIX = "glasspen"
+
+# Максимальный размер заголовков запроса (защита от мусорных подключений)
+MAX_REQUEST_SIZE = 8192
+
+
+def _escape_label(value: Any) -> str:
+    """Экранирование значения метки по правилам OpenMetrics"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _is_histogram(value: Any) -> bool:
+    return isinstance(value, dict) and 'buckets' in value and 'counts' in value
+
+
+class OpenMetricsWriter:
+    """
+    Построитель текста в формате OpenMetrics.
+    Сэмплы группируются по семействам, поэтому одну метрику можно
+    дополнять из разных источников (например, из нескольких процессов).
+    """
+
+    def __init__(self):
+        # name -> (type, help, lines); dict сохраняет порядок объявления
+        self._families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def _family(self, name: str, metric_type: str, help_text: str) -> List[str]:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (metric_type, help_text, [])
+        return family[2]
+
+    def gauge(self, name: str, help_text: str, samples: Iterable[Tuple[Dict[str, Any], Any]]):
+        """Добавляет gauge-метрику"""
+        lines = self._family(name, "gauge", help_text)
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def counter(self, name: str, help_text: str, samples: Iterable[Tuple[Dict[str, Any], Any]]):
+        """Добавляет счётчик (значения выводятся с суффиксом _total)"""
+        lines = self._family(name, "counter", help_text)
+        for labels, value in samples:
+            lines.append(f"{name}_total{_format_labels(labels)} {_format_value(value)}")
+
+    def histogram(self, name: str, help_text: str, samples: Iterable[Tuple[Dict[str, Any], Dict]]):
+        """Добавляет гистограмму из словарей LatencyHistogram.to_dict()"""
+        lines = self._family(name, "histogram", help_text)
+        for labels, data in samples:
+            cumulative = 0
+            bounds = [*data['buckets'], "+Inf"]
+            for bound, bucket_count in zip(bounds, data['counts']):
+                cumulative += bucket_count
+                bucket_labels = {**labels, 'le': bound}
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{name}_count{_format_labels(labels)} {data['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(data['sum']))}")
+
+    def render(self) -> str:
+        output = []
+        for name, (metric_type, help_text, lines) in self._families.items():
+            output.append(f"# TYPE {name} {metric_type}")
+            if help_text:
+                output.append(f"# HELP {name} {help_text}")
+            output.extend(lines)
+        output.append("# EOF")
+        return "\n".join(output) + "\n"
+
+
+def _render_components(writer: OpenMetricsWriter, components: Dict[str, Dict[str, Any]],
+                       labels: Dict[str, Any]):
+    """Метрики компонентов: хранилища, кэши, очереди и т.д."""
+    for component, values in sorted(components.items()):
+        for key, value in values.items():
+            name = f"{METRIC_PREFIX}_{component}_{key}"
+            if _is_histogram(value):
+                writer.histogram(name, "", [(labels, value)])
+            elif key.endswith('_total'):
+                writer.counter(name[:-len('_total')], "", [(labels, value)])
+            elif isinstance(value, (int, float)):
+                writer.gauge(name, "", [(labels, value)])
+
+
+def render_openmetrics(status: Dict[str, Any]) -> str:
+    """
+    Преобразует BotManager.get_status() в текст OpenMetrics.
+
+    Args:
+        status: Словарь статуса менеджера ботов
+
+    Returns:
+        Текст для ответа на /metrics
+    """
+    writer = OpenMetricsWriter()
+    p = METRIC_PREFIX
+
+    writer.gauge(f"{p}_manager_up", "Менеджер ботов запущен", [({}, status['manager_running'])])
+    writer.gauge(f"{p}_manager_uptime_seconds", "Время работы менеджера", [({}, float(status['uptime']))])
+    writer.gauge(f"{p}_bots", "Зарегистрировано ботов", [({}, status['total_bots'])])
+    writer.gauge(f"{p}_bots_running", "Работающих ботов", [({}, status['running_bots'])])
+
+    bots = status.get('bots', {})
+    writer.gauge(f"{p}_bot_up", "Бот запущен",
+                 [({'bot': name}, m['is_running']) for name, m in bots.items()])
+    writer.gauge(f"{p}_bot_uptime_seconds", "Время работы бота",
+                 [({'bot': name}, float(m['uptime'])) for name, m in bots.items()])
+    writer.counter(f"{p}_bot_messages_sent", "Отправлено сообщений через BaseBot.send_message",
+                   [({'bot': name}, m['messages_processed']) for name, m in bots.items()])
+    writer.counter(f"{p}_bot_commands", "Обработано команд",
+                   [({'bot': name}, m['commands_processed']) for name, m in bots.items()])
+    writer.counter(f"{p}_bot_errors", "Ошибки, дошедшие до обработчика ошибок",
+                   [({'bot': name}, m['errors']) for name, m in bots.items()])
+
+    handler_rows = [
+        ({'bot': bot_name, 'handler': key}, stats)
+        for bot_name, m in bots.items()
+        for key, stats in m.get('handlers', {}).items()
+    ]
+    writer.counter(f"{p}_handler_calls", "Вызовы обработчика",
+                   [(labels, stats['calls']) for labels, stats in handler_rows])
+    writer.counter(f"{p}_handler_errors", "Исключения в обработчике",
+                   [(labels, stats['errors']) for labels, stats in handler_rows])
+    writer.histogram(f"{p}_handler_latency_seconds", "Длительность обработки",
+                     [(labels, stats['histogram']) for labels, stats in handler_rows])
+
+    _render_components(writer, status.get('components', {}), {})
+
+    # Рабочие процессы (многопроцессный режим BotManager)
+    workers = status.get('workers', {})
+    if workers:
+        writer.gauge(f"{p}_worker_up", "Рабочий процесс жив",
+                     [({'worker': name}, w['alive']) for name, w in workers.items()])
+        writer.counter(f"{p}_worker_restarts", "Перезапуски рабочего процесса",
+                       [({'worker': name}, w['restarts']) for name, w in workers.items()])
+        for name, w in sorted(workers.items()):
+            _render_components(writer, w.get('components', {}), {'worker': name})
+
+    return writer.render()
+
+
+class MetricsServer:
+    """Минимальный HTTP-сервер для отдачи /metrics из общего event loop"""
+
+    def __init__(self, manager, host: str = "127.0.0.1", port: int = 9464):
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Запуск сервера"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        logger.info(f"📈 Метрики доступны по адресу http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        """Остановка сервера"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            logger.info("Сервер метрик остановлен")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Обработка одного HTTP-запроса"""
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+            if len(request) > MAX_REQUEST_SIZE:
+                raise ValueError("Слишком большой запрос")
+
+            request_line = request.split(b"\r\n", 1)[0].decode("latin-1")
+            parts = request_line.split(" ")
+            method, path = (parts[0], parts[1]) if len(parts) >= 2 else ("", "")
+            path = path.split("?", 1)[0]
+
+            if method != "GET":
+                status, content_type, body = "405 Method Not Allowed", "text/plain", "method not allowed\n"
+            elif path == "/metrics":
+                status, content_type = "200 OK", CONTENT_TYPE
+                body = render_openmetrics(self.manager.get_status())
+            elif path == "/health":
+                status, content_type, body = "200 OK", "text/plain", "ok\n"
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except Exception as e:
+            logger.error(f"Ошибка при отдаче метрик: {e}", exc_info=True)
+        finally:
+            writer.close()
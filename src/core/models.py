@@ -9,29 +9,40 @@ from typing import Optional, List
 import uuid
 
 # Если используете pydantic, раскомментируйте строки ниже и закомментируйте @dataclass
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from src.core.timezones import to_utc, utc_now
 
 # @dataclass
 class Note(BaseModel):
     """
     Модель одной записи (заметки) пользователя.
+    Время хранится в UTC; время без пояса (старые данные) считается временем сервера.
     """
+    model_config = ConfigDict(validate_assignment=True)
+    
     # Обязательные поля
     id: str = field(default_factory=lambda: str(uuid.uuid4()))  # Уникальный идентификатор
     user_id: int  # ID пользователя Telegram, владельца записи
     text: str  # Текст записи
     
     # Автоматически заполняемые временные метки
-    created_at: datetime = field(default_factory=datetime.now)
-    updated_at: datetime = field(default_factory=datetime.now)
+    created_at: datetime = field(default_factory=utc_now)
+    updated_at: datetime = field(default_factory=utc_now)
     
     # Опциональные поля
     category: str = "Без категории"  # Категория для организации
     reminder_at: Optional[datetime] = None  # Время напоминания (если установлено)
+    reminder_rule: Optional[str] = None  # Правило повторения напоминания (daily, weekly, cron...)
     tags: List[str] = field(default_factory=list)  # Список тегов (#работа, #хобби)
     is_important: bool = False  # Флаг важности
     comment: Optional[str] = None  # Дополнительный комментарий
     
+    @field_validator("created_at", "updated_at", "reminder_at")
+    @classmethod
+    def _to_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return to_utc(value)
+    
     def to_dict(self) -> dict:
         """Конвертирует объект Note в словарь для сохранения в JSON."""
         result = {
@@ -47,6 +58,8 @@ class Note(BaseModel):
         # Обрабатываем опциональные поля с None
         if self.reminder_at:
             result["reminder_at"] = self.reminder_at.isoformat()
+        if self.reminder_rule:
+            result["reminder_rule"] = self.reminder_rule
         if self.comment:
             result["comment"] = self.comment
         return result
@@ -71,6 +84,7 @@ class Note(BaseModel):
             updated_at=updated_at,
             category=data.get("category", "Без категории"),
             reminder_at=reminder_at,
+            reminder_rule=data.get("reminder_rule"),
             tags=data.get("tags", []),
             is_important=data.get("is_important", False),
             comment=data.get("comment"),
@@ -0,0 +1,110 @@
+"""
+Упорядоченный индекс записей пользователя.
+Записи хранятся отсортированными по (created_at, id), поэтому страница
+списка - это срез фиксированной длины, а не сортировка всей истории,
+а продолжение с курсора начинается с бинарного поиска позиции.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from src.core.models import Note
+
+# Ключ сортировки: время создания, затем ID (для записей с одинаковым временем)
+IndexKey = Tuple[datetime, str]
+
+# Фильтр записей при постраничном обходе (поиск и т.п.)
+NoteFilter = Callable[[Note], bool]
+
+
+def note_key(note: Note) -> IndexKey:
+    """Ключ записи в индексе"""
+    return (note.created_at, note.id)
+
+
+class NoteIndex:
+    """
+    Записи одного пользователя по возрастанию (created_at, id).
+    Вставка и удаление - O(log n) на поиск позиции, страница - O(размер страницы).
+    """
+
+    def __init__(self, notes: Iterable[Note] = ()):
+        pairs = sorted(((note_key(note), note) for note in notes), key=lambda pair: pair[0])
+        self._keys: List[IndexKey] = [key for key, _ in pairs]
+        self._notes: List[Note] = [note for _, note in pairs]
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def add(self, note: Note):
+        """Добавляет запись в индекс"""
+        key = note_key(note)
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._notes.insert(position, note)
+
+    def remove(self, key: IndexKey) -> bool:
+        """Удаляет запись по ключу. Возвращает True, если запись была в индексе"""
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+            del self._notes[position]
+            return True
+        return False
+
+    def page(self, offset: int, limit: int) -> List[Note]:
+        """Записи от новых к старым: пропустить offset самых новых и вернуть до limit"""
+        end = len(self._notes) - max(0, offset)
+        if end <= 0 or limit <= 0:
+            return []
+        start = max(0, end - limit)
+        return self._notes[start:end][::-1]
+
+    def position(self, key: IndexKey) -> int:
+        """Сколько записей новее позиции key (смещение страницы в списке «новые сверху»)"""
+        return len(self._keys) - bisect_right(self._keys, key)
+
+    def older(self, key: Optional[IndexKey], limit: int, match: Optional[NoteFilter] = None,
+              since: Optional[IndexKey] = None) -> Tuple[List[Note], bool]:
+        """
+        Записи старше курсора, от новых к старым.
+
+        Args:
+            key: Курсор (последняя показанная запись); None - с самой новой
+            limit: Сколько записей вернуть
+            match: Фильтр записей
+            since: Нижняя граница (записи старше не возвращаются)
+
+        Returns:
+            (записи, есть ли дальше ещё подходящие)
+        """
+        position = len(self._keys) if key is None else bisect_left(self._keys, key)
+        lower = 0 if since is None else bisect_left(self._keys, since)
+        found: List[Note] = []
+        for i in range(position - 1, lower - 1, -1):
+            note = self._notes[i]
+            if match is None or match(note):
+                if len(found) == limit:
+                    return found, True
+                found.append(note)
+        return found, False
+
+    def newer(self, key: IndexKey, limit: int, match: Optional[NoteFilter] = None,
+              until: Optional[IndexKey] = None) -> Tuple[List[Note], bool]:
+        """
+        Ближайшие записи новее курсора (страница «Назад»), от новых к старым.
+
+        Returns:
+            (записи, есть ли ещё более новые подходящие)
+        """
+        position = bisect_right(self._keys, key)
+        upper = len(self._keys) if until is None else bisect_left(self._keys, until)
+        found: List[Note] = []
+        for i in range(position, upper):
+            note = self._notes[i]
+            if match is None or match(note):
+                if len(found) == limit:
+                    return found[::-1], True
+                found.append(note)
+        return found[::-1], False
@@ -5,14 +5,32 @@
 
 import json
 import logging
+import sys
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from datetime import datetime
 
 from src.core.models import Note
+from src.core.cache import LRUCache
+from src.core.events import EventBus, NoteEvent, NOTE_ADDED, NOTE_UPDATED, NOTE_DELETED
+from src.core.cursor import Cursor
+from src.core.note_index import NoteFilter, NoteIndex, note_key
+from src.core.metrics import LatencyHistogram, register_collector
+from src.core.startup_profiler import startup_profiler
+from src.core.timezones import to_utc, utc_now
+from src.utils.structured_logging import log_event
 
 logger = logging.getLogger(__name__)
 
+
+def _short_id_entry_size(obj) -> int:
+    """Оценка размера записи кэша коротких ID"""
+    # Note принадлежит хранилищу, кэш держит только ссылку на него
+    return 8 if isinstance(obj, Note) else sys.getsizeof(obj)
+
+
 class NoteManager:
     """Управляет хранением и обработкой записей."""
     
@@ -24,10 +42,72 @@ class NoteManager:
             storage_path: Путь к файлу JSON для хранения данных.
         """
         self.storage_path = Path(storage_path)
-        self._ensure_storage_exists()
-        self._notes_cache = {}  # Кэш: {user_id: [Note, Note, ...]}
-        self._load_all_notes()
+        # Кэш {user_id: [Note, Note, ...]}; файл читается при первом обращении или в init()
+        self._cache: Optional[Dict[int, List[Note]]] = None
+        self._init_lock = threading.Lock()
+        # Номер загрузки хранилища: индексы планировщиков сверяют его при перезапуске
+        self.generation = 0
+        
+        # Время сохранения файла хранилища (для метрик)
+        self.flush_latency = LatencyHistogram()
+        self.load_seconds = 0.0
+        
+        # Короткий ID (первые символы id) → запись; общий на процесс и ограниченный
+        self._short_ids = LRUCache(
+            maxsize=10000, ttl=3600, sizeof=_short_id_entry_size, name="short_ids"
+        )
+        
+        # События об изменениях записей для кэшей, индексов и планировщиков
+        self.events = EventBus("note_events")
+        self.events.subscribe(self._invalidate_short_ids)
+        
+        # Упорядоченные индексы записей для постраничного вывода (строятся лениво)
+        self._indexes: Dict[int, NoteIndex] = {}
+        self.events.subscribe(self._update_index)
+        
+        register_collector("notes_storage", self.get_storage_metrics)
+    
+    def init(self):
+        """
+        Загружает хранилище, если оно ещё не загружено.
+        Можно вызвать заранее (в том числе из другого потока); иначе
+        загрузка произойдёт при первом обращении к записям.
+        """
+        if self._cache is not None:
+            return
+        with self._init_lock:
+            if self._cache is None:
+                with startup_profiler.phase("notes_storage"):
+                    self._ensure_storage_exists()
+                    self._load_all_notes()
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Загружено ли хранилище"""
+        return self._cache is not None
+    
+    @property
+    def _notes_cache(self) -> Dict[int, List[Note]]:
+        if self._cache is None:
+            self.init()
+        return self._cache
+    
+    @_notes_cache.setter
+    def _notes_cache(self, value: Dict[int, List[Note]]):
+        self._cache = value
     
+    def use_storage(self, storage_path: str):
+        """
+        Переключает менеджер на другой файл хранилища (читается при первом обращении).
+        Используется шардами: каждый процесс работает только со своим файлом.
+        """
+        with self._init_lock:
+            self.storage_path = Path(storage_path)
+            self._short_ids.clear()
+            self._indexes.clear()
+            self._cache = None
+        logger.info(f"Хранилище записей переключено на {self.storage_path}")
+
     def _ensure_storage_exists(self):
         """Убеждается, что директория и файл для хранения данных существуют."""
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
@@ -37,25 +117,34 @@ class NoteManager:
     
     def _load_all_notes(self):
         """Загружает все записи из JSON файла в кэш."""
+        started = time.perf_counter()
+        # Кэш собирается целиком и подменяется одним присваиванием:
+        # другой поток не увидит наполовину загруженные записи
+        cache: Dict[int, List[Note]] = {}
         try:
             data = json.loads(self.storage_path.read_text(encoding="utf-8"))
-            self._notes_cache = {}
             
             for user_id_str, notes_list in data.items():
                 user_id = int(user_id_str)
-                self._notes_cache[user_id] = [
+                cache[user_id] = [
                     Note.from_dict(note_data) for note_data in notes_list
                 ]
             
-            total_notes = sum(len(notes) for notes in self._notes_cache.values())
-            logger.info(f"Загружено {total_notes} записей для {len(self._notes_cache)} пользователей")
+            total_notes = sum(len(notes) for notes in cache.values())
+            logger.info(f"Загружено {total_notes} записей для {len(cache)} пользователей")
         
         except (json.JSONDecodeError, FileNotFoundError) as e:
             logger.warning(f"Ошибка при загрузке записей, создаём новое хранилище: {e}")
-            self._notes_cache = {}
+            cache = {}
+        
+        self._indexes.clear()
+        self._notes_cache = cache
+        self.generation += 1
+        self.load_seconds = time.perf_counter() - started
     
     def _save_all_notes(self):
         """Сохраняет все записи из кэша в JSON файл."""
+        started = time.perf_counter()
         data = {}
         for user_id, notes in self._notes_cache.items():
             data[str(user_id)] = [note.to_dict() for note in notes]
@@ -64,7 +153,9 @@ class NoteManager:
             json.dumps(data, indent=2, ensure_ascii=False),
             encoding="utf-8"
         )
-        logger.debug(f"Сохранено {sum(len(notes) for notes in self._notes_cache.values())} записей")
+        self.flush_latency.observe(time.perf_counter() - started)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Сохранено %s записей", sum(len(notes) for notes in self._notes_cache.values()))
     
     # --- Основные CRUD операции ---
     
@@ -83,8 +174,10 @@ class NoteManager:
         
         self._notes_cache[note.user_id].append(note)
         self._save_all_notes()
+        self.events.publish(NoteEvent(NOTE_ADDED, note.user_id, note.id, note))
         
-        logger.info(f"Добавлена запись {note.id} для пользователя {note.user_id}")
+        log_event(logger, "note.added", "Добавлена запись %s для пользователя %s", note.id, note.user_id,
+                  note_id=note.id)
         return note
     
     def get_note(self, user_id: int, note_id: str) -> Optional[Note]:
@@ -95,16 +188,124 @@ class NoteManager:
                 return note
         return None
     
+    def find_note_by_short_id(self, user_id: int, short_id: str) -> Optional[Note]:
+        """
+        Находит запись пользователя по короткому ID (префиксу id).
+        Результат кэшируется до изменения записей пользователя.
+        """
+        key = (user_id, short_id)
+        note = self._short_ids.get(key)
+        if note is not None:
+            return note
+        
+        for note in self._notes_cache.get(user_id, []):
+            if note.id.startswith(short_id):
+                self._short_ids.set(key, note, tag=user_id)
+                return note
+        return None
+    
+    def _invalidate_short_ids(self, event: NoteEvent):
+        """Подписчик: сбрасывает кэш коротких ID пользователя при любом изменении"""
+        # Новая запись может совпасть с уже закэшированным коротким префиксом
+        self._short_ids.invalidate_tag(event.user_id)
+    
     def get_all_notes(self, user_id: int) -> List[Note]:
         """Возвращает ВСЕ записи пользователя."""
         return self._notes_cache.get(user_id, [])
     
     def get_recent_notes(self, user_id: int, limit: int = 10) -> List[Note]:
         """Возвращает последние записи пользователя (по дате создания)."""
-        notes = self.get_all_notes(user_id)
-        # Сортируем по дате создания (новые сверху)
-        notes.sort(key=lambda x: x.created_at, reverse=True)
-        return notes[:limit]
+        return self._get_index(user_id).page(0, limit)
+    
+    def get_notes_page(self, user_id: int, page: int, per_page: int) -> Tuple[List[Note], int]:
+        """
+        Одна страница записей пользователя (новые сверху).
+        Стоимость не зависит от числа записей: страница - срез упорядоченного индекса.
+        
+        Args:
+            user_id: ID пользователя.
+            page: Номер страницы (с 0).
+            per_page: Записей на странице.
+        
+        Returns:
+            (записи страницы, всего записей)
+        """
+        index = self._get_index(user_id)
+        return index.page(page * per_page, per_page), len(index)
+    
+    def get_notes_from_cursor(self, user_id: int, cursor: Optional[Cursor], limit: int,
+                              newer: bool = False, match: Optional[NoteFilter] = None,
+                              since: Optional[datetime] = None,
+                              until: Optional[datetime] = None) -> Tuple[List[Note], bool]:
+        """
+        Продолжение списка записей с курсора (новые сверху).
+        Позиция курсора находится бинарным поиском, поэтому глубина страницы
+        не влияет на стоимость, а изменения списка не сдвигают страницы.
+        
+        Args:
+            user_id: ID пользователя.
+            cursor: (created_at, id) последней показанной записи; None - с начала списка.
+            limit: Записей на странице.
+            newer: Страница «Назад» - записи новее курсора.
+            match: Фильтр записей (поиск).
+            since: Не раньше этого времени (например, начало дня).
+            until: Раньше этого времени.
+        
+        Returns:
+            (записи страницы, есть ли ещё записи в этом направлении)
+        """
+        index = self._get_index(user_id)
+        # Ключи индекса в UTC; курсоры старых кнопок могут быть без пояса
+        if cursor is not None:
+            cursor = (to_utc(cursor[0]), cursor[1])
+        lower = (to_utc(since), "") if since is not None else None
+        upper = (to_utc(until), "") if until is not None else None
+        if newer and cursor is not None:
+            return index.newer(cursor, limit, match, until=upper)
+        if cursor is None and upper is not None:
+            cursor = upper
+        return index.older(cursor, limit, match, since=lower)
+    
+    def iter_notes(self, user_id: int, since: Optional[datetime] = None,
+                   until: Optional[datetime] = None, batch: int = 100) -> Iterator[Note]:
+        """
+        Записи пользователя за период (новые сверху) порциями по batch.
+        Обход идёт по курсору, поэтому изменения списка во время
+        потоковой отправки не приводят к пропускам и повторам.
+        """
+        cursor: Optional[Cursor] = None
+        while True:
+            notes, has_more = self.get_notes_from_cursor(user_id, cursor, batch, since=since, until=until)
+            yield from notes
+            if not has_more or not notes:
+                return
+            cursor = note_key(notes[-1])
+    
+    def count_newer_notes(self, user_id: int, cursor: Cursor) -> int:
+        """Сколько записей пользователя новее курсора (для номера страницы)"""
+        return self._get_index(user_id).position((to_utc(cursor[0]), cursor[1]))
+    
+    def _get_index(self, user_id: int) -> NoteIndex:
+        """Упорядоченный индекс пользователя (строится при первом обращении)"""
+        index = self._indexes.get(user_id)
+        if index is None:
+            index = NoteIndex(self._notes_cache.get(user_id, []))
+            self._indexes[user_id] = index
+        return index
+    
+    def _update_index(self, event: NoteEvent):
+        """Подписчик: точечно поправляет индекс пользователя, если он уже построен"""
+        index = self._indexes.get(event.user_id)
+        if index is None:
+            return
+        if event.kind == NOTE_ADDED:
+            index.add(event.note)
+        elif event.kind == NOTE_DELETED:
+            index.remove(note_key(event.note))
+        elif event.changed('created_at'):
+            previous_created_at = event.changes['created_at'][0]
+            index.remove((previous_created_at, event.note_id))
+            index.add(event.note)
     
     def get_notes_by_category(self, user_id: int, category: str) -> List[Note]:
         """Возвращает записи пользователя по категории."""
@@ -131,18 +332,52 @@ class NoteManager:
             logger.warning(f"Запись {note_id} не найдена для пользователя {user_id}")
             return None
         
-        # Обновляем поля
+        # Обновляем поля, запоминая прежние значения для подписчиков
+        changes = {}
         for field, value in updates.items():
             if hasattr(note, field):
+                before = getattr(note, field)
+                if before != value:
+                    changes[field] = (before, value)
                 setattr(note, field, value)
         
         # Обновляем время изменения
-        note.updated_at = datetime.now()
+        previous_updated_at = note.updated_at
+        note.updated_at = utc_now()
+        changes['updated_at'] = (previous_updated_at, note.updated_at)
         
         self._save_all_notes()
-        logger.info(f"Обновлена запись {note_id} для пользователя {user_id}")
+        self.events.publish(NoteEvent(NOTE_UPDATED, user_id, note_id, note, changes))
+        log_event(logger, "note.updated", "Обновлена запись %s для пользователя %s", note_id, user_id,
+                  note_id=note_id)
         return note
     
+    def set_reminders(self, user_id: int, due_by_id: Dict[str, Optional[datetime]]) -> int:
+        """
+        Меняет сроки напоминаний нескольких записей пользователя одним сохранением
+        (доставка сводки: разовые снимаются, повторяющиеся переносятся).
+        
+        Args:
+            user_id: ID пользователя.
+            due_by_id: ID записи → новый срок (None - снять напоминание).
+        
+        Returns:
+            Сколько записей изменено
+        """
+        due_by_id = {note_id: to_utc(due) for note_id, due in due_by_id.items()}
+        events = []
+        for note in self._notes_cache.get(user_id, []):
+            if note.id in due_by_id and note.reminder_at != due_by_id[note.id]:
+                changes = {'reminder_at': (note.reminder_at, due_by_id[note.id])}
+                note.reminder_at = due_by_id[note.id]
+                events.append(NoteEvent(NOTE_UPDATED, user_id, note.id, note, changes))
+        
+        if events:
+            self._save_all_notes()
+            for event in events:
+                self.events.publish(event)
+        return len(events)
+    
     def delete_note(self, user_id: int, note_id: str) -> bool:
         """Удаляет запись по ID. Возвращает True, если удаление прошло успешно."""
         user_notes = self._notes_cache.get(user_id, [])
@@ -151,7 +386,9 @@ class NoteManager:
             if note.id == note_id:
                 del user_notes[i]
                 self._save_all_notes()
-                logger.info(f"Удалена запись {note_id} для пользователя {user_id}")
+                self.events.publish(NoteEvent(NOTE_DELETED, user_id, note_id, note))
+                log_event(logger, "note.deleted", "Удалена запись %s для пользователя %s", note_id, user_id,
+                          note_id=note_id)
                 return True
         
         logger.warning(f"Не удалось удалить запись {note_id} для пользователя {user_id}")
@@ -175,5 +412,17 @@ class NoteManager:
                     all_notes.append(note)
         return all_notes
 
+    def get_storage_metrics(self) -> Dict[str, Any]:
+        """Метрики хранилища: объём данных и время сохранения/загрузки"""
+        # Сбор метрик не должен загружать хранилище
+        cache = self._cache or {}
+        return {
+            'loaded': self.is_loaded,
+            'users': len(cache),
+            'notes': sum(len(notes) for notes in cache.values()),
+            'load_seconds': self.load_seconds,
+            'flush_seconds': self.flush_latency.to_dict(),
+        }
+
 # Глобальный экземпляр менеджера для использования во всём приложении
 note_manager = NoteManager()
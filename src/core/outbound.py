@@ -0,0 +1,179 @@
+"""
+Исходящие запросы к Telegram Bot API с соблюдением лимитов.
+Общий ограничитель скорости (все чаты и каждый чат отдельно) и
+отправитель, через который проходят ответы ботов.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram: около 30 сообщений в секунду на бота,
+# не больше 1 сообщения в секунду в личный чат и 20 в минуту в группу
+GLOBAL_RATE = 30.0
+PRIVATE_CHAT_RATE = 1.0
+GROUP_CHAT_RATE = 20.0 / 60.0
+
+# Методы API, на которые распространяются лимиты отправки
+LIMITED_METHOD_PREFIXES = ("send", "edit", "copy", "forward")
+
+
+def is_rate_limited_method(api_method: str) -> bool:
+    """Попадает ли метод API ('sendMessage', 'editMessageText'...) под лимиты отправки"""
+    return api_method.startswith(LIMITED_METHOD_PREFIXES)
+
+
+class RateLimiter:
+    """
+    Ограничитель скорости отправки.
+
+    Для каждого запроса резервируется ближайший момент, когда он
+    укладывается в лимит своего чата, а затем - в общий лимит бота.
+    Резерв делается синхронно, поэтому конкурентные задачи одного
+    event loop не обгоняют друг друга.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE,
+                 private_rate: float = PRIVATE_CHAT_RATE,
+                 group_rate: float = GROUP_CHAT_RATE):
+        """
+        Args:
+            global_rate: Запросов в секунду на всего бота
+            private_rate: Запросов в секунду в один личный чат
+            group_rate: Запросов в секунду в одну группу
+        """
+        self.global_interval = 1.0 / global_rate
+        self.private_interval = 1.0 / private_rate
+        self.group_interval = 1.0 / group_rate
+
+        self._next_global = 0.0
+        self._next_chat: Dict[Any, float] = {}
+        self._paused_until = 0.0
+
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def _chat_interval(self, chat_id: Any) -> float:
+        try:
+            return self.group_interval if int(chat_id) < 0 else self.private_interval
+        except (TypeError, ValueError):
+            # @username канала и т.п. - считаем группой
+            return self.group_interval
+
+    def reserve_chat(self, chat_id: Any) -> float:
+        """
+        Резервирует слот отправки в чат.
+
+        Returns:
+            Сколько секунд нужно подождать перед отправкой
+        """
+        now = time.monotonic()
+        start = max(now, self._next_chat.get(chat_id, 0.0))
+        self._next_chat[chat_id] = start + self._chat_interval(chat_id)
+        if len(self._next_chat) > 10000:
+            self._prune(now)
+        return start - now
+
+    def reserve_global(self) -> float:
+        """Резервирует слот в общем лимите бота (возвращает время ожидания)"""
+        now = time.monotonic()
+        start = max(now, self._next_global, self._paused_until)
+        self._next_global = start + self.global_interval
+        return start - now
+
+    async def acquire(self, chat_id: Any = None):
+        """
+        Ждёт своей очереди на отправку.
+        Сначала ожидается лимит чата и только потом общий слот, поэтому
+        очередь к одному «горячему» чату не задерживает остальные чаты.
+        """
+        waited = 0.0
+        if chat_id is not None:
+            delay = self.reserve_chat(chat_id)
+            if delay > 0:
+                waited += delay
+                await asyncio.sleep(delay)
+        delay = self.reserve_global()
+        if delay > 0:
+            waited += delay
+            await asyncio.sleep(delay)
+        if waited > 0:
+            self.throttled += 1
+            self.waited_seconds += waited
+
+    def pause(self, seconds: float):
+        """Приостанавливает все отправки (ответ 429 с retry_after)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"Telegram попросил подождать {seconds:.0f} сек., отправка приостановлена")
+
+    def _prune(self, now: float):
+        """Удаляет чаты, лимит которых уже не действует"""
+        self._next_chat = {chat: at for chat, at in self._next_chat.items() if at > now}
+
+
+class RateLimitedSender:
+    """
+    Отправитель запросов через общий RateLimiter.
+    Каждый запрос выполняется отдельной задачей, число одновременно
+    выполняемых HTTP-запросов ограничено семафором.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, max_concurrency: int = 16):
+        self.limiter = limiter or RateLimiter()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: set = set()
+
+        self.pending = 0
+        self.sent = 0
+        self.failed = 0
+
+    def submit(self, send: Callable[[], Awaitable[Any]], chat_id: Any = None,
+               limited: bool = True) -> asyncio.Task:
+        """
+        Ставит запрос в очередь.
+
+        Args:
+            send: Корутинная функция, выполняющая запрос
+            chat_id: Чат получателя (для лимита на чат)
+            limited: Применять ли лимиты отправки
+
+        Returns:
+            Задача с результатом send()
+        """
+        task = asyncio.create_task(self._run(send, chat_id, limited))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, send: Callable[[], Awaitable[Any]], chat_id: Any, limited: bool):
+        self.pending += 1
+        try:
+            if limited:
+                await self.limiter.acquire(chat_id)
+            async with self._semaphore:
+                result = await send()
+            self.sent += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    async def drain(self, timeout: float = 10.0):
+        """Ждёт завершения уже поставленных запросов"""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики отправителя для BotManager и экспорта"""
+        return {
+            'queue_depth': self.pending,
+            'sent_total': self.sent,
+            'failed_total': self.failed,
+            'throttled_total': self.limiter.throttled,
+            'throttle_wait_seconds_total': self.limiter.waited_seconds,
+        }
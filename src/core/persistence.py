@@ -0,0 +1,239 @@
+"""
+Хранение состояния ботов (user_data, chat_data, bot_data, состояния
+ConversationHandler) в SQLite.
+
+В отличие от PicklePersistence, которая при каждом сохранении
+сериализует всё целиком, здесь каждый пользователь хранится отдельной
+строкой: читаются только те, кто пишет боту, а записываются только
+изменившиеся - пачкой в одной транзакции.
+"""
+
+import asyncio
+import json
+import logging
+import pickle
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from src.core.metrics import LatencyHistogram, register_collector, unregister_collector
+
+logger = logging.getLogger(__name__)
+
+# Маркер удаления в очереди записи
+_DELETED = object()
+
+# Таблицы "id -> данные"; bot_data и callback_data общие для всего бота
+STATE_TABLES = ("user_data", "chat_data", "bot_data", "callback_data")
+SHARED_STATE_TABLES = ("bot_data", "callback_data")
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS chat_data (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS bot_data (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS callback_data (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    BasePersistence на SQLite с ленивой загрузкой и отложенной записью.
+
+    - get_user_data()/get_chat_data() возвращают пустые словари, а данные
+      конкретного пользователя подгружаются в refresh_user_data() при его
+      первом обновлении;
+    - update_*() только сериализуют изменения в очередь; запись всех
+      накопленных строк выполняется одной транзакцией в отдельном потоке,
+      не блокируя event loop.
+    """
+
+    def __init__(self, path: str, update_interval: float = 5.0,
+                 store_data: Optional[PersistenceInput] = None):
+        """
+        Args:
+            path: Путь к файлу базы SQLite
+            update_interval: Как часто Application передаёт изменения (секунды)
+            store_data: Какие данные хранить (по умолчанию все)
+        """
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(STATE_SCHEMA)
+
+        self._loaded_users: set = set()
+        self._loaded_chats: set = set()
+        # Очередь записи: (таблица, ключ) -> сериализованные данные или _DELETED
+        self._pending: Dict[Tuple[str, Any], Any] = {}
+        self._write_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+        self.write_latency = LatencyHistogram()
+        self.rows_written = 0
+        self.rows_loaded = 0
+
+        self._collector_name = "persistence_" + re.sub(r"\W", "_", self.path.stem)
+        register_collector(self._collector_name, self.get_metrics)
+
+    # ---- Чтение ----
+
+    def _load_row(self, table: str, row_id: int) -> Optional[Any]:
+        row = self._conn.execute(f"SELECT data FROM {table} WHERE id = ?", (row_id,)).fetchone()
+        if row is None:
+            return None
+        self.rows_loaded += 1
+        return pickle.loads(row[0])
+
+    async def get_user_data(self) -> Dict[int, Any]:
+        # Пользователи загружаются по одному в refresh_user_data
+        return {}
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def get_bot_data(self) -> Any:
+        return self._load_row("bot_data", 0) or {}
+
+    async def get_callback_data(self) -> Optional[Any]:
+        return self._load_row("callback_data", 0)
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, object]:
+        rows = self._conn.execute(
+            "SELECT key, state FROM conversations WHERE name = ?", (name,)
+        ).fetchall()
+        return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+
+    async def refresh_user_data(self, user_id: int, user_data: Any):
+        """Подгружает данные пользователя при первом обращении к нему"""
+        if user_id in self._loaded_users:
+            return
+        self._loaded_users.add(user_id)
+        stored = self._load_row("user_data", user_id)
+        if stored:
+            # Значения, уже выставленные в этой сессии, важнее сохранённых
+            user_data.update({**stored, **user_data})
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any):
+        if chat_id in self._loaded_chats:
+            return
+        self._loaded_chats.add(chat_id)
+        stored = self._load_row("chat_data", chat_id)
+        if stored:
+            chat_data.update({**stored, **chat_data})
+
+    async def refresh_bot_data(self, bot_data: Any):
+        # bot_data целиком загружается при старте
+        pass
+
+    # ---- Запись ----
+
+    def _enqueue(self, table: str, key: Any, value: Any):
+        # Сериализуем сразу: к моменту записи объект может измениться
+        self._pending[(table, key)] = value if value is _DELETED else pickle.dumps(value)
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_pending())
+
+    async def update_user_data(self, user_id: int, data: Any):
+        self._loaded_users.add(user_id)
+        self._enqueue("user_data", user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: Any):
+        self._loaded_chats.add(chat_id)
+        self._enqueue("chat_data", chat_id, data)
+
+    async def update_bot_data(self, data: Any):
+        self._enqueue("bot_data", 0, data)
+
+    async def update_callback_data(self, data: Any):
+        self._enqueue("callback_data", 0, data)
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]):
+        self._enqueue("conversations", (name, json.dumps(list(key))),
+                      _DELETED if new_state is None else new_state)
+
+    async def drop_user_data(self, user_id: int):
+        self._loaded_users.discard(user_id)
+        self._enqueue("user_data", user_id, _DELETED)
+
+    async def drop_chat_data(self, chat_id: int):
+        self._loaded_chats.discard(chat_id)
+        self._enqueue("chat_data", chat_id, _DELETED)
+
+    async def _write_pending(self):
+        """Записывает накопленные изменения одной транзакцией"""
+        # Application обновляет пользователей параллельно: даём им попасть в одну пачку
+        await asyncio.sleep(0)
+        async with self._write_lock:
+            # Пока идёт запись, в очередь могут прийти новые изменения - пишем и их
+            while self._pending:
+                batch, self._pending = self._pending, {}
+                started = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                except sqlite3.Error as e:
+                    logger.error(f"Не удалось сохранить состояние в {self.path}: {e}")
+                    # Не теряем изменения: более свежие значения из очереди важнее
+                    self._pending = {**batch, **self._pending}
+                    return
+                self.write_latency.observe(time.perf_counter() - started)
+                self.rows_written += len(batch)
+
+    def _write_batch(self, batch: Dict[Tuple[str, Any], Any]):
+        with self._conn:
+            for (table, key), value in batch.items():
+                if table == "conversations":
+                    name, conv_key = key
+                    if value is _DELETED:
+                        self._conn.execute(
+                            "DELETE FROM conversations WHERE name = ? AND key = ?", (name, conv_key)
+                        )
+                    else:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                            (name, conv_key, value)
+                        )
+                elif value is _DELETED:
+                    self._conn.execute(f"DELETE FROM {table} WHERE id = ?", (key,))
+                else:
+                    self._conn.execute(
+                        f"INSERT OR REPLACE INTO {table} (id, data) VALUES (?, ?)", (key, value)
+                    )
+
+    async def flush(self):
+        """
+        Дописывает очередь (вызывается Application при остановке).
+        Соединение остаётся открытым: после тёплого перезапуска бота
+        Application продолжает писать в то же хранилище.
+        """
+        if self._write_task:
+            await self._write_task
+        await self._write_pending()
+        logger.info(f"Состояние сохранено в {self.path}")
+
+    def close(self):
+        """Закрывает базу (после окончательной остановки бота)"""
+        self._conn.close()
+        unregister_collector(self._collector_name)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики хранилища состояния"""
+        return {
+            'loaded_users': len(self._loaded_users),
+            'pending_rows': len(self._pending),
+            'rows_loaded_total': self.rows_loaded,
+            'rows_written_total': self.rows_written,
+            'write_seconds': self.write_latency.to_dict(),
+        }
@@ -0,0 +1,291 @@
+"""
+Многопроцессный режим BotManager.
+Каждая группа ботов работает в своём процессе со своим event loop,
+а родительский процесс следит за ними, перезапускает упавшие
+и собирает их метрики через локальный канал (multiprocessing.Pipe).
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Как часто рабочий процесс отправляет свой статус родителю (секунды)
+STATUS_INTERVAL = 5.0
+# Как часто рабочий процесс проверяет здоровье своих ботов (секунды)
+HEALTH_CHECK_INTERVAL = 60.0
+# Сколько ждать завершения процесса после команды stop (секунды)
+STOP_TIMEOUT = 15.0
+
+
+@dataclass
+class WorkerSpec:
+    """Описание рабочего процесса: какие боты в нём запускаются"""
+    name: str
+    # Список (класс бота, токен, конфиг) - всё должно сериализоваться pickle
+    bots: List[Tuple[type, str, Dict[str, Any]]] = field(default_factory=list)
+    # Общие настройки: уровень логов, монитор event loop и т.д.
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class WorkerState:
+    """Состояние рабочего процесса в супервизоре"""
+    spec: WorkerSpec
+    process: Optional[multiprocessing.Process] = None
+    conn: Any = None
+    started_at: float = 0.0
+    restarts: int = 0
+    backoff: float = 1.0
+    next_restart_at: Optional[float] = None
+    last_status: Dict[str, Any] = field(default_factory=dict)
+    last_status_at: float = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+# ---- РАБОЧИЙ ПРОЦЕСС ----
+
+def worker_main(spec: WorkerSpec, conn):
+    """Точка входа рабочего процесса (выполняется в дочернем процессе)"""
+    from src.utils.logging_config import setup_logging
+
+    # У каждого процесса свои файлы логов: ротация из нескольких процессов небезопасна
+    setup_logging(spec.options.get('log_level', 'INFO'), log_dir=f"logs/{spec.name}",
+                  **spec.options.get('logging', {}))
+    logger.info(f"Рабочий процесс {spec.name} запущен")
+
+    try:
+        exit_code = asyncio.run(_worker_async(spec, conn))
+    except KeyboardInterrupt:
+        exit_code = 0
+    # Код выхода нужен супервизору, чтобы отличить сбой от штатной остановки
+    sys.exit(exit_code)
+
+
+async def _worker_async(spec: WorkerSpec, conn) -> int:
+    """Запускает ботов группы и обслуживает канал связи с родителем"""
+    from src.core.bot_manager import BotManager
+    from src.core.sharding import create_bot
+
+    manager = BotManager()
+    for bot_class, token, bot_config in spec.bots:
+        manager.register_bot(create_bot(bot_class, token, bot_config))
+
+    loop_monitor = spec.options.get('loop_monitor')
+    if loop_monitor:
+        await manager.start_loop_monitor(*loop_monitor)
+
+    await manager.start_all()
+
+    if not any(bot.is_running for bot in manager.bots.values()):
+        logger.error(f"В процессе {spec.name} не запустился ни один бот")
+        await manager.stop_all()
+        return 1
+
+    last_health_check = time.monotonic()
+    try:
+        while True:
+            try:
+                conn.send(('status', manager.get_status()))
+            except (BrokenPipeError, EOFError, OSError):
+                logger.warning(f"Родительский процесс недоступен, завершаем {spec.name}")
+                break
+
+            command = await _wait_for_command(conn, STATUS_INTERVAL)
+            if command == 'stop':
+                logger.info(f"Процесс {spec.name} получил команду остановки")
+                break
+
+            if time.monotonic() - last_health_check >= HEALTH_CHECK_INTERVAL:
+                await manager.health_check()
+                last_health_check = time.monotonic()
+    finally:
+        await manager.stop_all()
+        await manager.stop_loop_monitor()
+
+    return 0
+
+
+async def _wait_for_command(conn, timeout: float) -> Optional[str]:
+    """Ждёт команду от родителя, не блокируя event loop"""
+    try:
+        if not await asyncio.to_thread(conn.poll, timeout):
+            return None
+        message = conn.recv()
+    except (EOFError, OSError):
+        return 'stop'
+    return message[0] if message else None
+
+
+# ---- СУПЕРВИЗОР (родительский процесс) ----
+
+class ProcessSupervisor:
+    """Запускает рабочие процессы, перезапускает упавшие и собирает их метрики"""
+
+    def __init__(self, specs: List[WorkerSpec], initial_backoff: float = 1.0,
+                 max_backoff: float = 60.0, stable_after: float = 60.0):
+        """
+        Args:
+            specs: Описания рабочих процессов
+            initial_backoff: Начальная задержка перед перезапуском (секунды)
+            max_backoff: Максимальная задержка перед перезапуском (секунды)
+            stable_after: Через сколько секунд работы процесс считается стабильным
+                          и задержка перезапуска сбрасывается
+        """
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.workers: Dict[str, WorkerState] = {
+            spec.name: WorkerState(spec=spec, backoff=initial_backoff) for spec in specs
+        }
+        self._context = multiprocessing.get_context("spawn")
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self):
+        """Запуск всех рабочих процессов и цикла наблюдения"""
+        self._stopping = False
+        for worker in self.workers.values():
+            self._spawn(worker)
+        self._task = asyncio.create_task(self._supervise(), name="process-supervisor")
+        logger.info(f"Запущено рабочих процессов: {len(self.workers)}")
+
+    def _spawn(self, worker: WorkerState):
+        """Запускает процесс для рабочей группы"""
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=worker_main,
+            args=(worker.spec, child_conn),
+            name=f"bot-worker-{worker.spec.name}"
+        )
+        process.start()
+        child_conn.close()
+
+        worker.process = process
+        worker.conn = parent_conn
+        worker.started_at = time.monotonic()
+        worker.next_restart_at = None
+        logger.info(f"Рабочий процесс {worker.spec.name} запущен (pid {process.pid})")
+
+    async def _supervise(self):
+        """Цикл наблюдения: чтение статусов и перезапуск упавших процессов"""
+        while not self._stopping:
+            now = time.monotonic()
+            for worker in self.workers.values():
+                self._drain_messages(worker)
+
+                if worker.alive:
+                    if now - worker.started_at >= self.stable_after:
+                        worker.backoff = self.initial_backoff
+                    continue
+
+                if worker.next_restart_at is None:
+                    exitcode = worker.process.exitcode if worker.process else None
+                    worker.next_restart_at = now + worker.backoff
+                    logger.error(
+                        f"Рабочий процесс {worker.spec.name} завершился (код {exitcode}). "
+                        f"Перезапуск через {worker.backoff:.0f} сек."
+                    )
+                    worker.backoff = min(worker.backoff * 2, self.max_backoff)
+                elif now >= worker.next_restart_at:
+                    worker.restarts += 1
+                    self._close(worker)
+                    self._spawn(worker)
+
+            await asyncio.sleep(0.5)
+
+    def _drain_messages(self, worker: WorkerState):
+        """Читает все накопившиеся сообщения процесса без блокировки"""
+        if worker.conn is None:
+            return
+        try:
+            while worker.conn.poll():
+                kind, payload = worker.conn.recv()
+                if kind == 'status':
+                    worker.last_status = payload
+                    worker.last_status_at = time.monotonic()
+        except (EOFError, OSError):
+            pass
+
+    def _close(self, worker: WorkerState):
+        if worker.conn is not None:
+            worker.conn.close()
+            worker.conn = None
+        if worker.process is not None:
+            worker.process.close()
+            worker.process = None
+
+    async def restart(self, worker_name: str):
+        """Немедленный перезапуск рабочего процесса"""
+        worker = self.workers[worker_name]
+        # Не даём циклу наблюдения запустить процесс параллельно с нами
+        worker.next_restart_at = math.inf
+        await self._stop_worker(worker)
+        worker.restarts += 1
+        worker.backoff = self.initial_backoff
+        self._spawn(worker)
+
+    async def _stop_worker(self, worker: WorkerState):
+        """Корректно останавливает процесс (с принудительным завершением по таймауту)"""
+        if worker.alive:
+            try:
+                worker.conn.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+            await asyncio.to_thread(worker.process.join, STOP_TIMEOUT)
+            if worker.process.is_alive():
+                logger.warning(f"Процесс {worker.spec.name} не остановился вовремя, завершаем принудительно")
+                worker.process.terminate()
+                await asyncio.to_thread(worker.process.join, 5)
+        self._drain_messages(worker)
+        self._close(worker)
+
+    async def stop(self):
+        """Остановка всех рабочих процессов"""
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.gather(*(self._stop_worker(w) for w in self.workers.values()))
+        logger.info("Все рабочие процессы остановлены")
+
+    def get_bot_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Последние известные метрики ботов из всех процессов"""
+        result = {}
+        for worker in self.workers.values():
+            bots = worker.last_status.get('bots', {})
+            for bot_name, metrics in bots.items():
+                result[bot_name] = {
+                    **metrics,
+                    'is_running': metrics.get('is_running', False) and worker.alive,
+                    'worker': worker.spec.name,
+                }
+        return result
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Статус рабочих процессов"""
+        now = time.monotonic()
+        return {
+            name: {
+                'pid': worker.process.pid if worker.process else None,
+                'alive': worker.alive,
+                'restarts': worker.restarts,
+                'bots': [bot_class.__name__ for bot_class, _, _ in worker.spec.bots],
+                'status_age': (now - worker.last_status_at) if worker.last_status_at else None,
+                'components': worker.last_status.get('components', {}),
+            }
+            for name, worker in self.workers.items()
+        }
@@ -3,11 +3,17 @@
 """
 import json
 import logging
+import time
+from bisect import bisect_right
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 
+from src.core.cursor import Cursor
+from src.core.metrics import LatencyHistogram, register_collector
+from src.utils.structured_logging import log_event
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,23 +35,62 @@ class QuestionManager:
     """Управление вопросами пользователей"""
     
     def __init__(self, data_dir: str = "data"):
+        # Директория и файл создаются при первом обращении, а не при импорте
         self.data_dir = Path(data_dir)
-        self.data_dir.mkdir(exist_ok=True)
         self.questions_file = self.data_dir / "glasspen_questions.json"
-        self._ensure_file_exists()
+        self._file_ready = False
+        
+        # Время чтения/записи файла вопросов (для метрик)
+        self.read_latency = LatencyHistogram()
+        self.flush_latency = LatencyHistogram()
+        
+        # Очередь неотвеченных вопросов по (created_at, id); перечитывается при изменении файла
+        self._pending_stamp: Optional[Tuple[int, int]] = None
+        self._pending_keys: List[Cursor] = []
+        self._pending: List[Dict] = []
+        register_collector("questions_storage", self.get_storage_metrics)
     
+    def use_storage(self, data_dir: str):
+        """Переключает менеджер на файл вопросов в другой директории"""
+        self.data_dir = Path(data_dir)
+        self.questions_file = self.data_dir / "glasspen_questions.json"
+        self._file_ready = False
+        self._pending_stamp = None
+
     def _ensure_file_exists(self):
-        """Создаёт файл если его нет"""
+        """Создаёт директорию и файл, если их нет (один раз)"""
+        if self._file_ready:
+            return
+        self.data_dir.mkdir(parents=True, exist_ok=True)
         if not self.questions_file.exists():
             with open(self.questions_file, 'w', encoding='utf-8') as f:
                 json.dump([], f, ensure_ascii=False, indent=2)
+        self._file_ready = True
+    
+    def _read_questions(self) -> List[Dict]:
+        """Читает все вопросы из файла"""
+        self._ensure_file_exists()
+        started = time.perf_counter()
+        with open(self.questions_file, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+        self.read_latency.observe(time.perf_counter() - started)
+        return questions
+    
+    def _write_questions(self, questions: List[Dict]):
+        """Записывает все вопросы в файл"""
+        self._ensure_file_exists()
+        started = time.perf_counter()
+        with open(self.questions_file, 'w', encoding='utf-8') as f:
+            json.dump(questions, f, ensure_ascii=False, indent=2)
+        # Своя запись всегда сбрасывает очередь (mtime может не успеть измениться)
+        self._pending_stamp = None
+        self.flush_latency.observe(time.perf_counter() - started)
     
     def save_question(self, user_id: int, username: str, first_name: str, question_text: str) -> str:
         """Сохраняет новый вопрос"""
         try:
             # Загружаем существующие вопросы
-            with open(self.questions_file, 'r', encoding='utf-8') as f:
-                questions = json.load(f)
+            questions = self._read_questions()
             
             # Создаём новый вопрос
             question_id = f"q{datetime.now().strftime('%Y%m%d%H%M%S')}_{user_id}"
@@ -62,10 +107,10 @@ class QuestionManager:
             # Добавляем и сохраняем
             questions.append(asdict(new_question))
             
-            with open(self.questions_file, 'w', encoding='utf-8') as f:
-                json.dump(questions, f, ensure_ascii=False, indent=2)
+            self._write_questions(questions)
             
-            logger.info(f"Сохранён вопрос {question_id} от пользователя {user_id}")
+            log_event(logger, "question.saved", "Сохранён вопрос %s от пользователя %s", question_id, user_id,
+                      question_id=question_id)
             return question_id
             
         except Exception as e:
@@ -75,19 +120,63 @@ class QuestionManager:
     def get_pending_questions(self) -> List[Dict]:
         """Получает все неотвеченные вопросы"""
         try:
-            with open(self.questions_file, 'r', encoding='utf-8') as f:
-                questions = json.load(f)
+            questions = self._read_questions()
             
             return [q for q in questions if q['status'] == 'new']
         except Exception as e:
             logger.error(f"Ошибка загрузки вопросов: {e}")
             return []
     
+    def _load_pending(self):
+        """Упорядоченная очередь неотвеченных вопросов (кэш до изменения файла)"""
+        self._ensure_file_exists()
+        stat = self.questions_file.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._pending_stamp:
+            return
+        pending = [q for q in self._read_questions() if q['status'] == 'new']
+        pairs = sorted(
+            ((datetime.fromisoformat(q['created_at']), q['id']), q) for q in pending
+        )
+        self._pending_keys = [key for key, _ in pairs]
+        self._pending = [q for _, q in pairs]
+        self._pending_stamp = stamp
+    
+    def count_pending(self) -> int:
+        """Число неотвеченных вопросов"""
+        try:
+            self._load_pending()
+        except Exception as e:
+            logger.error(f"Ошибка загрузки вопросов: {e}")
+            return 0
+        return len(self._pending)
+    
+    def get_pending_page(self, cursor: Optional[Cursor] = None,
+                         limit: int = 10) -> Tuple[List[Dict], bool]:
+        """
+        Страница очереди неотвеченных вопросов (старые первыми).
+        
+        Args:
+            cursor: (created_at, id) последнего показанного вопроса; None - с начала
+            limit: Вопросов на странице
+        
+        Returns:
+            (вопросы, есть ли дальше ещё)
+        """
+        try:
+            self._load_pending()
+        except Exception as e:
+            logger.error(f"Ошибка загрузки вопросов: {e}")
+            return [], False
+        # Продолжение строго после показанного вопроса - бинарный поиск позиции
+        start = 0 if cursor is None else bisect_right(self._pending_keys, cursor)
+        page = self._pending[start:start + limit]
+        return page, start + limit < len(self._pending)
+    
     def mark_as_answered(self, question_id: str, admin_comment: str = "") -> bool:
         """Отмечает вопрос как отвеченный"""
         try:
-            with open(self.questions_file, 'r', encoding='utf-8') as f:
-                questions = json.load(f)
+            questions = self._read_questions()
             
             # Находим и обновляем вопрос
             for q in questions:
@@ -97,14 +186,21 @@ class QuestionManager:
                     q['answered_at'] = datetime.now().isoformat()
                     break
             
-            with open(self.questions_file, 'w', encoding='utf-8') as f:
-                json.dump(questions, f, ensure_ascii=False, indent=2)
+            self._write_questions(questions)
             
             return True
         except Exception as e:
             logger.error(f"Ошибка обновления вопроса: {e}")
             return False
 
+    
+    def get_storage_metrics(self) -> Dict[str, Any]:
+        """Метрики хранилища вопросов: время чтения и записи файла"""
+        return {
+            'read_seconds': self.read_latency.to_dict(),
+            'flush_seconds': self.flush_latency.to_dict(),
+        }
+
 
 # Синглтон экземпляр
 question_manager = QuestionManager()
\ No newline at end of file
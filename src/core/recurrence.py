@@ -0,0 +1,155 @@
+"""
+Правила повторения напоминаний.
+
+Правило хранится в записи строкой (Note.reminder_rule):
+  daily     - каждый день в то же время
+  weekdays  - по будням в то же время
+  weekly    - раз в неделю в тот же день и время
+  cron-выражение из пяти полей "минута час день месяц день_недели"
+  (поддерживаются *, списки, диапазоны и шаг: "0 9 * * 1-5", "*/30 8-18 * * *").
+  Как в Vixie cron, если заданы и день месяца, и день недели (оба не
+  начинаются с *), подходит любой из них: "0 9 1 * 1" - первое число
+  и каждый понедельник.
+
+Следующий срок всегда считается от предыдущего срока и переносится
+за текущий момент: пропущенные за время простоя повторы не копятся.
+"""
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+
+DAILY = "daily"
+WEEKDAYS = "weekdays"
+WEEKLY = "weekly"
+
+# Русские и английские названия правил
+RULE_ALIASES = {
+    "daily": DAILY, "ежедневно": DAILY, "каждый_день": DAILY,
+    "weekdays": WEEKDAYS, "будни": WEEKDAYS, "по_будням": WEEKDAYS,
+    "weekly": WEEKLY, "еженедельно": WEEKLY, "каждую_неделю": WEEKLY,
+}
+
+# Диапазоны полей cron: (минимум, максимум)
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+# Как далеко искать следующий срок cron (правило «30 февраля» не совпадёт никогда)
+_CRON_HORIZON_DAYS = 366 * 5
+
+# (минуты, часы, дни, месяцы, дни недели, день месяца ИЛИ день недели)
+CronSpec = Tuple[FrozenSet[int], FrozenSet[int], FrozenSet[int], FrozenSet[int], FrozenSet[int], bool]
+
+
+def normalize_rule(text: str) -> str:
+    """
+    Приводит правило к каноническому виду.
+
+    Raises:
+        ValueError: правило не распознано
+    """
+    rule = " ".join(text.strip().lower().split())
+    if rule in RULE_ALIASES:
+        return RULE_ALIASES[rule]
+    _parse_cron(rule)
+    return rule
+
+
+def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"неверный шаг: {field}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"значение вне диапазона {low}-{high}: {field}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@lru_cache(maxsize=256)
+def _parse_cron(rule: str) -> CronSpec:
+    fields = rule.split()
+    if len(fields) != 5:
+        raise ValueError(f"неизвестное правило повторения: {rule!r}")
+    try:
+        minutes, hours, days, months, weekdays = (
+            _parse_field(field, low, high) for field, (low, high) in zip(fields, _CRON_FIELDS)
+        )
+    except ValueError as e:
+        raise ValueError(f"неверное cron-выражение {rule!r}: {e}") from e
+    # В cron воскресенье - 0, в datetime.weekday() - 6
+    weekdays = frozenset((day - 1) % 7 for day in weekdays)
+    # Оба поля дня ограничены - достаточно совпадения любого из них
+    day_or = not fields[2].startswith("*") and not fields[4].startswith("*")
+    return minutes, hours, days, months, weekdays, day_or
+
+
+def _next_cron(spec: CronSpec, after: datetime) -> Optional[datetime]:
+    """Первый момент строго после after, подходящий под cron-выражение"""
+    minutes, hours, days, months, weekdays, day_or = spec
+    candidate = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    sorted_hours = sorted(hours)
+    sorted_minutes = sorted(minutes)
+
+    for _ in range(_CRON_HORIZON_DAYS):
+        day_match, weekday_match = candidate.day in days, candidate.weekday() in weekdays
+        if candidate.month in months and ((day_match or weekday_match) if day_or else (day_match and weekday_match)):
+            for hour in sorted_hours:
+                if hour < candidate.hour:
+                    continue
+                first_minute = candidate.minute if hour == candidate.hour else 0
+                for minute in sorted_minutes:
+                    if minute >= first_minute:
+                        return candidate.replace(hour=hour, minute=minute)
+        # Следующий день с полуночи
+        candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+    return None
+
+
+def next_occurrence(rule: str, previous: datetime, now: datetime) -> Optional[datetime]:
+    """
+    Следующий срок напоминания после now.
+
+    Args:
+        rule: Каноническое правило (normalize_rule)
+        previous: Предыдущий срок (задаёт время суток и день недели)
+        now: Текущий момент
+
+    Returns:
+        Следующий срок или None, если правило больше не сработает
+    """
+    if rule == DAILY:
+        step = timedelta(days=1)
+    elif rule == WEEKLY:
+        step = timedelta(weeks=1)
+    elif rule == WEEKDAYS:
+        step = timedelta(days=1)
+    else:
+        return _next_cron(_parse_cron(rule), max(previous, now))
+
+    # Сразу перепрыгиваем пропущенные периоды, затем досчитываем шагами
+    due = previous + step
+    if due <= now:
+        due += step * ((now - due) // step)
+        while due <= now:
+            due += step
+    if rule == WEEKDAYS:
+        while due.weekday() >= 5:
+            due += step
+    return due
+
+
+def describe_rule(rule: str) -> str:
+    """Название правила для сообщений"""
+    return {DAILY: "каждый день", WEEKDAYS: "по будням", WEEKLY: "каждую неделю"}.get(rule, f"cron «{rule}»")
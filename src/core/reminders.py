@@ -0,0 +1,346 @@
+"""
+Планировщик напоминаний.
+
+Срок каждого напоминания (Note.reminder_at) лежит в min-куче, которая
+поддерживается подписчиком на события NoteManager, а не пересканированием
+хранилища. Одна задача спит ровно до ближайшего срока и просыпается
+раньше, только если появилось более раннее напоминание.
+
+Сами сроки хранятся в записях (notes.json), поэтому расписание
+переживает перезапуск процесса: при старте куча строится одним проходом
+(после фоновой загрузки хранилища). Перезапуск бота в том же процессе
+кучу не перестраивает.
+Доставленное разовое напоминание снимается с записи (reminder_at = None),
+повторяющееся (Note.reminder_rule) переносится на следующий срок.
+Сроки в куче - UTC; правила повторения считаются в местном времени
+пользователя, поэтому «каждый день в 9:00» не сдвигается при переходе
+на летнее время.
+
+Напоминания, срок которых наступил, пока процесс не работал, доставляются
+отдельной фазой восстановления: из кучи извлекается только просроченный
+диапазон, напоминания одного пользователя объединяются в одну сводку,
+а отправка растягивается по времени в пределах лимитов Telegram.
+
+Если доставка не удалась, напоминание возвращается в кучу со сроком
+через RETRY_DELAY, с каждой неудачей вдвое дольше (до RETRY_MAX_DELAY).
+После RETRY_ATTEMPTS неудач попытки прекращаются до перезапуска процесса
+(срок в записи остаётся, фаза восстановления доставит его снова).
+"""
+
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.core.events import NoteEvent, NOTE_DELETED
+from src.core.metrics import register_collector
+from src.core.models import Note
+from src.core.note_manager import note_manager
+from src.core.outbound import RateLimiter
+from src.core.recurrence import next_occurrence
+from src.core.timezones import from_local, to_local, to_utc, utc_now
+
+logger = logging.getLogger(__name__)
+
+# Доставка напоминаний одного пользователя (одно или сводка):
+# True - доставлено, напоминания снимаются с записей или переносятся
+ReminderDelivery = Callable[[int, List[Note]], Awaitable[bool]]
+
+# Ключ напоминания: (user_id, note_id)
+ReminderKey = Tuple[int, str]
+
+# Дольше этого не спим даже без напоминаний (страховка от сдвига часов)
+MAX_SLEEP = 3600.0
+
+# Темп отправки сводок при восстановлении (сообщений в секунду на бота):
+# ниже общего лимита, чтобы ответы на команды не стояли в очереди
+CATCHUP_RATE = 10.0
+
+# Повторная доставка после неудачи: первая задержка, предел и число попыток
+RETRY_DELAY = 30.0
+RETRY_MAX_DELAY = 3600.0
+RETRY_ATTEMPTS = 8
+
+
+class ReminderScheduler:
+    """
+    Расписание напоминаний одного NoteManager.
+
+    Куча хранит (срок, user_id, note_id); актуальный срок каждой записи -
+    в словаре _due. Перенос или снятие напоминания не ищет элемент в куче:
+    старый элемент становится «мёртвым» и отбрасывается при извлечении,
+    а когда мёртвых больше живых, куча перестраивается.
+    """
+
+    def __init__(self, manager, limiter: Optional[RateLimiter] = None,
+                 catchup_limiter: Optional[RateLimiter] = None):
+        """
+        Args:
+            manager: NoteManager, записи которого обслуживает планировщик
+            limiter: Ограничитель отправки напоминаний
+            catchup_limiter: Ограничитель отправки при восстановлении после простоя
+        """
+        self.manager = manager
+        self.limiter = limiter or RateLimiter()
+        self.catchup_limiter = catchup_limiter or RateLimiter(global_rate=CATCHUP_RATE)
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._due: Dict[ReminderKey, datetime] = {}
+        # Неудачные попытки доставки по напоминанию (для задержки повтора)
+        self._attempts: Dict[ReminderKey, int] = {}
+        self._loaded = False
+        # Загрузка хранилища, из которой построена куча (None - ещё не строилась)
+        self._generation: Optional[int] = None
+
+        self._deliver: Optional[ReminderDelivery] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self.delivered = 0
+        self.failed = 0
+        self.digests = 0
+        self.recovered = 0
+        self.retried = 0
+
+        register_collector("reminders", self.get_metrics)
+
+    # --- Расписание ---
+
+    def load(self):
+        """Строит кучу из записей хранилища (один проход при запуске)"""
+        self._due = {}
+        for user_id, notes in self.manager._notes_cache.items():
+            for note in notes:
+                if note.reminder_at:
+                    self._due[(user_id, note.id)] = note.reminder_at
+        self._generation = self.manager.generation
+        self._heap = [(due, user_id, note_id) for (user_id, note_id), due in self._due.items()]
+        heapq.heapify(self._heap)
+
+        if not self._loaded:
+            self.manager.events.subscribe(self._on_note_event)
+            self._loaded = True
+        logger.info(f"Загружено напоминаний: {len(self._due)}")
+
+    def schedule(self, user_id: int, note_id: str, due: Optional[datetime]):
+        """Ставит, переносит или (due=None) снимает напоминание"""
+        key = (user_id, note_id)
+        due = to_utc(due)
+        if due is None:
+            self._due.pop(key, None)
+        else:
+            self._due[key] = due
+            earliest = self._peek()
+            heapq.heappush(self._heap, (due, user_id, note_id))
+            if earliest is None or due < earliest:
+                self._wake()
+
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._compact()
+
+    def _on_note_event(self, event: NoteEvent):
+        """Подписчик: изменение reminder_at записи"""
+        if event.changed('reminder_at'):
+            # Новый срок - новое напоминание: прежние неудачи не считаются
+            self._attempts.pop((event.user_id, event.note_id), None)
+        if event.kind == NOTE_DELETED:
+            self.schedule(event.user_id, event.note_id, None)
+        elif event.changed('reminder_at'):
+            self.schedule(event.user_id, event.note_id, event.note.reminder_at)
+
+    def _compact(self):
+        """Перестраивает кучу без мёртвых элементов"""
+        self._heap = [(due, user_id, note_id) for (user_id, note_id), due in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def _peek(self) -> Optional[datetime]:
+        """Ближайший актуальный срок (мёртвые элементы с вершины отбрасываются)"""
+        while self._heap:
+            due, user_id, note_id = self._heap[0]
+            if self._due.get((user_id, note_id)) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def next_due(self) -> Optional[datetime]:
+        """Срок ближайшего напоминания"""
+        return self._peek()
+
+    def pop_due(self, now: datetime) -> List[ReminderKey]:
+        """Извлекает все напоминания со сроком не позже now"""
+        now = to_utc(now)
+        keys: List[ReminderKey] = []
+        while True:
+            due = self._peek()
+            if due is None or due > now:
+                return keys
+            _, user_id, note_id = heapq.heappop(self._heap)
+            del self._due[(user_id, note_id)]
+            keys.append((user_id, note_id))
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    @staticmethod
+    def group_by_user(keys: List[ReminderKey]) -> Dict[int, List[str]]:
+        """Группирует извлечённые напоминания по пользователям (порядок сроков сохраняется)"""
+        groups: Dict[int, List[str]] = defaultdict(list)
+        for user_id, note_id in keys:
+            groups[user_id].append(note_id)
+        return groups
+
+    # --- Доставка ---
+
+    def _wake(self):
+        if self._wakeup is None or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self, deliver: ReminderDelivery):
+        """
+        Запускает задачу доставки в текущем event loop.
+        Сначала доставляются напоминания, пропущенные за время простоя.
+        """
+        if self._task is not None and not self._task.done():
+            return
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="reminders")
+        logger.info("Планировщик напоминаний запущен")
+
+    async def stop(self):
+        """Останавливает задачу доставки"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Планировщик напоминаний остановлен")
+
+    async def _prepare(self):
+        """
+        Загружает хранилище в отдельном потоке, чтобы не задерживать запуск бота.
+        Куча строится заново, только если хранилище перечитано или сменилось
+        (шарды); при перезапуске бота она уже актуальна благодаря событиям.
+        """
+        await asyncio.to_thread(self.manager.init)
+        if self._generation != self.manager.generation:
+            self.load()
+
+    async def _run(self):
+        await self._prepare()
+        await self._recover()
+        while True:
+            due = self._peek()
+            delay = MAX_SLEEP if due is None else (due - utc_now()).total_seconds()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            groups = self.group_by_user(self.pop_due(utc_now()))
+            for user_id, note_ids in groups.items():
+                await self._deliver_user(user_id, note_ids, self.limiter)
+
+    async def _recover(self):
+        """
+        Фаза восстановления: всё, что просрочено к моменту запуска,
+        доставляется одной сводкой на пользователя с пониженным темпом.
+        """
+        groups = self.group_by_user(self.pop_due(utc_now()))
+        if not groups:
+            return
+        total = sum(len(note_ids) for note_ids in groups.values())
+        logger.info(f"Восстановление: {total} пропущенных напоминаний для {len(groups)} пользователей")
+
+        for user_id, note_ids in groups.items():
+            await self._deliver_user(user_id, note_ids, self.catchup_limiter)
+        self.recovered += total
+        logger.info("Восстановление напоминаний завершено")
+
+    async def _deliver_user(self, user_id: int, note_ids: List[str], limiter: RateLimiter):
+        """Доставляет напоминания одного пользователя одним сообщением"""
+        notes = [note for note in (self.manager.get_note(user_id, note_id) for note_id in note_ids)
+                 if note is not None and note.reminder_at is not None]
+        if not notes:
+            return
+
+        await limiter.acquire(user_id)
+        try:
+            delivered = await self._deliver(user_id, notes)
+        except Exception as e:
+            delivered = False
+            logger.error(f"Ошибка доставки напоминаний пользователю {user_id}: {e}", exc_info=True)
+
+        if delivered:
+            self.delivered += len(notes)
+            if len(notes) > 1:
+                self.digests += 1
+            for note in notes:
+                self._attempts.pop((user_id, note.id), None)
+            self.manager.set_reminders(user_id, {note.id: self._following(note) for note in notes})
+        else:
+            self.failed += len(notes)
+            self._retry_later(user_id, notes)
+
+    def _retry_later(self, user_id: int, notes: List[Note]):
+        """
+        Возвращает недоставленные напоминания в кучу с растущей задержкой.
+        Записи остаются с прежним reminder_at: после RETRY_ATTEMPTS неудач
+        (или перезапуска) их доставит фаза восстановления.
+        """
+        for note in notes:
+            key = (user_id, note.id)
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts > RETRY_ATTEMPTS:
+                self._attempts.pop(key, None)
+                logger.warning(f"Напоминание {note.id} пользователю {user_id} не доставлено после {RETRY_ATTEMPTS} попыток")
+                continue
+            self._attempts[key] = attempts
+            delay = min(RETRY_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+            self.schedule(user_id, note.id, utc_now() + timedelta(seconds=delay))
+            self.retried += 1
+
+    @staticmethod
+    def _following(note: Note) -> Optional[datetime]:
+        """Следующий срок повторяющегося напоминания (в UTC) или None для разового"""
+        if not note.reminder_rule:
+            return None
+        following = next_occurrence(
+            note.reminder_rule,
+            to_local(note.reminder_at, note.user_id),
+            to_local(utc_now(), note.user_id),
+        )
+        return from_local(following, note.user_id) if following else None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики планировщика"""
+        return {
+            'pending': len(self._due),
+            'heap_size': len(self._heap),
+            'delivered_total': self.delivered,
+            'failed_total': self.failed,
+            'digests_total': self.digests,
+            'recovered_total': self.recovered,
+            'retried_total': self.retried,
+        }
+
+
+# Глобальный планировщик для записей общего NoteManager
+reminder_scheduler = ReminderScheduler(note_manager)
@@ -0,0 +1,179 @@
+"""
+Общие помощники для ответов ботов.
+Редактирование сообщения пропускается, если его текст и клавиатура
+не изменились с последней отправки: это экономит запрос к API и
+избавляет от ошибки «message is not modified».
+
+Длинные списки отправляются потоком: stream_reply() собирает строки
+по мере генерации и отправляет готовые части сразу, соблюдая лимит
+Telegram на сообщения в чат.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from telegram import CallbackQuery, Message
+from telegram.error import BadRequest, RetryAfter
+
+from src.core.cache import LRUCache
+from src.core.message_builder import MessageBuilder
+from src.core.metrics import register_collector
+from src.core.outbound import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# (chat_id, message_id) или ('inline', inline_message_id) → хэш последнего содержимого
+_content_hashes = LRUCache(maxsize=20000, ttl=48 * 3600, name="message_hashes")
+
+# Темп отправки частей потоковых ответов (лимиты на чат и на бота)
+reply_limiter = RateLimiter()
+
+_stats = {'edits': 0, 'skipped': 0, 'not_modified': 0, 'streamed': 0, 'stream_chunks': 0}
+
+
+def content_hash(text: str, reply_markup: Any = None, parse_mode: Optional[str] = None) -> bytes:
+    """Хэш содержимого сообщения: текст, режим разметки и клавиатура"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(text.encode("utf-8"))
+    digest.update(b"\x00" + (parse_mode or "").encode("ascii"))
+    if reply_markup is not None:
+        markup = reply_markup.to_dict() if hasattr(reply_markup, 'to_dict') else reply_markup
+        digest.update(b"\x00" + json.dumps(markup, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.digest()
+
+
+def _message_key(target: Any) -> Optional[Hashable]:
+    """Ключ сообщения для кэша хэшей"""
+    if isinstance(target, CallbackQuery):
+        if target.inline_message_id:
+            return ('inline', target.inline_message_id)
+        target = target.message
+    if isinstance(target, Message) or hasattr(target, 'message_id'):
+        return (target.chat_id, target.message_id)
+    return None
+
+
+def remember_message(message: Any, text: str, reply_markup: Any = None,
+                     parse_mode: Optional[str] = None):
+    """
+    Запоминает содержимое только что отправленного сообщения,
+    чтобы первое же повторное редактирование тем же текстом было пропущено.
+    """
+    key = _message_key(message)
+    if key is not None:
+        _content_hashes.set(key, content_hash(text, reply_markup, parse_mode))
+
+
+async def safe_edit_message_text(target: Any, text: str, reply_markup: Any = None,
+                                 **kwargs) -> bool:
+    """
+    Редактирует текст сообщения, если он действительно изменился.
+
+    Args:
+        target: CallbackQuery (обычно update.callback_query) или Message
+        text: Новый текст
+        reply_markup: Новая клавиатура
+        **kwargs: Остальные параметры редактирования (parse_mode и т.д.)
+
+    Returns:
+        True, если запрос на редактирование был отправлен
+    """
+    key = _message_key(target)
+    new_hash = content_hash(text, reply_markup, kwargs.get('parse_mode'))
+
+    if key is not None and _content_hashes.get(key) == new_hash:
+        _stats['skipped'] += 1
+        return False
+
+    try:
+        if isinstance(target, Message):
+            await target.edit_text(text, reply_markup=reply_markup, **kwargs)
+        else:
+            await target.edit_message_text(text, reply_markup=reply_markup, **kwargs)
+    except BadRequest as e:
+        if "message is not modified" not in str(e).lower():
+            raise
+        # Сообщение уже такое (например, отправлено до перезапуска) - запоминаем
+        _stats['not_modified'] += 1
+        logger.debug(f"Сообщение {key} не изменилось, редактирование пропущено")
+    else:
+        _stats['edits'] += 1
+
+    if key is not None:
+        _content_hashes.set(key, new_hash)
+    return True
+
+
+async def _send_chunk(message: Any, text: str, limiter: RateLimiter, **kwargs) -> Any:
+    """Отправляет одну часть ответа в очередь лимита; при 429 ждёт и повторяет один раз"""
+    await limiter.acquire(message.chat_id)
+    try:
+        return await message.reply_text(text, **kwargs)
+    except RetryAfter as e:
+        delay = e.retry_after
+        if isinstance(delay, timedelta):
+            delay = delay.total_seconds()
+        limiter.pause(delay)
+        await limiter.acquire(message.chat_id)
+        return await message.reply_text(text, **kwargs)
+
+
+async def stream_reply(message: Any, lines: Iterable[str], parse_mode: Optional[str] = None,
+                       reply_markup: Any = None, limiter: Optional[RateLimiter] = None) -> int:
+    """
+    Отправляет ответ, генерируемый построчно, несколькими сообщениями.
+
+    Части режутся по границам строк и уходят сразу, как только
+    заполнены, поэтому в памяти держится не больше одной части,
+    а первая часть приходит пользователю до конца генерации.
+    Клавиатура прикрепляется к последнему сообщению.
+
+    Args:
+        message: Сообщение, на которое отвечаем (update.message)
+        lines: Готовые (уже экранированные) строки ответа
+        parse_mode: Режим разметки всех частей
+        reply_markup: Клавиатура последней части
+        limiter: Ограничитель скорости (по умолчанию общий reply_limiter)
+
+    Returns:
+        Сколько сообщений отправлено
+    """
+    limiter = limiter or reply_limiter
+    builder = MessageBuilder(parse_mode=parse_mode)
+    sent = 0
+
+    for line in lines:
+        builder.add(line)
+        for chunk in builder.take_ready():
+            await _send_chunk(message, chunk, limiter, parse_mode=parse_mode)
+            sent += 1
+
+    chunks = builder.chunks()
+    for i, chunk in enumerate(chunks):
+        last = i == len(chunks) - 1
+        sent_message = await _send_chunk(message, chunk, limiter, parse_mode=parse_mode,
+                                         reply_markup=reply_markup if last else None)
+        if last:
+            remember_message(sent_message, chunk, reply_markup, parse_mode)
+        sent += 1
+
+    _stats['streamed'] += 1
+    _stats['stream_chunks'] += sent
+    return sent
+
+
+def get_reply_metrics() -> Dict[str, Any]:
+    """Метрики редактирования сообщений"""
+    return {
+        'edits_total': _stats['edits'],
+        'skipped_total': _stats['skipped'],
+        'not_modified_total': _stats['not_modified'],
+        'streamed_total': _stats['streamed'],
+        'stream_chunks_total': _stats['stream_chunks'],
+    }
+
+
+register_collector("replies", get_reply_metrics)
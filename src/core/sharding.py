@@ -0,0 +1,782 @@
+"""
+Шардирование пользователей одного бота по рабочим процессам.
+
+Один процесс-шлюз получает обновления (long polling) и раскладывает их
+по N процессам-шардам по user_id. Каждый шард владеет своей частью
+хранилища записей и настроек пользователей, поэтому блокировки между
+процессами не нужны.
+Запросы к Bot API шарды отправляют обратно в шлюз, где они проходят
+через общий ограничитель скорости.
+
+Записи, настройки и состояние (SQLite) раскладываются по файлам шардов
+при запуске и перераскладываются при смене числа шардов; если
+шардирование выключено, данные шардов объединяются в исходные файлы.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from telegram import Bot, Update
+from telegram.error import NetworkError
+from telegram.request import BaseRequest, RequestData
+
+from src.core.base_bot import BaseBot
+from src.core.metrics import (
+    LatencyHistogram,
+    collect_components,
+    register_collector,
+    unregister_collector,
+)
+from src.core.outbound import RateLimitedSender, is_rate_limited_method
+from src.core.persistence import SHARED_STATE_TABLES, STATE_SCHEMA, STATE_TABLES
+from src.core.user_settings import user_settings
+from src.utils.logging_config import logging_options
+
+logger = logging.getLogger(__name__)
+
+# Сколько обновлений может ждать в очереди одного шарда
+SHARD_QUEUE_SIZE = 1000
+# Сколько шлюз ждёт места в очереди шарда за одну попытку (секунды)
+SHARD_PUT_TIMEOUT = 1.0
+# Сколько ждать остановки шарда (секунды)
+SHARD_STOP_TIMEOUT = 15.0
+# Как часто шард отправляет шлюзу свои метрики (секунды)
+SHARD_STATUS_INTERVAL = 5.0
+# Сколько раз шлюз повторяет запрос после ответа 429
+MAX_RETRY_AFTER_ATTEMPTS = 3
+# Таймаут HTTP-запросов шлюза к Bot API (секунды)
+API_TIMEOUT = 30.0
+
+
+def shard_for_user(user_id: Optional[int], shards: int) -> int:
+    """Номер шарда пользователя (обновления без пользователя идут в шард 0)"""
+    if not user_id:
+        return 0
+    return user_id % shards
+
+
+def shard_storage_path(storage_path: str, index: int) -> Path:
+    """Файл шарда: data/notes.json → data/notes.shard0.json"""
+    path = Path(storage_path)
+    return path.with_name(f"{path.stem}.shard{index}{path.suffix}")
+
+
+def _manifest_path(storage_path: str) -> Path:
+    source = Path(storage_path)
+    return source.with_name(f"{source.stem}.shards.json")
+
+
+def _previous_shards(storage_path: str, owner: Optional[str], unshard: bool) -> Optional[int]:
+    """
+    Число шардов, на которое хранилище разложено сейчас (0 - не разложено).
+    None - хранилище разложил другой бот: объединять его шарды нельзя.
+
+    Raises:
+        ValueError: раскладывать хранилище, уже разложенное другим ботом
+    """
+    manifest_path = _manifest_path(storage_path)
+    if not manifest_path.exists():
+        return 0
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest_owner = manifest.get('bot')
+    if unshard:
+        # Объединяет шарды только бот, который их создал: шарды другого
+        # бота могут прямо сейчас обслуживаться его процессами
+        return manifest.get('shards', 0) if manifest_owner == owner else None
+    if manifest_owner and owner and manifest_owner != owner:
+        raise ValueError(f"Хранилище {storage_path} уже разложено на шарды ботом {manifest_owner}")
+    return manifest.get('shards', 0)
+
+
+def _save_manifest(storage_path: str, shards: int, owner: Optional[str]):
+    """Запоминает число шардов и бота-владельца; при объединении (shards <= 1) манифест удаляется"""
+    manifest_path = _manifest_path(storage_path)
+    if shards > 1:
+        manifest_path.write_text(json.dumps({'shards': shards, 'bot': owner}), encoding="utf-8")
+    else:
+        manifest_path.unlink(missing_ok=True)
+
+
+def split_user_storage(storage_path: str, shards: int, owner: Optional[str] = None) -> List[Path]:
+    """
+    Раскладывает JSON-хранилище {user_id: данные} (записи, настройки
+    пользователей) по файлам шардов.
+
+    Разбиение выполняется один раз; число шардов запоминается в
+    манифесте. При изменении числа шардов существующие файлы шардов
+    объединяются и раскладываются заново. При shards <= 1 файлы шардов
+    объединяются обратно в исходный файл, а шарды и манифест удаляются;
+    пока хранилище разложено, исходный файл не изменяется.
+
+    Манифест помнит бота-владельца: шарды, разложенные другим ботом,
+    не объединяются.
+
+    Args:
+        storage_path: Путь к общему файлу хранилища
+        shards: Число шардов
+        owner: Имя бота, которому принадлежат шарды
+
+    Returns:
+        Пути к файлам шардов по порядку (при shards <= 1 - исходный файл)
+    """
+    source = Path(storage_path)
+    unshard = shards <= 1
+    paths = [source] if unshard else [shard_storage_path(storage_path, i) for i in range(shards)]
+
+    previous = _previous_shards(storage_path, owner, unshard)
+    if previous == (0 if unshard else shards) and all(path.exists() for path in paths):
+        return paths
+    if unshard and not previous:
+        # Хранилище не раскладывалось (или его шарды принадлежат другому боту)
+        return paths
+
+    # Источник: прежние шарды (если были) или общий файл
+    data: Dict[str, Any] = {}
+    if previous:
+        for i in range(previous):
+            old_path = shard_storage_path(storage_path, i)
+            if old_path.exists():
+                data.update(json.loads(old_path.read_text(encoding="utf-8")))
+    elif source.exists():
+        data = json.loads(source.read_text(encoding="utf-8"))
+
+    parts: List[Dict[str, Any]] = [{} for _ in paths]
+    for user_id, notes in data.items():
+        parts[0 if unshard else shard_for_user(int(user_id), shards)][user_id] = notes
+
+    source.parent.mkdir(parents=True, exist_ok=True)
+    for path, part in zip(paths, parts):
+        path.write_text(json.dumps(part, indent=2, ensure_ascii=False), encoding="utf-8")
+    # Лишние файлы от большего числа шардов больше не нужны
+    for i in range(0 if unshard else shards, previous):
+        shard_storage_path(storage_path, i).unlink(missing_ok=True)
+
+    _save_manifest(storage_path, shards, owner)
+    if unshard:
+        logger.info(f"Шарды хранилища {source} объединены ({len(data)} пользователей)")
+    else:
+        logger.info(f"Хранилище {source} разложено на {shards} шардов ({len(data)} пользователей)")
+    return paths
+
+
+def _state_owner(table: str, key: Any) -> int:
+    """Пользователь (или чат), которому принадлежит строка состояния"""
+    if table == "conversations":
+        # Ключ диалога - JSON-список (chat_id, user_id): владелец - последний элемент
+        name, conv_key = key
+        return json.loads(conv_key)[-1]
+    return key
+
+
+def split_state_storage(state_path: str, shards: int, owner: Optional[str] = None) -> List[Path]:
+    """
+    Раскладывает SQLite-хранилище состояния (SQLitePersistence) по шардам
+    так же, как split_user_storage: user_data, chat_data и состояния
+    диалогов переходят в шард своего пользователя (чата), при shards <= 1
+    шарды объединяются обратно в исходный файл.
+
+    bot_data и callback_data общие для всего бота: шарды получают копию
+    из исходного файла (нулевого шарда), при объединении сохраняется копия
+    нулевого шарда.
+
+    Returns:
+        Пути к файлам шардов по порядку (при shards <= 1 - исходный файл)
+    """
+    source = Path(state_path)
+    unshard = shards <= 1
+    paths = [source] if unshard else [shard_storage_path(state_path, i) for i in range(shards)]
+
+    previous = _previous_shards(state_path, owner, unshard)
+    if previous == (0 if unshard else shards) and all(path.exists() for path in paths):
+        return paths
+    if unshard and not previous:
+        return paths
+
+    old_paths = [shard_storage_path(state_path, i) for i in range(previous)] if previous else [source]
+    # (таблица, ключ) -> данные; общие таблицы берутся из первого файла
+    rows: Dict[Tuple[str, Any], Any] = {}
+    for old_path in old_paths:
+        if not old_path.exists():
+            continue
+        conn = sqlite3.connect(old_path)
+        try:
+            for table in STATE_TABLES:
+                for row_id, data in conn.execute(f"SELECT id, data FROM {table}"):
+                    if table in SHARED_STATE_TABLES:
+                        rows.setdefault((table, row_id), data)
+                    else:
+                        rows[(table, row_id)] = data
+            for name, conv_key, state in conn.execute("SELECT name, key, state FROM conversations"):
+                rows[("conversations", (name, conv_key))] = state
+        finally:
+            conn.close()
+
+    # Файлы шардов перезаписываются целиком (вместе с журналами WAL);
+    # исходный файл при разбиении остаётся как есть
+    stale = {shard_storage_path(state_path, i) for i in range(previous)} | set(paths)
+    for path in stale:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+    source.parent.mkdir(parents=True, exist_ok=True)
+    connections = []
+    try:
+        for path in paths:
+            conn = sqlite3.connect(path)
+            conn.executescript(STATE_SCHEMA)
+            connections.append(conn)
+        for (table, key), data in rows.items():
+            if table in SHARED_STATE_TABLES:
+                targets = connections
+            else:
+                targets = [connections[0 if unshard else shard_for_user(_state_owner(table, key), shards)]]
+            for conn in targets:
+                if table == "conversations":
+                    conn.execute("INSERT INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                                 (*key, data))
+                else:
+                    conn.execute(f"INSERT INTO {table} (id, data) VALUES (?, ?)", (key, data))
+        for conn in connections:
+            conn.commit()
+    finally:
+        for conn in connections:
+            conn.close()
+
+    _save_manifest(state_path, shards, owner)
+    logger.info(f"Состояние {source} разложено на {len(paths)} файл(ов), строк: {len(rows)}")
+    return paths
+
+
+def unshard_storage(config: Dict[str, Any], owner: str):
+    """
+    Возвращает данные бота из шардов в общие файлы, если этот бот раньше
+    работал в нескольких процессах, а теперь шардирование выключено.
+    Шарды других ботов (в том числе общих файлов по умолчанию) не трогаются.
+    """
+    split_user_storage(config.get('notes_path', 'data/notes.json'), 1, owner)
+    split_user_storage(config.get('settings_path', str(user_settings.storage_path)), 1, owner)
+    if config.get('state_path'):
+        split_state_storage(config['state_path'], 1, owner)
+
+
+# ---- ПРОЦЕСС-ШАРД ----
+
+class QueueRequest(BaseRequest):
+    """
+    BaseRequest шарда: вместо HTTP отправляет запрос в процесс-шлюз
+    и ждёт ответ из своей очереди ответов.
+    """
+
+    def __init__(self, shard_index: int, outbound_queue, response_queue):
+        self.shard_index = shard_index
+        self._outbound = outbound_queue
+        self._responses = response_queue
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return API_TIMEOUT
+
+    async def initialize(self):
+        if self._reader:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stop_event.clear()
+        self._reader = threading.Thread(target=self._read_responses, name="shard-responses", daemon=True)
+        self._reader.start()
+
+    async def shutdown(self):
+        self._stop_event.set()
+        if self._reader:
+            await asyncio.to_thread(self._reader.join, 2)
+            self._reader = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(NetworkError("Шард остановлен"))
+        self._pending.clear()
+
+    def _read_responses(self):
+        """Поток: читает ответы шлюза и передаёт их в event loop"""
+        while not self._stop_event.is_set():
+            try:
+                response = self._responses.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._resolve, *response)
+
+    def _resolve(self, request_id: int, status: int, content: bytes, error: Optional[str]):
+        future = self._pending.pop(request_id, None)
+        if future is None or future.done():
+            return
+        if error:
+            future.set_exception(NetworkError(error))
+        else:
+            future.set_result((status, content))
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=BaseRequest.DEFAULT_NONE, write_timeout=BaseRequest.DEFAULT_NONE,
+                         connect_timeout=BaseRequest.DEFAULT_NONE,
+                         pool_timeout=BaseRequest.DEFAULT_NONE) -> Tuple[int, bytes]:
+        if request_data is not None and request_data.contains_files:
+            # Файлы пришлось бы гонять через очередь целиком - не поддерживаем
+            raise NetworkError("Отправка файлов из шарда не поддерживается")
+
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+
+        timeout = read_timeout if isinstance(read_timeout, (int, float)) else None
+        params = request_data.json_parameters if request_data is not None else None
+        self._outbound.put(('request', self.shard_index, request_id, url, method, params, timeout))
+        return await future
+
+
+def shard_worker_main(bot_class: type, token: str, config: Dict[str, Any], index: int,
+                      storage_path: str, settings_path: str, updates_queue, outbound_queue,
+                      response_queue, options: Dict[str, Any]):
+    """Точка входа процесса-шарда (выполняется в дочернем процессе)"""
+    from src.utils.logging_config import setup_logging
+
+    name = f"{options.get('bot_name', 'bot')}-shard{index}"
+    setup_logging(options.get('log_level', 'INFO'), log_dir=f"logs/{name}", **options.get('logging', {}))
+    logger.info(f"Шард {name} запущен, хранилище {storage_path}")
+
+    try:
+        asyncio.run(_shard_async(bot_class, token, config, index, storage_path, settings_path,
+                                 updates_queue, outbound_queue, response_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _shard_async(bot_class: type, token: str, config: Dict[str, Any], index: int,
+                       storage_path: str, settings_path: str, updates_queue, outbound_queue,
+                       response_queue):
+    """Запускает бота без polling и передаёт ему обновления из очереди шлюза"""
+    from src.core.note_manager import note_manager
+
+    from src.core.user_settings import user_settings
+
+    # Шард владеет только своей частью записей и настроек пользователей
+    note_manager.use_storage(storage_path)
+    user_settings.use_storage(settings_path)
+
+    # Состояние пользователей шарда хранится отдельно от других шардов
+    if config.get('state_path'):
+        config = {**config, 'state_path': str(shard_storage_path(config['state_path'], index))}
+
+    bot = bot_class(token=token, config=config)
+    bot.request_factory = lambda: QueueRequest(index, outbound_queue, response_queue)
+    bot.use_polling = False
+    await bot.start()
+
+    parent = multiprocessing.parent_process()
+    last_status = 0.0
+    try:
+        while True:
+            if time.monotonic() - last_status >= SHARD_STATUS_INTERVAL:
+                outbound_queue.put(('status', index, {
+                    'bot': bot.get_metrics(),
+                    'components': collect_components(),
+                }))
+                last_status = time.monotonic()
+
+            try:
+                data = await asyncio.to_thread(updates_queue.get, True, 1.0)
+            except queue.Empty:
+                if parent is not None and not parent.is_alive():
+                    logger.warning("Процесс-шлюз недоступен, завершаем шард")
+                    break
+                continue
+
+            if data is None:
+                logger.info(f"Шард {index} получил команду остановки")
+                break
+            await bot.application.update_queue.put(Update.de_json(data, bot.application.bot))
+    finally:
+        await bot.stop()
+
+
+# ---- ПРОЦЕСС-ШЛЮЗ ----
+
+def _parse_chat_id(value: Optional[str]) -> Any:
+    """chat_id из параметров запроса: число или @username"""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _move_pending(source, target) -> int:
+    """Переносит необработанные обновления из очереди упавшего шарда в новую"""
+    moved = 0
+    while True:
+        try:
+            # Таймаут, а не get_nowait: часть данных может быть ещё в пути
+            data = source.get(timeout=0.1)
+        except (queue.Empty, EOFError, OSError):
+            return moved
+        if data is None:
+            continue
+        try:
+            target.put_nowait(data)
+        except queue.Full:
+            return moved
+        moved += 1
+
+
+class ShardState:
+    """Состояние процесса-шарда в шлюзе"""
+
+    def __init__(self, index: int, storage_path: Path, settings_path: Path):
+        self.index = index
+        self.storage_path = storage_path
+        self.settings_path = settings_path
+        self.process: Optional[multiprocessing.Process] = None
+        self.updates_queue = None
+        self.response_queue = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = 1.0
+        self.next_restart_at: Optional[float] = None
+        self.routed = 0
+        self.last_status: Dict[str, Any] = {}
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class ShardedBot(BaseBot):
+    """
+    Бот, пользователи которого распределены по нескольким процессам.
+    Для BotManager выглядит как обычный бот: start/stop/get_metrics.
+    """
+
+    def __init__(self, bot_class: type, token: str, config: Dict[str, Any], shards: int):
+        """
+        Args:
+            bot_class: Класс бота, который запускается в каждом шарде
+            token: Токен Telegram бота
+            config: Конфигурация бота
+            shards: Число процессов-шардов
+        """
+        template = bot_class(token=token, config=config)
+        super().__init__(name=template.name, token=token, config=config)
+        self.bot_class = bot_class
+        self.shards = shards
+        self.storage_path = config.get('notes_path', 'data/notes.json')
+        self.settings_path = config.get('settings_path', str(user_settings.storage_path))
+
+        self._context = multiprocessing.get_context("spawn")
+        self._shards: List[ShardState] = []
+        self._outbound_queue = None
+        self._api: Optional[Bot] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._sender: Optional[RateLimitedSender] = None
+        self._tasks: List[asyncio.Task] = []
+        self._reader: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.updates_routed = 0
+
+    def get_handlers(self):
+        # Обработчики регистрируются внутри шардов
+        return []
+
+    async def start(self):
+        """Запуск шардов и процесса-шлюза в текущем процессе"""
+        if self.is_running:
+            logger.warning(f"Бот {self.name} уже запущен")
+            return
+
+        paths = split_user_storage(self.storage_path, self.shards, self.name)
+        settings_paths = split_user_storage(self.settings_path, self.shards, self.name)
+        if self.config.get('state_path'):
+            split_state_storage(self.config['state_path'], self.shards, self.name)
+        self._outbound_queue = self._context.Queue()
+        self._shards = [ShardState(i, path, settings_path)
+                        for i, (path, settings_path) in enumerate(zip(paths, settings_paths))]
+        for shard in self._shards:
+            self._spawn(shard)
+
+        proxy = self.config.get('proxy_url')
+        self._http = httpx.AsyncClient(timeout=API_TIMEOUT, proxy=proxy)
+        self._sender = RateLimitedSender()
+        self._api = Bot(self.token)
+        await self._api.initialize()
+
+        loop = asyncio.get_running_loop()
+        self._stop_event.clear()
+        self._reader = threading.Thread(
+            target=self._read_outbound, args=(loop,), name=f"{self.name}-outbound", daemon=True
+        )
+        self._reader.start()
+        self._tasks = [
+            asyncio.create_task(self._poll(), name=f"{self.name}-ingress"),
+            asyncio.create_task(self._supervise(), name=f"{self.name}-shards"),
+        ]
+
+        register_collector(f"outbound_{self.name}", self._sender.get_metrics)
+        self.is_running = True
+        self.metrics['start_time'] = loop.time()
+        logger.info(f"✅ Бот {self.name} запущен в {self.shards} шардах")
+
+    def _spawn(self, shard: ShardState):
+        """
+        Запуск процесса шарда (очереди создаются заново при каждом запуске).
+        Обновления, которые упавший шард не успел забрать, переносятся
+        в новую очередь.
+        """
+        updates_queue = self._context.Queue(maxsize=SHARD_QUEUE_SIZE)
+        if shard.updates_queue is not None:
+            moved = _move_pending(shard.updates_queue, updates_queue)
+            if moved:
+                logger.info(f"Шард {self.name}#{shard.index}: перенесено {moved} необработанных обновлений")
+        shard.updates_queue = updates_queue
+        shard.response_queue = self._context.Queue()
+        options = {
+            'bot_name': self.name,
+            'log_level': logging.getLevelName(logging.getLogger().level),
+            'logging': logging_options(),
+        }
+        shard.process = self._context.Process(
+            target=shard_worker_main,
+            args=(self.bot_class, self.token, self.config, shard.index, str(shard.storage_path),
+                  str(shard.settings_path), shard.updates_queue, self._outbound_queue,
+                  shard.response_queue, options),
+            name=f"{self.name}-shard{shard.index}"
+        )
+        shard.process.start()
+        shard.started_at = time.monotonic()
+        shard.next_restart_at = None
+        logger.info(f"Шард {self.name}#{shard.index} запущен (pid {shard.process.pid})")
+
+    async def _poll(self):
+        """Long polling и раскладка обновлений по шардам"""
+        offset = None
+        while True:
+            try:
+                updates = await self._api.get_updates(offset=offset, timeout=30)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Ошибка получения обновлений {self.name}: {e}")
+                await asyncio.sleep(2)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                user = update.effective_user
+                shard = self._shards[shard_for_user(user.id if user else None, self.shards)]
+                await self._route(shard, update.to_dict())
+                shard.routed += 1
+                self.updates_routed += 1
+
+    async def _route(self, shard: ShardState, data: Optional[Dict[str, Any]],
+                     deadline: Optional[float] = None) -> bool:
+        """
+        Кладёт обновление в очередь шарда. Если шард не успевает, ждёт
+        места порциями по SHARD_PUT_TIMEOUT, не блокируя event loop,
+        и каждый раз берёт текущую очередь: упавший шард перезапускается
+        с новой. Возвращает False, если к deadline места так и не нашлось.
+        """
+        while True:
+            updates_queue = shard.updates_queue
+            try:
+                updates_queue.put_nowait(data)
+                return True
+            except queue.Full:
+                pass
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            try:
+                await asyncio.to_thread(updates_queue.put, data, True, SHARD_PUT_TIMEOUT)
+            except queue.Full:
+                continue
+            if shard.updates_queue is not updates_queue:
+                # Место освободил перенос в _spawn: обновление попало в старую очередь
+                await asyncio.to_thread(_move_pending, updates_queue, shard.updates_queue)
+            return True
+
+    def _read_outbound(self, loop: asyncio.AbstractEventLoop):
+        """Поток: читает запросы и статусы шардов и передаёт их в event loop"""
+        while not self._stop_event.is_set():
+            try:
+                message = self._outbound_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            loop.call_soon_threadsafe(self._on_shard_message, message)
+
+    def _on_shard_message(self, message: Tuple):
+        kind, index = message[0], message[1]
+        if kind == 'status':
+            self._shards[index].last_status = message[2]
+        elif kind == 'request':
+            _, _, request_id, url, method, params, timeout = message
+            api_method = url.rsplit('/', 1)[-1]
+            limited = is_rate_limited_method(api_method)
+            chat_id = _parse_chat_id(params.get('chat_id') if params else None)
+            shard = self._shards[index]
+            self._sender.submit(
+                lambda: self._execute(shard, request_id, url, method, params, timeout),
+                chat_id=chat_id, limited=limited
+            )
+
+    async def _execute(self, shard: ShardState, request_id: int, url: str, method: str,
+                       params: Optional[Dict[str, str]], timeout: Optional[float]):
+        """Выполняет запрос шарда к Bot API и возвращает ему ответ"""
+        response_queue = shard.response_queue
+        status, content, error = 0, b"", None
+        for attempt in range(MAX_RETRY_AFTER_ATTEMPTS + 1):
+            try:
+                response = await self._http.request(
+                    method, url, data=params,
+                    timeout=(timeout + 5) if timeout else API_TIMEOUT
+                )
+            except httpx.HTTPError as e:
+                error = f"Ошибка запроса к Bot API: {e!r}"
+                break
+
+            status, content = response.status_code, response.content
+            if status != 429 or attempt == MAX_RETRY_AFTER_ATTEMPTS:
+                break
+            try:
+                retry_after = json.loads(content)['parameters']['retry_after']
+            except (ValueError, KeyError, TypeError):
+                break
+            self._sender.limiter.pause(retry_after)
+            await asyncio.sleep(retry_after)
+
+        # Шард мог быть перезапущен: тогда ответ уже никому не нужен
+        if shard.response_queue is response_queue:
+            response_queue.put((request_id, status, content, error))
+
+    async def _supervise(self):
+        """Перезапуск упавших шардов с растущей задержкой"""
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            for shard in self._shards:
+                if shard.alive:
+                    if now - shard.started_at >= 60:
+                        shard.backoff = 1.0
+                    continue
+                if shard.next_restart_at is None:
+                    logger.error(
+                        f"Шард {self.name}#{shard.index} завершился (код {shard.process.exitcode}). "
+                        f"Перезапуск через {shard.backoff:.0f} сек."
+                    )
+                    shard.next_restart_at = now + shard.backoff
+                    shard.backoff = min(shard.backoff * 2, 60.0)
+                elif now >= shard.next_restart_at:
+                    shard.restarts += 1
+                    self._spawn(shard)
+
+    async def stop(self):
+        """Остановка шлюза и всех шардов"""
+        if not self.is_running:
+            logger.warning(f"Бот {self.name} уже остановлен")
+            return
+
+        logger.info(f"Остановка бота: {self.name}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        deadline = time.monotonic() + SHARD_STOP_TIMEOUT
+        for shard in self._shards:
+            if shard.alive and not await self._route(shard, None, deadline):
+                logger.warning(f"Шард {self.name}#{shard.index} не принял сигнал остановки")
+        # Пока шарды завершаются, их последние запросы ещё обслуживаются
+        for shard in self._shards:
+            if shard.process is not None:
+                await asyncio.to_thread(shard.process.join, SHARD_STOP_TIMEOUT)
+                if shard.process.is_alive():
+                    logger.warning(f"Шард {self.name}#{shard.index} не остановился вовремя")
+                    shard.process.terminate()
+
+        self._stop_event.set()
+        if self._reader:
+            await asyncio.to_thread(self._reader.join, 2)
+            self._reader = None
+        await self._sender.drain()
+        await self._http.aclose()
+        await self._api.shutdown()
+        unregister_collector(f"outbound_{self.name}")
+
+        self.is_running = False
+        logger.info(f"✅ Бот {self.name} остановлен")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики бота, собранные со всех шардов"""
+        totals = {'messages_processed': 0, 'commands_processed': 0, 'errors': 0}
+        handlers: Dict[str, Dict[str, Any]] = {}
+        for shard in self._shards:
+            shard_bot = shard.last_status.get('bot', {})
+            for key in totals:
+                totals[key] += shard_bot.get(key, 0)
+            for key, stats in shard_bot.get('handlers', {}).items():
+                merged = handlers.setdefault(
+                    key, {'calls': 0, 'errors': 0, 'latency': LatencyHistogram(stats['histogram']['buckets'])}
+                )
+                merged['calls'] += stats['calls']
+                merged['errors'] += stats['errors']
+                merged['latency'].merge(LatencyHistogram.from_dict(stats['histogram']))
+
+        return {
+            **self.metrics,
+            **totals,
+            'name': self.name,
+            'is_running': self.is_running,
+            'uptime': (asyncio.get_event_loop().time() - self.metrics['start_time'])
+                     if self.metrics['start_time'] else 0,
+            'handlers': {
+                key: {'calls': m['calls'], 'errors': m['errors'], **m['latency'].snapshot()}
+                for key, m in sorted(handlers.items())
+            },
+            'updates_routed': self.updates_routed,
+            'shards': {
+                shard.index: {
+                    'pid': shard.process.pid if shard.process else None,
+                    'alive': shard.alive,
+                    'restarts': shard.restarts,
+                    'routed': shard.routed,
+                    'components': shard.last_status.get('components', {}),
+                }
+                for shard in self._shards
+            },
+        }
+
+
+def create_bot(bot_class: type, token: str, config: Dict[str, Any]) -> BaseBot:
+    """
+    Создаёт бота с учётом шардирования (BOT_<ИМЯ>_SHARDS=N).
+    При N > 1 возвращается ShardedBot, иначе обычный экземпляр bot_class
+    (данные прежних шардов при этом объединяются обратно).
+    """
+    shards = int(config.get('shards') or 1)
+    if shards > 1:
+        return ShardedBot(bot_class, token, config, shards)
+    bot = bot_class(token=token, config=config)
+    unshard_storage(config, bot.name)
+    return bot
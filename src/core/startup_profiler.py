@@ -0,0 +1,155 @@
+"""
+Профилирование запуска: время импорта модулей и фаз инициализации.
+
+Фазы отмечаются всегда (это пара вызовов perf_counter), а отчёт и
+замер импортов включаются режимом профилирования:
+
+    python src/main.py --profile-startup     (или PROFILE_STARTUP=1)
+
+Импорты замеряются обёрткой над exec_module загрузчиков исходных
+модулей, поэтому видно и суммарное, и собственное время модуля
+(без вложенных импортов) - как у python -X importtime, но в логе бота.
+Модуль зависит только от стандартной библиотеки: его импортируют
+первым, до всего, что нужно замерить.
+"""
+
+import asyncio
+import importlib.abc
+import importlib.machinery
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+# Загрузчики, у которых свой экземпляр на каждый модуль (их exec_module можно обернуть)
+_TIMED_LOADERS = (
+    importlib.machinery.SourceFileLoader,
+    importlib.machinery.SourcelessFileLoader,
+    importlib.machinery.ExtensionFileLoader,
+)
+
+# Сколько самых медленных модулей показывать в отчёте
+TOP_IMPORTS = 15
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Находит модуль остальными искателями и замеряет его выполнение"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, 'finding', False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+
+        if isinstance(spec.loader, _TIMED_LOADERS):
+            self._wrap(spec.loader, fullname)
+        return spec
+
+    def _wrap(self, loader, fullname: str):
+        original = loader.exec_module
+
+        def exec_module(module):
+            # Стек вложенных импортов: собственное время = общее - время вложенных
+            stack = self._local.__dict__.setdefault('stack', [])
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                original(module)
+            finally:
+                total = time.perf_counter() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += total
+                self.profiler.imports.append((fullname, total, total - children))
+
+        loader.exec_module = exec_module
+
+
+class StartupProfiler:
+    """Фазы запуска и время импорта модулей"""
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        # (имя, начало от старта, длительность или None, если фаза ещё идёт)
+        self.phases: List[Tuple[str, float, Optional[float]]] = []
+        # (модуль, общее время, собственное время)
+        self.imports: List[Tuple[str, float, float]] = []
+        self._timer: Optional[_ImportTimer] = None
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def enable(self):
+        """Включает режим профилирования и замер последующих импортов"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._timer = _ImportTimer(self)
+        sys.meta_path.insert(0, self._timer)
+
+    def disable(self):
+        """Выключает замер импортов (собранные данные остаются)"""
+        if self._timer in sys.meta_path:
+            sys.meta_path.remove(self._timer)
+        self._timer = None
+        self.enabled = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Отмечает фазу инициализации (можно из любого потока)"""
+        started = time.perf_counter()
+        with self._lock:
+            index = len(self.phases)
+            self.phases.append((name, started - self.started, None))
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[index] = (name, started - self.started, time.perf_counter() - started)
+                self._active -= 1
+
+    @property
+    def idle(self) -> bool:
+        """Нет незавершённых фаз"""
+        return self._active == 0
+
+    def report(self) -> str:
+        """Текстовый отчёт: фазы по порядку и самые медленные импорты"""
+        lines = [f"Профиль запуска ({(time.perf_counter() - self.started) * 1000:.1f} мс от старта):"]
+        for name, offset, duration in list(self.phases):
+            spent = "выполняется" if duration is None else f"{duration * 1000:9.1f} мс"
+            lines.append(f"  +{offset * 1000:9.1f} мс  {name:<24} {spent}")
+
+        if self.imports:
+            import_seconds = sum(own for _, _, own in self.imports)
+            lines.append(f"Импорт: {len(self.imports)} модулей, {import_seconds * 1000:.1f} мс")
+            slowest = sorted(self.imports, key=lambda item: item[2], reverse=True)[:TOP_IMPORTS]
+            for module, total, own in slowest:
+                lines.append(f"  {own * 1000:8.1f} мс (всего {total * 1000:8.1f})  {module}")
+        return "\n".join(lines)
+
+    async def wait_idle(self, timeout: float = 60.0, poll: float = 0.05):
+        """Ждёт завершения фоновых фаз (например, загрузки хранилища)"""
+        deadline = time.perf_counter() + timeout
+        while not self.idle and time.perf_counter() < deadline:
+            await asyncio.sleep(poll)
+
+
+# Глобальный профилировщик процесса
+startup_profiler = StartupProfiler()
@@ -0,0 +1,176 @@
+"""
+Часовые пояса пользователей.
+
+Время в записях хранится в UTC (aware datetime). В местное время
+пользователя оно переводится только для показа и для раскладки по дням.
+Смещение пояса кэшируется по 15-минутным интервалам UTC, поэтому
+раскладка записи по дню - это поиск в словаре и сложение, а не
+преобразование через zoneinfo для каждой записи.
+
+Старые данные без пояса (naive datetime) считаются временем сервера.
+Пояс по умолчанию задаётся переменной окружения DEFAULT_TIMEZONE.
+"""
+
+import logging
+import os
+import re
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from src.core.user_settings import user_settings
+
+logger = logging.getLogger(__name__)
+
+# Ключ настройки пояса пользователя
+TIMEZONE_KEY = "timezone"
+
+# Смещение пояса меняется не чаще, чем на границе 15 минут
+_OFFSET_BUCKET_SECONDS = 900
+_OFFSET_CACHE_SIZE = 65536
+
+_UTC_OFFSET = re.compile(r"^(?:utc|gmt)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$", re.IGNORECASE)
+
+
+def utc_now() -> datetime:
+    """Текущий момент в UTC"""
+    return datetime.now(timezone.utc)
+
+
+def to_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Переводит время в UTC; время без пояса считается временем сервера"""
+    if value is None:
+        return None
+    if value.tzinfo is timezone.utc:
+        return value
+    return value.astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=512)
+def get_zone(name: str) -> tzinfo:
+    """
+    Пояс по имени IANA ("Europe/Moscow") или смещению ("+3", "UTC-05:30").
+
+    Raises:
+        ValueError: пояс не найден
+    """
+    match = _UTC_OFFSET.match(name.strip())
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        if offset > timedelta(hours=14):
+            raise ValueError(f"неверное смещение: {name}")
+        return timezone(-offset if sign == "-" else offset)
+    try:
+        return ZoneInfo(name.strip())
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"неизвестный часовой пояс: {name}") from e
+
+
+def _default_zone() -> tzinfo:
+    name = os.getenv("DEFAULT_TIMEZONE")
+    if name:
+        try:
+            return get_zone(name)
+        except ValueError as e:
+            logger.warning(f"DEFAULT_TIMEZONE: {e}, используется пояс сервера")
+    return datetime.now().astimezone().tzinfo
+
+
+DEFAULT_ZONE = _default_zone()
+
+
+class OffsetCache:
+    """Смещения поясов от UTC по 15-минутным интервалам"""
+
+    def __init__(self, maxsize: int = _OFFSET_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._offsets: Dict[Tuple[Any, int], timedelta] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def offset(self, moment: datetime, zone: tzinfo) -> timedelta:
+        """Смещение пояса в момент moment (aware datetime)"""
+        bucket = int(moment.timestamp()) // _OFFSET_BUCKET_SECONDS
+        key = (zone, bucket)
+        offset = self._offsets.get(key)
+        if offset is not None:
+            self.hits += 1
+            return offset
+
+        self.misses += 1
+        if len(self._offsets) >= self.maxsize:
+            self._offsets.clear()
+        offset = moment.astimezone(zone).utcoffset()
+        self._offsets[key] = offset
+        return offset
+
+    def local(self, moment: datetime, zone: tzinfo) -> datetime:
+        """Местное время (без пояса) для момента UTC"""
+        moment = to_utc(moment)
+        return moment.replace(tzinfo=None) + self.offset(moment, zone)
+
+    def local_date(self, moment: datetime, zone: tzinfo) -> date:
+        """Местная дата момента (день записи в поясе пользователя)"""
+        return self.local(moment, zone).date()
+
+
+offsets = OffsetCache()
+
+# user_id → пояс (сбрасывается при изменении настройки)
+_user_zones: Dict[int, tzinfo] = {}
+
+
+def user_zone(user_id: int) -> tzinfo:
+    """Часовой пояс пользователя"""
+    zone = _user_zones.get(user_id)
+    if zone is None:
+        name = user_settings.get(user_id, TIMEZONE_KEY)
+        try:
+            zone = get_zone(name) if name else DEFAULT_ZONE
+        except ValueError:
+            logger.warning(f"Неверный часовой пояс пользователя {user_id}: {name!r}")
+            zone = DEFAULT_ZONE
+        _user_zones[user_id] = zone
+    return zone
+
+
+def _on_setting(user_id: int, key: str, before: Any, after: Any):
+    if key == TIMEZONE_KEY:
+        _user_zones.pop(user_id, None)
+
+
+user_settings.subscribe(_on_setting)
+
+
+def to_local(moment: datetime, user_id: int) -> datetime:
+    """Местное время пользователя (без пояса) для показа и раскладки по дням"""
+    return offsets.local(moment, user_zone(user_id))
+
+
+def local_date(moment: datetime, user_id: int) -> date:
+    """Местная дата момента для пользователя"""
+    return offsets.local_date(moment, user_zone(user_id))
+
+
+def local_now(user_id: int) -> datetime:
+    """Текущее местное время пользователя (без пояса)"""
+    return to_local(utc_now(), user_id)
+
+
+def from_local(value: datetime, user_id: int) -> datetime:
+    """Местное время пользователя (без пояса) → UTC"""
+    return value.replace(tzinfo=user_zone(user_id)).astimezone(timezone.utc)
+
+
+def local_day_bounds(day: date, user_id: int) -> Tuple[datetime, datetime]:
+    """Начало и конец местного дня пользователя в UTC: [начало, конец)"""
+    start = from_local(datetime.combine(day, time.min), user_id)
+    end = from_local(datetime.combine(day + timedelta(days=1), time.min), user_id)
+    return start, end
+
+
+def zone_name(user_id: int) -> str:
+    """Название пояса пользователя для сообщений"""
+    return user_settings.get(user_id, TIMEZONE_KEY) or str(DEFAULT_ZONE)
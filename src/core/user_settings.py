@@ -0,0 +1,112 @@
+"""
+Настройки пользователей (время ежедневной сводки и т.п.).
+Хранятся в одном JSON-файле: {user_id: {ключ: значение}}.
+Файл читается при первом обращении к настройкам или в init().
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Подписчик на изменение настройки: (user_id, ключ, было, стало)
+SettingsListener = Callable[[int, str, Any, Any], None]
+
+
+class UserSettingsManager:
+    """Настройки пользователей с уведомлением подписчиков об изменениях"""
+
+    def __init__(self, storage_path: str = "data/user_settings.json"):
+        """
+        Args:
+            storage_path: Путь к JSON-файлу настроек (создаётся при первой записи)
+        """
+        self.storage_path = Path(storage_path)
+        self._cache: Optional[Dict[int, Dict[str, Any]]] = None
+        self._init_lock = threading.Lock()
+        self._listeners: List[SettingsListener] = []
+
+    def init(self):
+        """
+        Загружает настройки, если они ещё не загружены; иначе загрузка
+        произойдёт при первом обращении к ним.
+        """
+        if self._cache is not None:
+            return
+        with self._init_lock:
+            if self._cache is None:
+                self._cache = self._load()
+
+    @property
+    def is_loaded(self) -> bool:
+        """Загружены ли настройки"""
+        return self._cache is not None
+
+    @property
+    def _settings(self) -> Dict[int, Dict[str, Any]]:
+        if self._cache is None:
+            self.init()
+        return self._cache
+
+    def _load(self) -> Dict[int, Dict[str, Any]]:
+        if not self.storage_path.exists():
+            return {}
+        try:
+            data = json.loads(self.storage_path.read_text(encoding="utf-8"))
+            return {int(user_id): values for user_id, values in data.items()}
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning(f"Ошибка при загрузке настроек пользователей: {e}")
+            return {}
+
+    def _save(self):
+        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {str(user_id): values for user_id, values in self._settings.items()}
+        self.storage_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def use_storage(self, storage_path: str):
+        """Переключает файл настроек (шарды работают каждый со своим; читается при первом обращении)"""
+        with self._init_lock:
+            self.storage_path = Path(storage_path)
+            self._cache = None
+
+    def subscribe(self, listener: SettingsListener):
+        """Подписка на изменения настроек"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def get(self, user_id: int, key: str, default: Any = None) -> Any:
+        """Значение настройки пользователя"""
+        return self._settings.get(user_id, {}).get(key, default)
+
+    def set(self, user_id: int, key: str, value: Any):
+        """Меняет настройку пользователя (None - удалить)"""
+        values = self._settings.setdefault(user_id, {})
+        before = values.get(key)
+        if value is None:
+            values.pop(key, None)
+            if not values:
+                del self._settings[user_id]
+        else:
+            values[key] = value
+        if before == value:
+            return
+
+        self._save()
+        for listener in self._listeners:
+            try:
+                listener(user_id, key, before, value)
+            except Exception as e:
+                logger.error(f"Ошибка подписчика настроек на {key}: {e}", exc_info=True)
+
+    def users_with(self, key: str) -> Iterator[Tuple[int, Any]]:
+        """Пользователи, у которых задана настройка: (user_id, значение)"""
+        for user_id, values in self._settings.items():
+            if key in values:
+                yield user_id, values[key]
+
+
+# Глобальный экземпляр настроек
+user_settings = UserSettingsManager()
@@ -6,20 +6,46 @@
 import sys
 import os
 import asyncio
+import importlib
 import logging
 import signal
 
 # Добавляем корень проекта в путь Python
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from config import config
-from src.core.bot_manager import get_bot_manager
-from src.bots.glasspen_bot.bot import GlasspenBot
-from src.bots.helper_bot.bot import HelperBot
-from src.utils.logging_config import setup_logging
+# Профилировщик подключается до остальных импортов, чтобы замерить и их
+from src.core.startup_profiler import startup_profiler
+
+PROFILE_STARTUP = "--profile-startup" in sys.argv or bool(os.getenv("PROFILE_STARTUP"))
+if PROFILE_STARTUP:
+    startup_profiler.enable()
+
+with startup_profiler.phase("imports"):
+    from config import config
+    from src.core.bot_manager import get_bot_manager
+    from src.core.sharding import create_bot
+    from src.utils.logging_config import logging_options, setup_logging
 
 logger = logging.getLogger(__name__)
 
+# Классы ботов импортируются только для включённых ботов
+BOT_CLASSES = {
+    "glasspen": "src.bots.glasspen_bot.bot.GlasspenBot",
+    "helper": "src.bots.helper_bot.bot.HelperBot",
+}
+
+
+def load_bot_class(bot_name: str) -> type:
+    """Импортирует класс бота по имени (неизвестный бот - BaseBot)"""
+    path = BOT_CLASSES.get(bot_name)
+    if path is None:
+        logger.warning(f"Неизвестный тип бота: {bot_name}. Используем BaseBot.")
+        from src.core.base_bot import BaseBot
+        return BaseBot
+    module_name, class_name = path.rsplit(".", 1)
+    with startup_profiler.phase(f"import:{bot_name}"):
+        return getattr(importlib.import_module(module_name), class_name)
+
 def setup_directories():
     """Создание необходимых директорий"""
     directories = ['data', 'logs']
@@ -32,16 +58,6 @@ def create_bots():
     """Создание и регистрация всех ботов"""
     manager = get_bot_manager()
     
-    # ДОБАВИТЬ ДЛЯ ОТЛАДКИ:
-    print(f"\n=== DEBUG: ВСЯ КОНФИГУРАЦИЯ ===")
-    print(f"config.bots.glasspen = {config.bots['glasspen']}")
-    print(f"Токен: {config.bots['glasspen'].token}")
-    print(f"Admin IDs: {config.bots['glasspen'].admin_ids}")
-    print(f"Extra config: {config.bots['glasspen'].extra_config}")
-    print("="*50 + "\n")
-    
-    bots = []
-    
     # Создаём и регистрируем всех ботов из конфигурации
     for bot_name, bot_config in config.bots.items():
         if not bot_config.enabled:
@@ -49,14 +65,7 @@ def create_bots():
             continue
         
         # Выбираем класс бота в зависимости от имени
-        if bot_name == "glasspen":
-            bot_class = GlasspenBot
-        elif bot_name == "helper":
-            bot_class = HelperBot
-        else:
-            logger.warning(f"Неизвестный тип бота: {bot_name}. Используем BaseBot.")
-            from src.core.base_bot import BaseBot
-            bot_class = BaseBot
+        bot_class = load_bot_class(bot_name)
         
         # СОБИРАЕМ ПОЛНЫЙ КОНФИГ ДЛЯ БОТА
         bot_full_config = {
@@ -64,14 +73,21 @@ def create_bots():
             **bot_config.extra_config
         }
         
-        # ДОБАВИМ ОТЛАДОЧНЫЙ ВЫВОД
-        print(f"=== DEBUG: Конфиг для бота {bot_name} ===")
-        print(f"bot_full_config = {bot_full_config}")
-        print(f"admin_chat_id = {bot_full_config.get('admin_chat_id')}")
-        print("="*30)
+        # Файл состояния бота (user_data, диалоги) - переживает перезапуски
+        if config.persistence.enabled:
+            bot_full_config.setdefault(
+                'state_path', os.path.join(config.persistence.directory, f"{bot_name}.sqlite3")
+            )
+            bot_full_config.setdefault('state_update_interval', config.persistence.update_interval)
         
-        # Создаём экземпляр бота
-        bot = bot_class(
+        # Сколько дообрабатывать принятые обновления при остановке
+        bot_full_config.setdefault('drain_timeout', config.drain_timeout)
+        
+        logger.debug(f"Конфиг бота {bot_name}: {bot_full_config}")
+        
+        # Создаём экземпляр бота (с BOT_<ИМЯ>_SHARDS > 1 - в нескольких процессах)
+        bot = create_bot(
+            bot_class,
             token=bot_config.token,
             config=bot_full_config  # ← передаём полный конфиг
         )
@@ -86,8 +102,13 @@ async def shutdown(signal, loop):
     """Корректное завершение работы"""
     logger.info(f"Получен сигнал {signal.name}. Завершение работы...")
     
+    # Боты перестают принимать обновления и дообрабатывают принятые
+    # (не дольше DRAIN_TIMEOUT), затем дожидаются отправок и сохраняют состояние.
+    # Отменяются только задачи, оставшиеся после этого
     manager = get_bot_manager()
     await manager.stop_all()
+    await manager.stop_metrics_server()
+    await manager.stop_loop_monitor()
     
     tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
     for task in tasks:
@@ -98,11 +119,26 @@ async def shutdown(signal, loop):
     
     logger.info("Работа завершена")
 
+async def report_startup():
+    """Режим профилирования: отчёт о запуске после фоновой загрузки хранилищ"""
+    logger.info(startup_profiler.report())
+    await startup_profiler.wait_idle()
+    startup_profiler.disable()
+    logger.info(startup_profiler.report())
+
 async def main_async():
     """Асинхронная основная функция"""
     try:
         # Настройка логирования
-        setup_logging(config.log_level)
+        with startup_profiler.phase("logging"):
+            setup_logging(
+                config.log_level,
+                async_mode=config.logging.async_mode,
+                queue_size=config.logging.queue_size,
+                drop_policy=config.logging.drop_policy,
+                json_format=config.logging.json_format,
+                sample_rates=config.logging.sample_rates
+            )
         
         # Показываем конфигурацию
         config.show()
@@ -111,7 +147,11 @@ async def main_async():
         setup_directories()
         
         # Создаём ботов
-        create_bots()
+        with startup_profiler.phase("create_bots"):
+            manager = create_bots()
+        if not manager.bots:
+            logger.error("Нет включённых ботов: проверьте токены в конфигурации")
+            return 1
         
         # Настройка обработки сигналов (кросс-платформенная версия)
         try:
@@ -131,12 +171,37 @@ async def main_async():
         
         # Запускаем менеджер ботов
         manager = get_bot_manager()
+        manager.set_run_mode(
+            config.run_mode,
+            log_level=config.log_level,
+            logging=logging_options(),
+            loop_monitor=(
+                (config.loop_monitor.interval_ms / 1000, config.loop_monitor.threshold_ms / 1000)
+                if config.loop_monitor.enabled else None
+            )
+        )
+        
+        # Монитор задержек event loop: запускаем до ботов, чтобы видеть и их старт
+        if config.loop_monitor.enabled:
+            await manager.start_loop_monitor(
+                interval=config.loop_monitor.interval_ms / 1000,
+                threshold=config.loop_monitor.threshold_ms / 1000
+            )
         
         logger.info("="*60)
         logger.info("🚀 Запуск системы ботов...")
         logger.info("="*40)
         
-        await manager.start_all()
+        with startup_profiler.phase("start_all"):
+            await manager.start_all()
+        
+        # HTTP-эндпоинт метрик (только если включён в конфигурации)
+        if config.metrics.enabled:
+            with startup_profiler.phase("metrics_server"):
+                await manager.start_metrics_server(config.metrics.host, config.metrics.port)
+        
+        if PROFILE_STARTUP:
+            asyncio.create_task(report_startup())
         
         # Периодическая проверка здоровья
         async def health_check_task():
@@ -1,26 +1,177 @@
 """
 Конфигурация логирования с ротацией.
+
+В асинхронном режиме (async_mode=True) корневой логгер получает только
+QueueHandler: запись лога в обработчике бота - это копия записи и
+put_nowait в ограниченную очередь. Форматирование, запись на диск и
+проверки ротации выполняет QueueListener в отдельном потоке.
+
+Если очередь переполнена (диск не успевает), записи отбрасываются
+по политике drop_policy и считаются в метриках "logging":
+  drop_new    - отбрасывается новая запись (по умолчанию)
+  drop_oldest - вытесняется самая старая запись из очереди
+  block       - ожидание места в очереди не дольше BLOCK_TIMEOUT
+Записи уровня ERROR и выше не отбрасываются по drop_new: для них
+вытесняется самая старая запись.
+
+С json_format=True файлы логов пишутся JSON-строками (JsonFormatter),
+консоль остаётся текстовой. Поля контекста обработчика и выборка
+событий (sample_rates) - см. src.utils.structured_logging.
 """
 
+import atexit
+import copy
 import logging
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
 import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Any, Dict, Optional
+
+from src.core.metrics import register_collector
+from src.utils.structured_logging import DEFAULT_SAMPLE_RATES, ContextFilter, JsonFormatter, sampler
+
+DROP_NEW = "drop_new"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+DROP_POLICIES = (DROP_NEW, DROP_OLDEST, BLOCK)
+
+# Записей в очереди асинхронного логирования по умолчанию
+DEFAULT_QUEUE_SIZE = 10000
+
+# Дольше этого политика block не ждёт (затем запись отбрасывается)
+BLOCK_TIMEOUT = 0.5
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler с ограниченной очередью и политикой отбрасывания записей"""
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE, drop_policy: str = DROP_NEW):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Неизвестная политика {drop_policy}. Допустимые: {', '.join(DROP_POLICIES)}")
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_by_level: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Подставляет аргументы в сообщение (объекты могут измениться до записи),
+        но не форматирует запись: это делает поток QueueListener.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.drop_policy == BLOCK:
+                self.queue.put(record, timeout=BLOCK_TIMEOUT)
+            elif self.drop_policy == DROP_OLDEST or record.levelno >= logging.ERROR:
+                self._put_evicting(record)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self._count_drop(record)
+            return
+        with self._lock:
+            self.enqueued += 1
+
+    def _put_evicting(self, record: logging.LogRecord):
+        """Кладёт запись, при нехватке места вытесняя самую старую"""
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    evicted = self.queue.get_nowait()
+                except queue.Empty:
+                    continue
+                if evicted is QueueListener._sentinel:
+                    # Сигнал остановки слушателя не вытесняем
+                    self.queue.put_nowait(evicted)
+                    raise
+                self._count_drop(evicted)
+
+    def _count_drop(self, record: logging.LogRecord):
+        with self._lock:
+            self.dropped += 1
+            self.dropped_by_level[record.levelname] = self.dropped_by_level.get(record.levelname, 0) + 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики очереди логирования"""
+        return {
+            'queue_size': self.queue.qsize(),
+            'queue_capacity': self.maxsize,
+            'enqueued_total': self.enqueued,
+            'dropped_total': self.dropped,
+            **{f"dropped_{level.lower()}_total": count for level, count in self.dropped_by_level.items()},
+        }
+
+
+class _Listener(QueueListener):
+    """QueueListener, который при остановке ждёт места для сигнала в заполненной очереди"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+# Слушатель очереди текущей конфигурации (None - синхронный режим)
+_listener: Optional[_Listener] = None
+# Параметры последнего вызова setup_logging (передаются дочерним процессам)
+_options: Dict[str, Any] = {}
+
+
+def stop_logging():
+    """Дописывает записи из очереди и останавливает поток логирования"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def logging_options() -> Dict[str, Any]:
+    """Параметры режима логирования для setup_logging в рабочих процессах"""
+    return dict(_options)
+
+
+def setup_logging(log_level="INFO", log_dir="logs", async_mode: bool = False,
+                  queue_size: int = DEFAULT_QUEUE_SIZE, drop_policy: str = DROP_NEW,
+                  json_format: bool = False, sample_rates: Optional[Dict[str, float]] = None):
+    """
+    Настройка логирования с ротацией файлов.
+
+    Args:
+        log_level: Уровень логов
+        log_dir: Директория файлов логов
+        async_mode: Писать логи в фоновом потоке через ограниченную очередь
+        queue_size: Размер очереди асинхронного режима
+        drop_policy: Что делать при переполнении очереди (drop_new, drop_oldest, block)
+        json_format: Писать файлы логов JSON-строками
+        sample_rates: Доли выборки по событиям (None - DEFAULT_SAMPLE_RATES)
+    """
+    global _listener, _options
 
-def setup_logging(log_level="INFO", log_dir="logs"):
-    """Настройка логирования с ротацией файлов"""
-    
     # Преобразуем строку уровня в константу
     level = getattr(logging, log_level.upper(), logging.INFO)
-    
+
     # Создаём директорию для логов
     os.makedirs(log_dir, exist_ok=True)
-    
+
     # Форматтер
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
+
     # Файловый обработчик с ротацией по размеру
     file_handler = RotatingFileHandler(
         os.path.join(log_dir, 'bot_system.log'),
@@ -28,9 +179,10 @@ def setup_logging(log_level="INFO", log_dir="logs"):
         backupCount=10,
         encoding='utf-8'
     )
-    file_handler.setFormatter(formatter)
+    file_formatter = JsonFormatter() if json_format else formatter
+    file_handler.setFormatter(file_formatter)
     file_handler.setLevel(level)
-    
+
     # Файловый обработчик с ротацией по времени (отдельно для ошибок)
     error_handler = TimedRotatingFileHandler(
         os.path.join(log_dir, 'errors.log'),
@@ -39,30 +191,49 @@ def setup_logging(log_level="INFO", log_dir="logs"):
         backupCount=30,
         encoding='utf-8'
     )
-    error_handler.setFormatter(formatter)
+    error_handler.setFormatter(file_formatter)
     error_handler.setLevel(logging.ERROR)
-    
+
     # Консольный обработчик
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.setLevel(level)
-    
+
     # Корневой логгер
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
-    
-    # Удаляем существующие обработчики
+
+    # Удаляем существующие обработчики (и останавливаем прежний поток логирования)
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
-    
-    # Добавляем новые обработчики
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(error_handler)
-    root_logger.addHandler(console_handler)
-    
+    stop_logging()
+
+    if sample_rates is None:
+        sample_rates = DEFAULT_SAMPLE_RATES
+    sampler.configure(sample_rates)
+
+    # Добавляем новые обработчики. Контекст подставляется в потоке, где
+    # сделана запись, поэтому фильтр стоит до очереди
+    context_filter = ContextFilter()
+    handlers = [file_handler, error_handler, console_handler]
+    if async_mode:
+        queue_handler = BoundedQueueHandler(maxsize=queue_size, drop_policy=drop_policy)
+        queue_handler.addFilter(context_filter)
+        _listener = _Listener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        root_logger.addHandler(queue_handler)
+        register_collector("logging", queue_handler.get_metrics)
+    else:
+        for handler in handlers:
+            handler.addFilter(context_filter)
+            root_logger.addHandler(handler)
+
+    _options = {'async_mode': async_mode, 'queue_size': queue_size, 'drop_policy': drop_policy,
+                'json_format': json_format, 'sample_rates': dict(sample_rates)}
+
     # Настройка логгеров библиотек
     logging.getLogger('telegram').setLevel(logging.WARNING)
     logging.getLogger('httpx').setLevel(logging.WARNING)
     logging.getLogger('asyncio').setLevel(logging.WARNING)
-    
+
     return root_logger
@@ -0,0 +1,153 @@
+"""
+Структурированные логи: события с постоянными полями и выборкой.
+
+log_event(logger, "note.added", "Добавлена запись %s", note.id, user_id=...)
+ничего не форматирует, если уровень отключён или событие не попало
+в выборку. Поля bot, user_id и handler подставляются из контекста
+обработчика (BaseBot привязывает их на время обработки обновления),
+поэтому их видно и в обычных logger.info внутри обработчика.
+
+JsonFormatter пишет одну JSON-строку на запись с постоянным набором
+полей: ts, level, logger, event, message, bot, user_id, handler,
+latency_ms (отсутствующие - null) и дополнительными полями события.
+
+Выборка задаётся долей для каждого события: {"handler.done": 0.01}
+оставляет каждую сотую запись. Предупреждения и ошибки в выборку
+не попадают никогда - они пишутся всегда.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+from src.core.metrics import register_collector
+
+# Постоянные поля каждой JSON-записи
+STABLE_FIELDS = ("bot", "user_id", "handler", "latency_ms")
+
+# Доли выборки по умолчанию: событие на каждое обновление - самое частое
+DEFAULT_SAMPLE_RATES = {"handler.done": 0.01}
+
+# Контекст текущего обработчика: bot, user_id, handler
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """Привязывает поля ко всем записям, сделанным внутри блока (в том числе в await)"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class EventSampler:
+    """Выборка записей по типу события (детерминированная: каждая N-я)"""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        self._lock = threading.Lock()
+        self._every: Dict[str, int] = {}
+        self._seen: Dict[str, int] = {}
+        self.kept: Dict[str, int] = {}
+        self.sampled_out: Dict[str, int] = {}
+        self.configure(rates or {})
+
+    def configure(self, rates: Dict[str, float]):
+        """Задаёт доли выборки: 1 - все записи, 0 - ни одной (кроме ошибок)"""
+        every = {}
+        for event, rate in rates.items():
+            rate = float(rate)
+            if not 0 <= rate <= 1:
+                raise ValueError(f"доля выборки {event} вне диапазона 0..1: {rate}")
+            every[event] = 0 if rate == 0 else round(1 / rate)
+        with self._lock:
+            self._every = every
+
+    def keep(self, event: Optional[str], levelno: int) -> bool:
+        """Оставить ли запись события"""
+        if event is None or levelno >= logging.WARNING:
+            return True
+        every = self._every.get(event, 1)
+        if every == 1:
+            return True
+        with self._lock:
+            seen = self._seen.get(event, 0)
+            self._seen[event] = seen + 1
+            keep = every > 0 and seen % every == 0
+            counters = self.kept if keep else self.sampled_out
+            counters[event] = counters.get(event, 0) + 1
+        return keep
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики выборки по событиям"""
+        metrics: Dict[str, Any] = {}
+        for event, count in self.kept.items():
+            metrics[f"{event}_kept_total"] = count
+        for event, count in self.sampled_out.items():
+            metrics[f"{event}_sampled_out_total"] = count
+        return metrics
+
+
+sampler = EventSampler(DEFAULT_SAMPLE_RATES)
+register_collector("log_sampling", sampler.get_metrics)
+
+
+def log_event(logger: logging.Logger, event: str, msg: str = "", *args,
+              level: int = logging.INFO, exc_info=None, **fields):
+    """
+    Запись события. Сообщение форматируется (%-аргументы) только если
+    уровень включён и событие попало в выборку.
+    """
+    if not logger.isEnabledFor(level) or not sampler.keep(event, level):
+        return
+    logger.log(level, msg or event, *args, exc_info=exc_info,
+               extra={'event': event, 'fields': fields, 'sampled': True})
+
+
+class ContextFilter(logging.Filter):
+    """
+    Подставляет в запись поля контекста обработчика и применяет выборку
+    к записям с extra={'event': ...}, сделанным в обход log_event.
+    Решение сохраняется в записи: фильтр на нескольких обработчиках
+    принимает его один раз.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        decision = getattr(record, '_keep', None)
+        if decision is not None:
+            return decision
+
+        for key, value in _context.get().items():
+            if getattr(record, key, None) is None:
+                setattr(record, key, value)
+        event = getattr(record, 'event', None)
+        keep = getattr(record, 'sampled', False) or sampler.keep(event, record.levelno)
+        record._keep = keep
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись с постоянным набором полей"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, 'fields', None) or {}
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'message': record.getMessage(),
+        }
+        for key in STABLE_FIELDS:
+            entry[key] = fields.get(key, getattr(record, key, None))
+        for key, value in fields.items():
+            if key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.cache import LRUCache
+
+
+def test_lru_eviction_and_tags():
+    """Старые записи вытесняются, тег сбрасывает все записи пользователя"""
+    cache = LRUCache(maxsize=2)
+    cache.set((1, "a"), "note-a", tag=1)
+    cache.set((1, "b"), "note-b", tag=1)
+    assert cache.get((1, "a")) == "note-a"
+
+    # (1, "b") давно не использовался - вытесняется первым
+    cache.set((2, "c"), "note-c", tag=2)
+    assert (1, "b") not in cache
+    assert cache.evictions == 1
+
+    assert cache.invalidate_tag(1) == 1
+    assert cache.get((1, "a")) is None
+    assert cache.get((2, "c")) == "note-c"
+    assert cache.bytes > 0
+
+
+def test_ttl_expiration():
+    """Устаревшая запись не возвращается"""
+    cache = LRUCache(ttl=-1)
+    cache.set("key", "value")
+    assert cache.get("key") is None
+    assert cache.expirations == 1
+    assert cache.bytes == 0
@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from src.core.callback_router import CallbackRouter, CallbackDecodeError
+
+
+def _router():
+    router = CallbackRouter("test")
+    router.add_route('main_menu')
+    router.add_route('delete', str)
+    router.add_route('delete_confirm', str)
+    router.add_route('category', str, str, min_args=1)
+    router.add_route('page', int)
+    router.legacy('main_menu', 'main_menu', exact=True)
+    router.legacy('delete_', 'delete')
+    router.legacy('delete_confirm_', 'delete_confirm')
+    router.legacy('category_', 'category')
+    router.legacy('page_', 'page')
+    return router
+
+
+def test_pack_and_resolve():
+    """Версионированные и старые кнопки разбираются в один маршрут с типизированными аргументами"""
+    router = _router()
+    route, args = router.resolve(router.pack('page', 3))
+    assert (route.name, args) == ('page', [3])
+
+    route, args = router.resolve(router.pack('category', 'a1b2c3d4', 'Работа|Дом'))
+    assert (route.name, args) == ('category', ['a1b2c3d4', 'Работа|Дом'])
+
+    # Старый формат: побеждает самый длинный префикс
+    route, args = router.resolve('delete_confirm_a1b2c3d4')
+    assert (route.name, args) == ('delete_confirm', ['a1b2c3d4'])
+    route, args = router.resolve('category_a1b2c3d4')
+    assert (route.name, args) == ('category', ['a1b2c3d4'])
+    assert router.resolve('main_menu')[0].name == 'main_menu'
+
+
+def test_stale_and_malformed():
+    """Неизвестная версия не находит маршрут, неверный аргумент - ошибка разбора"""
+    router = _router()
+    assert router.resolve('0|page|1') is None
+    assert router.resolve('main_menu_extra') is None
+    with pytest.raises(CallbackDecodeError):
+        router.resolve('1|page|abc')
+    with pytest.raises(CallbackDecodeError):
+        router.resolve('1|delete|')
+    with pytest.raises(ValueError):
+        router.pack('category', 'a1b2c3d4', 'очень длинное название категории')
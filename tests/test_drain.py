@@ -0,0 +1,115 @@
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram import Update
+from telegram.ext import MessageHandler, filters
+from telegram.request import BaseRequest
+
+from src.core.base_bot import BaseBot
+from src.core.persistence import SQLitePersistence
+
+
+class _FakeRequest(BaseRequest):
+    """Bot API без сети: getMe и True на всё остальное"""
+
+    def __init__(self):
+        self.initialized = 0
+
+    @property
+    def read_timeout(self):
+        return 5.0
+
+    async def initialize(self):
+        self.initialized += 1
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        result = True
+        if url.endswith("getMe"):
+            result = {"id": 1, "is_bot": True, "first_name": "test", "username": "test_bot"}
+        return 200, json.dumps({"ok": True, "result": result}).encode("utf-8")
+
+
+class _SlowBot(BaseBot):
+    def __init__(self, state_path: str):
+        super().__init__(name="slow", token="1:test", config={'state_path': state_path})
+        self.handled = []
+        self.requests = []
+        self.request_factory = self._new_request
+        self.use_polling = False
+
+    def _new_request(self):
+        request = _FakeRequest()
+        self.requests.append(request)
+        return request
+
+    def get_handlers(self):
+        return [MessageHandler(filters.TEXT, self._handle)]
+
+    async def _handle(self, update, context):
+        await asyncio.sleep(0.05)
+        context.user_data['handled'] = context.user_data.get('handled', 0) + 1
+        self.handled.append(update.message.text)
+
+
+def _update(update_id: int, bot) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": f"m{update_id}",
+            "chat": {"id": 5, "type": "private"},
+            "from": {"id": 5, "is_bot": False, "first_name": "u"},
+        },
+    }, bot)
+
+
+def test_stop_drains_accepted_updates(tmp_path):
+    """Остановка дообрабатывает уже принятые обновления, а не отменяет их"""
+    bot = _SlowBot(str(tmp_path / "slow.sqlite3"))
+
+    async def scenario():
+        await bot.start()
+        for i in range(3):
+            await bot.application.update_queue.put(_update(i, bot.application.bot))
+        await asyncio.sleep(0.01)
+        await bot.stop()
+
+    asyncio.run(scenario())
+    assert bot.handled == ["m0", "m1", "m2"]
+    assert bot.in_flight == 0 and bot.application is None
+
+
+def test_restart_reuses_application(tmp_path):
+    """Тёплый перезапуск не создаёт новое приложение и HTTP-клиент, состояние пишется дальше"""
+    state_path = str(tmp_path / "slow.sqlite3")
+    bot = _SlowBot(state_path)
+
+    async def scenario():
+        await bot.start()
+        application = bot.application
+        await bot.application.update_queue.put(_update(1, bot.application.bot))
+        await asyncio.sleep(0.01)
+        await bot.restart()
+        assert bot.is_running and bot.application is application
+        await bot.application.update_queue.put(_update(2, bot.application.bot))
+        await asyncio.sleep(0.1)
+        await bot.stop()
+
+    asyncio.run(scenario())
+    assert bot.handled == ["m1", "m2"]
+    assert len(bot.requests) == 1 and bot.requests[0].initialized == 1
+
+    async def saved():
+        persistence = SQLitePersistence(state_path)
+        user_data = {}
+        await persistence.refresh_user_data(5, user_data)
+        persistence.close()
+        return user_data
+
+    assert asyncio.run(saved()) == {'handled': 2}
@@ -0,0 +1,48 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.events import NOTE_ADDED, NOTE_UPDATED, NOTE_DELETED
+from src.core.models import Note
+from src.core.note_manager import NoteManager
+
+
+def test_mutations_emit_events_with_diffs(tmp_path):
+    """add/update/delete рассылают события с изменёнными полями"""
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    received = []
+    manager.events.subscribe(received.append)
+
+    note = manager.add_note(Note(user_id=1, text="купить хлеб"))
+    assert manager.find_note_by_short_id(1, note.id[:8]) is note
+
+    manager.update_note(1, note.id, {"category": "Покупки", "text": "купить хлеб"})
+    manager.delete_note(1, note.id)
+
+    assert [event.kind for event in received] == [NOTE_ADDED, NOTE_UPDATED, NOTE_DELETED]
+    update = received[1]
+    assert update.changes["category"] == ("Без категории", "Покупки")
+    assert "text" not in update.changes
+    assert update.changed("category") and not update.changed("reminder_at")
+    # Кэш коротких ID сброшен подписчиком
+    assert manager.find_note_by_short_id(1, note.id[:8]) is None
+    assert manager.events.publish_latency.count == 3
+
+
+def test_async_subscribers_run_in_loop(tmp_path):
+    """Асинхронные подписчики выполняются задачами event loop"""
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    received = []
+
+    async def on_event(event):
+        received.append(event.note_id)
+
+    async def run():
+        manager.events.subscribe_async(on_event)
+        note = manager.add_note(Note(user_id=2, text="позвонить"))
+        await manager.events.drain()
+        return note
+
+    note = asyncio.run(run())
+    assert received == [note.id]
@@ -0,0 +1,79 @@
+import sys
+import os
+import json
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.logging_config import DROP_OLDEST, BoundedQueueHandler
+from src.utils.structured_logging import ContextFilter, EventSampler, JsonFormatter, log_context, log_event, sampler
+
+
+def _record(message: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+def test_full_queue_drops_and_counts():
+    """Переполненная очередь отбрасывает новые записи, но не ошибки"""
+    handler = BoundedQueueHandler(maxsize=2)
+    for i in range(4):
+        handler.handle(_record(f"info {i}"))
+    handler.handle(_record("error", logging.ERROR))
+
+    queued = [handler.queue.get_nowait().msg for _ in range(2)]
+    assert queued == ["info 1", "error"]
+    metrics = handler.get_metrics()
+    assert metrics['dropped_total'] == 3 and metrics['dropped_info_total'] == 3
+    assert metrics['enqueued_total'] == 3
+
+
+def test_drop_oldest_keeps_newest():
+    """Политика drop_oldest вытесняет старые записи; аргументы подставлены заранее"""
+    handler = BoundedQueueHandler(maxsize=2, drop_policy=DROP_OLDEST)
+    for i in range(3):
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "запись %s", (i,), None)
+        handler.handle(record)
+    assert [handler.queue.get_nowait().msg for _ in range(2)] == ["запись 1", "запись 2"]
+    assert handler.dropped == 1
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+def test_json_line_fields_and_sampling():
+    """JSON-строка содержит постоянные поля из контекста; событие пишется по выборке"""
+    collect = _Collect()
+    collect.setFormatter(JsonFormatter())
+    collect.addFilter(ContextFilter())
+    test_logger = logging.getLogger("test.structured")
+    test_logger.addHandler(collect)
+    test_logger.setLevel(logging.INFO)
+    sampler.configure({"test.event": 0.25})
+    try:
+        with log_context(bot="helper", handler="/list", user_id=7):
+            for i in range(8):
+                log_event(test_logger, "test.event", "готово %s", i, latency_ms=1.5)
+            log_event(test_logger, "test.event", "ошибка", level=logging.ERROR)
+    finally:
+        test_logger.removeHandler(collect)
+        sampler.configure({})
+
+    assert [line['message'] for line in collect.lines] == ["готово 0", "готово 4", "ошибка"]
+    first = collect.lines[0]
+    assert (first['bot'], first['handler'], first['user_id'], first['latency_ms']) == ("helper", "/list", 7, 1.5)
+    assert first['event'] == "test.event" and first['level'] == "INFO"
+    assert collect.lines[2]['latency_ms'] is None
+
+
+def test_sampler_counts():
+    """Выборка детерминирована и считает оставленные и отброшенные записи"""
+    events = EventSampler({"a": 0.1, "b": 0})
+    kept = [events.keep("a", logging.INFO) for _ in range(20)]
+    assert kept.count(True) == 2
+    assert not events.keep("b", logging.INFO) and events.keep("b", logging.WARNING)
+    assert events.get_metrics()['a_sampled_out_total'] == 18
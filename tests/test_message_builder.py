@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.message_builder import (
+    MessageBuilder, escape_html, escape_markdown, split_message, telegram_length,
+)
+
+
+def test_escaping():
+    """Спецсимволы разметки экранируются, обратная косая черта - без двойного экранирования"""
+    assert escape_markdown("a_b*c`d[e") == "a\\_b\\*c\\`d\\[e"
+    assert escape_markdown("1.5 (x) \\", version=2) == "1\\.5 \\(x\\) \\\\"
+    assert escape_html("<b>&</b>") == "&lt;b&gt;&amp;&lt;/b&gt;"
+    assert escape_markdown("") == ""
+
+
+def test_split_respects_limit():
+    """Части не длиннее лимита в UTF-16 и режутся по строкам"""
+    lines = [f"{i} 😀 строка" for i in range(2000)]
+    chunks = split_message("\n".join(lines))
+    assert len(chunks) > 1
+    assert all(telegram_length(chunk) <= 4096 for chunk in chunks)
+    assert "\n".join(chunks) == "\n".join(lines)
+
+    builder = MessageBuilder(parse_mode="MarkdownV2", limit=10)
+    builder.add_text("a.b.c.d.e.f")
+    chunks = builder.chunks()
+    assert all(len(chunk) <= 10 and not chunk.endswith("\\") for chunk in chunks)
+
+
+def test_stream_reply_sends_chunks_in_order():
+    """Потоковый ответ уходит частями в пределах лимита, клавиатура - у последней"""
+    import asyncio
+    from src.core.outbound import RateLimiter
+    from src.core.replies import stream_reply
+
+    class FakeMessage:
+        chat_id = 1
+
+        def __init__(self):
+            self.sent = []
+
+        async def reply_text(self, text, **kwargs):
+            self.sent.append((text, kwargs.get('reply_markup')))
+
+    message = FakeMessage()
+    lines = (f"{i}. запись номер {i}" for i in range(1000))
+    limiter = RateLimiter(global_rate=10000, private_rate=10000)
+    count = asyncio.run(stream_reply(message, lines, reply_markup="kb", limiter=limiter))
+
+    assert count == len(message.sent) > 1
+    assert all(telegram_length(text) <= 4096 for text, _ in message.sent)
+    assert [markup for _, markup in message.sent].count("kb") == 1
+    assert message.sent[-1][1] == "kb"
+    assert "\n".join(text for text, _ in message.sent).splitlines()[-1] == "999. запись номер 999"
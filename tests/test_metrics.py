@@ -0,0 +1,116 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram.ext import CommandHandler, CallbackQueryHandler
+
+from src.core.base_bot import BaseBot
+from src.core.metrics import LatencyHistogram, HandlerMetrics, callback_metric_key
+
+
+class DummyBot(BaseBot):
+    """Минимальный бот для тестов"""
+
+    def __init__(self, handlers):
+        super().__init__(name="dummy", token="1:test", config={})
+        self._handlers = handlers
+
+    def get_handlers(self):
+        return self._handlers
+
+
+def test_histogram_percentiles():
+    """Перцентили попадают в корзины наблюдений"""
+    histogram = LatencyHistogram()
+    for _ in range(90):
+        histogram.observe(0.003)
+    for _ in range(10):
+        histogram.observe(0.4)
+
+    assert histogram.count == 100
+    assert histogram.percentile(0.5) <= 0.005
+    assert 0.25 <= histogram.percentile(0.99) <= 0.4
+    assert histogram.snapshot()['max_ms'] == 400.0
+
+
+def test_histogram_merge_roundtrip():
+    """Гистограмма переживает сериализацию и объединение"""
+    first = LatencyHistogram()
+    first.observe(0.02)
+    second = LatencyHistogram.from_dict(first.to_dict())
+    second.merge(first)
+
+    assert second.count == 2
+    assert second.counts == [c * 2 for c in first.counts]
+
+
+def test_callback_metric_key():
+    """Ключ callback строится по префиксу callback_data"""
+    assert callback_metric_key("view_a1b2c3d4") == "callback:view"
+    assert callback_metric_key("faq:1") == "callback:faq"
+    assert callback_metric_key("1|admin_answer|42") == "callback:admin_answer"
+    assert callback_metric_key(None) == "callback:<empty>"
+
+
+def test_instrumented_handlers_record_calls_and_errors():
+    """Обёрнутые обработчики учитывают вызовы, ошибки и команды"""
+    async def ok(update, context):
+        return "ok"
+
+    async def broken(update, context):
+        raise RuntimeError("boom")
+
+    class FakeQuery:
+        data = "page_2"
+
+    class FakeUpdate:
+        callback_query = FakeQuery()
+
+    command = CommandHandler("list", ok)
+    callback = CallbackQueryHandler(broken)
+    bot = DummyBot([command, callback])
+    bot._instrument_handler(command)
+    bot._instrument_handler(callback)
+    # Повторная обёртка не должна удваивать учёт
+    bot._instrument_handler(command)
+
+    assert asyncio.run(command.callback(FakeUpdate(), None)) == "ok"
+    try:
+        asyncio.run(callback.callback(FakeUpdate(), None))
+    except RuntimeError:
+        pass
+
+    metrics = bot.get_metrics()
+    assert metrics['commands_processed'] == 1
+    assert metrics['handlers']['/list']['calls'] == 1
+    assert metrics['handlers']['callback:page']['errors'] == 1
+
+
+def test_handler_metrics_snapshot():
+    """Снимок содержит перцентили по каждому ключу"""
+    metrics = HandlerMetrics()
+    metrics.observe("/stats", 0.1)
+    snapshot = metrics.snapshot()
+
+    assert snapshot['/stats']['calls'] == 1
+    assert snapshot['/stats']['p95_ms'] > 0
+
+
+def test_render_openmetrics():
+    """Статус менеджера превращается в корректный текст OpenMetrics"""
+    from src.core.bot_manager import BotManager
+    from src.core.metrics_server import render_openmetrics
+
+    bot = DummyBot([])
+    bot.handler_metrics.observe("/list", 0.02)
+    manager = BotManager()
+    manager.register_bot(bot)
+
+    text = render_openmetrics(manager.get_status())
+
+    assert text.endswith("# EOF\n")
+    assert "# TYPE glasspen_handler_latency_seconds histogram" in text
+    assert 'glasspen_handler_calls_total{bot="dummy",handler="/list"} 1' in text
+    assert 'glasspen_handler_latency_seconds_bucket{bot="dummy",handler="/list",le="+Inf"} 1' in text
+    assert "glasspen_bots_running 0" in text
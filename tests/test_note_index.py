@@ -0,0 +1,102 @@
+import sys
+import os
+import json
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.models import Note
+from src.core.note_manager import NoteManager
+
+
+def _manager_with_history(tmp_path, count: int) -> NoteManager:
+    """Менеджер с count записями пользователя 1 (файл пишется напрямую)"""
+    started = datetime(2024, 1, 1)
+    notes = [
+        Note(id=f"{i:08d}-note", user_id=1, text=f"запись {i}",
+             created_at=started + timedelta(minutes=i), updated_at=started).to_dict()
+        for i in range(count)
+    ]
+    path = tmp_path / f"notes_{count}.json"
+    path.write_text(json.dumps({"1": notes}), encoding="utf-8")
+    return NoteManager(str(path))
+
+
+def test_pages_follow_index_after_mutations(tmp_path):
+    """Страницы идут от новых к старым и учитывают добавление и удаление"""
+    manager = _manager_with_history(tmp_path, 12)
+    page, total = manager.get_notes_page(1, 0, 5)
+    assert total == 12
+    assert [note.text for note in page] == [f"запись {i}" for i in (11, 10, 9, 8, 7)]
+    assert [note.text for note in manager.get_notes_page(1, 2, 5)[0]] == ["запись 1", "запись 0"]
+
+    newest = manager.add_note(Note(user_id=1, text="новая", created_at=datetime(2030, 1, 1)))
+    manager.delete_note(1, "00000000-note")
+    page, total = manager.get_notes_page(1, 0, 5)
+    assert total == 12
+    assert page[0] is newest
+    assert [note.text for note in manager.get_notes_page(1, 2, 5)[0]] == ["запись 2", "запись 1"]
+
+
+class _CountingList(list):
+    """Список, считающий прочитанные элементы (срезы и полный обход)"""
+
+    touched = 0
+
+    def __getitem__(self, item):
+        result = super().__getitem__(item)
+        _CountingList.touched += len(result) if isinstance(item, slice) else 1
+        return result
+
+    def __iter__(self):
+        _CountingList.touched += len(self)
+        return super().__iter__()
+
+
+def test_page_turn_cost_independent_of_history(tmp_path):
+    """Перелистывание страницы читает только записи страницы, сколько бы их ни было"""
+    def touched(count: int, turn) -> int:
+        manager = _manager_with_history(tmp_path, count)
+        # Индекс строится один раз при первом обращении
+        manager.get_notes_page(1, 0, 5)
+        index = manager._get_index(1)
+        # Ключи не считаем: бинарный поиск по ним - O(log n) сравнений
+        index._notes = _CountingList(index._notes)
+        _CountingList.touched = 0
+        turn(manager)
+        assert manager._get_index(1) is index
+        return _CountingList.touched
+
+    def page(manager):
+        return manager.get_notes_page(1, 7, 5)
+
+    def cursor(manager):
+        newest = manager.get_recent_notes(1, 1)[0]
+        return manager.get_notes_from_cursor(1, (newest.created_at, newest.id), 5)
+
+    # Сортировка или копирование всей истории коснулись бы всех записей
+    assert touched(50, page) == touched(50000, page) == 5
+    # Самая новая запись, страница и ещё одна - узнать, есть ли продолжение
+    assert touched(50, cursor) == touched(50000, cursor) == 1 + 6
+
+
+def test_cursor_resume_is_stable(tmp_path):
+    """Курсор переживает кодирование и не сдвигает страницу после добавления записей"""
+    from src.core.cursor import decode_cursor, encode_cursor
+
+    manager = _manager_with_history(tmp_path, 12)
+    first, more = manager.get_notes_from_cursor(1, None, 5)
+    assert more
+    token = encode_cursor(first[-1].created_at, first[-1].id)
+    assert len(token) <= 32
+    cursor = decode_cursor(token)
+    assert cursor == (first[-1].created_at, first[-1].id)
+
+    # Новая запись наверху списка не должна продублировать запись на следующей странице
+    manager.add_note(Note(user_id=1, text="новая", created_at=datetime(2030, 1, 1)))
+    second, _ = manager.get_notes_from_cursor(1, cursor, 5)
+    assert [note.text for note in second] == [f"запись {i}" for i in (6, 5, 4, 3, 2)]
+    assert manager.count_newer_notes(1, cursor) == 5
+
+    back, more_newer = manager.get_notes_from_cursor(1, (second[0].created_at, second[0].id), 5, newer=True)
+    assert [note.text for note in back] == [f"запись {i}" for i in (11, 10, 9, 8, 7)]
+    assert more_newer
@@ -0,0 +1,41 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.persistence import SQLitePersistence
+
+
+def test_state_survives_restart(tmp_path):
+    """user_data и состояние диалога восстанавливаются новым экземпляром"""
+    path = str(tmp_path / "helper.sqlite3")
+
+    async def first_run():
+        persistence = SQLitePersistence(path)
+        await persistence.update_user_data(42, {'editing_note_id': 'abc'})
+        await persistence.update_user_data(7, {'waiting_for_note': True})
+        await persistence.update_conversation("glasspen_question", (1, 42), 1)
+        await persistence.drop_user_data(7)
+        await persistence.flush()
+        persistence.close()
+
+    async def second_run():
+        persistence = SQLitePersistence(path)
+        # Пользователи не загружаются заранее
+        assert await persistence.get_user_data() == {}
+
+        user_data = {}
+        await persistence.refresh_user_data(42, user_data)
+        dropped = {}
+        await persistence.refresh_user_data(7, dropped)
+        conversations = await persistence.get_conversations("glasspen_question")
+        await persistence.flush()
+        persistence.close()
+        return user_data, dropped, conversations
+
+    asyncio.run(first_run())
+    user_data, dropped, conversations = asyncio.run(second_run())
+
+    assert user_data == {'editing_note_id': 'abc'}
+    assert dropped == {}
+    assert conversations == {(1, 42): 1}
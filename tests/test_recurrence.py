@@ -0,0 +1,59 @@
+import sys
+import os
+from datetime import datetime
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from src.core.models import Note
+from src.core.note_manager import NoteManager
+from src.core.recurrence import next_occurrence, normalize_rule
+from src.core.digest import DigestIndex
+
+
+def test_next_occurrence_rules():
+    """Повторы переносятся за текущий момент, cron учитывает день недели"""
+    previous = datetime(2024, 1, 5, 9, 0)  # пятница
+    now = datetime(2024, 1, 8, 12, 0)      # понедельник
+    assert next_occurrence("daily", previous, now) == datetime(2024, 1, 9, 9, 0)
+    assert next_occurrence("weekly", previous, now) == datetime(2024, 1, 12, 9, 0)
+    assert next_occurrence("weekdays", previous, datetime(2024, 1, 5, 10, 0)) == datetime(2024, 1, 8, 9, 0)
+
+    rule = normalize_rule("0 9 * * 1-5")
+    assert next_occurrence(rule, previous, datetime(2024, 1, 6, 8, 0)) == datetime(2024, 1, 8, 9, 0)
+    assert next_occurrence(normalize_rule("*/30 8-18 * * *"), now, now) == datetime(2024, 1, 8, 12, 30)
+    assert normalize_rule("Будни") == "weekdays"
+    with pytest.raises(ValueError):
+        normalize_rule("0 25 * * *")
+
+
+def test_cron_day_of_month_or_weekday():
+    """Заданы и день месяца, и день недели - срабатывает любой из них (как в cron)"""
+    rule = normalize_rule("0 9 13 * 5")
+    # Понедельник 1 января 2024: ближайшая пятница - 5-е, раньше 13-го
+    start = datetime(2024, 1, 1, 10, 0)
+    assert next_occurrence(rule, start, start) == datetime(2024, 1, 5, 9, 0)
+    assert next_occurrence(rule, datetime(2024, 1, 12, 10, 0), datetime(2024, 1, 12, 10, 0)) == datetime(2024, 1, 13, 9, 0)
+    # Один из дней не ограничен - обычное пересечение
+    assert next_occurrence(normalize_rule("0 9 * * 5"), start, start) == datetime(2024, 1, 5, 9, 0)
+    assert next_occurrence(normalize_rule("0 9 13 * *"), start, start) == datetime(2024, 1, 13, 9, 0)
+
+
+def test_digest_index_tracks_changes(tmp_path):
+    """Сводка строится из индексов, которые следят за изменениями записей"""
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    day = datetime(2024, 1, 2, 10, 0)
+    first = manager.add_note(Note(user_id=1, text="обычная", created_at=day))
+    index = DigestIndex(manager)
+    index.attach()
+
+    assert index.build(1, datetime(2024, 1, 4).date()) is None
+    manager.add_note(Note(user_id=1, text="вторая", created_at=day))
+    manager.update_note(1, first.id, {'is_important': True})
+
+    assert index.count_on(1, day.date()) == 2
+    text = index.build(1, datetime(2024, 1, 3).date())
+    assert "Вчера записей: *2*" in text and "обычная" in text
+
+    manager.delete_note(1, first.id)
+    assert index.important_notes(1) == ([], 0)
@@ -0,0 +1,140 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.models import Note
+from src.core.note_manager import NoteManager
+from src.core import reminders
+from src.core.reminders import ReminderScheduler
+from src.core.outbound import RateLimiter
+from src.core.timezones import utc_now
+from src.bots.helper_bot.handlers import commands
+
+
+def test_heap_follows_note_changes(tmp_path):
+    """Перенос, снятие и удаление напоминаний меняют расписание без пересканирования"""
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    now = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    first = manager.add_note(Note(user_id=1, text="a", reminder_at=now + timedelta(minutes=5)))
+    second = manager.add_note(Note(user_id=2, text="b"))
+    third = manager.add_note(Note(user_id=1, text="c", reminder_at=now + timedelta(minutes=1)))
+
+    scheduler = ReminderScheduler(manager)
+    scheduler.load()
+    assert scheduler.next_due() == now + timedelta(minutes=1)
+
+    manager.update_note(2, second.id, {'reminder_at': now + timedelta(minutes=2)})
+    manager.update_note(1, first.id, {'reminder_at': now + timedelta(minutes=3)})
+    manager.delete_note(1, third.id)
+
+    assert scheduler.pop_due(now + timedelta(minutes=2)) == [(2, second.id)]
+    assert scheduler.pop_due(now + timedelta(minutes=10)) == [(1, first.id)]
+    assert len(scheduler) == 0 and scheduler.next_due() is None
+
+
+def test_sleeper_wakes_for_earlier_reminder(tmp_path):
+    """Задача доставки просыпается к новому более раннему сроку и снимает доставленное напоминание"""
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    note = manager.add_note(Note(user_id=1, text="a", reminder_at=datetime.now() + timedelta(hours=1)))
+    scheduler = ReminderScheduler(manager)
+    delivered = []
+
+    async def deliver(user_id, notes) -> bool:
+        delivered.extend(reminder.id for reminder in notes)
+        return True
+
+    async def scenario():
+        scheduler.start(deliver)
+        await asyncio.sleep(0.01)
+        manager.update_note(1, note.id, {'reminder_at': datetime.now() + timedelta(milliseconds=50)})
+        await asyncio.sleep(0.3)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert delivered == [note.id]
+    assert manager.get_note(1, note.id).reminder_at is None
+
+
+def test_overdue_reminders_coalesce_into_digest(tmp_path):
+    """Просроченные за время простоя напоминания приходят одной сводкой на пользователя"""
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    past = datetime.now() - timedelta(hours=2)
+    for i in range(3):
+        manager.add_note(Note(user_id=1, text=f"a{i}", reminder_at=past + timedelta(minutes=i)))
+    manager.add_note(Note(user_id=2, text="b", reminder_at=past))
+    manager.add_note(Note(user_id=2, text="later", reminder_at=datetime.now() + timedelta(hours=1)))
+
+    scheduler = ReminderScheduler(manager)
+    sent = []
+
+    async def deliver(user_id, notes) -> bool:
+        sent.append((user_id, [note.text for note in notes]))
+        return True
+
+    async def scenario():
+        scheduler.start(deliver)
+        await asyncio.sleep(0.3)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert sorted(sent) == [(1, ["a0", "a1", "a2"]), (2, ["b"])]
+    assert scheduler.recovered == 4 and scheduler.digests == 1
+    assert len(scheduler) == 1
+
+
+def test_failed_delivery_is_retried_with_backoff(tmp_path, monkeypatch):
+    """Недоставленное напоминание возвращается в кучу и доставляется повторно без перезапуска"""
+    monkeypatch.setattr(reminders, "RETRY_DELAY", 0.05)
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    note = manager.add_note(Note(user_id=1, text="a", reminder_at=datetime.now() + timedelta(milliseconds=20)))
+    # Лимит на чат (раз в секунду) здесь не проверяется
+    limiter = RateLimiter(private_rate=1000)
+    scheduler = ReminderScheduler(manager, limiter=limiter, catchup_limiter=limiter)
+    attempts = []
+
+    async def deliver(user_id, notes) -> bool:
+        attempts.append(utc_now())
+        return len(attempts) >= 3
+
+    async def scenario():
+        scheduler.start(deliver)
+        await asyncio.sleep(0.5)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert len(attempts) == 3
+    # Вторая пауза вдвое длиннее первой
+    assert (attempts[2] - attempts[1]) > (attempts[1] - attempts[0]) * 1.5
+    assert manager.get_note(1, note.id).reminder_at is None
+    assert scheduler.retried == 2 and len(scheduler) == 0
+
+
+def test_set_reminder_off_applies_to_latest_note(tmp_path, monkeypatch):
+    """/set_reminder off без ID снимает напоминание последней записи, а не ищет запись "off" """
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    monkeypatch.setattr(commands, "note_manager", manager)
+    note = manager.add_note(Note(user_id=1, text="a", reminder_at=datetime.now(timezone.utc) + timedelta(hours=1)))
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=1), message=SimpleNamespace(reply_text=reply_text))
+    asyncio.run(commands.set_reminder_command(update, SimpleNamespace(args=["OFF"])))
+
+    assert manager.get_note(1, note.id).reminder_at is None
+    assert "отменено" in replies[0]
+
+
+def test_parse_reminder_time_edge_cases():
+    """Огромный сдвиг не роняет разбор, дата без года - ближайшая в будущем"""
+    now = datetime(2025, 6, 15, 12, 0)
+
+    assert commands._parse_reminder_time(["+99999999999d"], now) is None
+    assert commands._parse_reminder_time(["01.03", "10:00"], now) == datetime(2026, 3, 1, 10, 0)
+    assert commands._parse_reminder_time(["20.06", "10:00"], now) == datetime(2025, 6, 20, 10, 0)
+    assert commands._parse_reminder_time(["29.02", "10:00"], now) == datetime(2028, 2, 29, 10, 0)
+    assert commands._parse_reminder_time(["31.04", "10:00"], now) is None
@@ -0,0 +1,35 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram import Message
+
+from src.core.replies import safe_edit_message_text
+
+
+class _FakeBot:
+    """Бот, который только запоминает запросы на редактирование"""
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        self.edits.append((chat_id, message_id, text))
+        return True
+
+
+def test_safe_edit_message_text_accepts_message():
+    """Message редактируется через edit_text, повтор того же текста пропускается"""
+    bot = _FakeBot()
+    message = Message.de_json({
+        "message_id": 7, "date": 0, "text": "старый",
+        "chat": {"id": 42, "type": "private"},
+    }, bot)
+
+    async def scenario():
+        assert await safe_edit_message_text(message, "новый")
+        assert not await safe_edit_message_text(message, "новый")
+
+    asyncio.run(scenario())
+    assert bot.edits == [(42, 7, "новый")]
@@ -0,0 +1,157 @@
+import sys
+import os
+import asyncio
+import json
+import multiprocessing
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.base_bot import BaseBot
+from src.core.outbound import RateLimiter, is_rate_limited_method
+from src.core.persistence import SQLitePersistence
+from src.core.sharding import (
+    ShardedBot,
+    ShardState,
+    _move_pending,
+    shard_for_user,
+    split_state_storage,
+    split_user_storage,
+)
+from src.core.user_settings import UserSettingsManager
+
+
+def test_split_notes_storage_and_reshard(tmp_path):
+    """Пользователи раскладываются по шардам и переносятся при смене их числа"""
+    source = tmp_path / "notes.json"
+    source.write_text(json.dumps({"1": [], "2": [], "3": [], "4": []}), encoding="utf-8")
+
+    paths = split_user_storage(str(source), 2)
+    assert set(json.loads(paths[1].read_text(encoding="utf-8"))) == {"1", "3"}
+
+    paths = split_user_storage(str(source), 3)
+    users = {}
+    for index, path in enumerate(paths):
+        for user_id in json.loads(path.read_text(encoding="utf-8")):
+            users[user_id] = index
+    assert users == {str(u): shard_for_user(u, 3) for u in (1, 2, 3, 4)}
+
+
+def test_unshard_merges_back(tmp_path):
+    """При выключении шардирования изменения из шардов возвращаются в исходный файл"""
+    source = tmp_path / "notes.json"
+    source.write_text(json.dumps({"1": ["a"], "2": ["b"]}), encoding="utf-8")
+
+    paths = split_user_storage(str(source), 2)
+    paths[shard_for_user(2, 2)].write_text(json.dumps({"2": ["b", "c"]}), encoding="utf-8")
+
+    assert split_user_storage(str(source), 1) == [source]
+    assert json.loads(source.read_text(encoding="utf-8")) == {"1": ["a"], "2": ["b", "c"]}
+    assert not any(path.exists() for path in paths)
+    assert not (tmp_path / "notes.shards.json").exists()
+
+
+def test_unshard_skips_other_bots_shards(tmp_path):
+    """Бот без шардирования не объединяет шарды общего файла, разложенного другим ботом"""
+    source = tmp_path / "notes.json"
+    source.write_text(json.dumps({"1": ["a"], "2": ["b"]}), encoding="utf-8")
+    paths = split_user_storage(str(source), 2, "helper")
+    paths[0].write_text(json.dumps({"2": ["b", "c"]}), encoding="utf-8")
+
+    assert split_user_storage(str(source), 1, "glasspen") == [source]
+    assert all(path.exists() for path in paths)
+    assert json.loads(source.read_text(encoding="utf-8")) == {"1": ["a"], "2": ["b"]}
+    with pytest.raises(ValueError):
+        split_user_storage(str(source), 2, "glasspen")
+
+    split_user_storage(str(source), 1, "helper")
+    assert json.loads(source.read_text(encoding="utf-8")) == {"1": ["a"], "2": ["b", "c"]}
+
+
+def test_state_storage_follows_resharding(tmp_path):
+    """user_data пользователя переезжает в его шард при смене числа шардов и обратно"""
+    state_path = str(tmp_path / "helper.sqlite3")
+
+    async def write(path, user_id):
+        persistence = SQLitePersistence(str(path))
+        await persistence.update_user_data(user_id, {'user': user_id})
+        await persistence.update_bot_data({'shared': True})
+        await persistence.flush()
+        persistence.close()
+
+    async def read(path, user_id):
+        persistence = SQLitePersistence(str(path))
+        user_data = {}
+        await persistence.refresh_user_data(user_id, user_data)
+        bot_data = await persistence.get_bot_data()
+        persistence.close()
+        return user_data, bot_data
+
+    asyncio.run(write(state_path, 4))
+    paths = split_state_storage(state_path, 2)
+    asyncio.run(write(paths[shard_for_user(5, 2)], 5))
+
+    paths = split_state_storage(state_path, 3)
+    for user_id in (4, 5):
+        assert asyncio.run(read(paths[shard_for_user(user_id, 3)], user_id)) == ({'user': user_id}, {'shared': True})
+    assert asyncio.run(read(paths[shard_for_user(4, 3) - 1], 4))[0] == {}
+
+    assert split_state_storage(state_path, 1) == [tmp_path / "helper.sqlite3"]
+    assert asyncio.run(read(state_path, 5))[0] == {'user': 5}
+    assert not any(path.exists() for path in paths)
+
+
+def test_split_user_settings(tmp_path):
+    """Настройки пользователей попадают в шард их владельца, а не в пустой файл"""
+    source = tmp_path / "user_settings.json"
+    source.write_text(json.dumps({"1": {"digest_time": "09:00"}, "2": {"timezone": "Europe/Moscow"}}),
+                      encoding="utf-8")
+
+    paths = split_user_storage(str(source), 2)
+    shard = UserSettingsManager(str(paths[shard_for_user(1, 2)]))
+    assert shard.get(1, "digest_time") == "09:00"
+    assert shard.get(2, "timezone") is None
+    assert UserSettingsManager(str(paths[shard_for_user(2, 2)])).get(2, "timezone") == "Europe/Moscow"
+
+
+class _EchoBot(BaseBot):
+    def __init__(self, token: str, config: dict):
+        super().__init__(name="echo", token=token, config=config)
+
+    def get_handlers(self):
+        return []
+
+
+def test_route_follows_respawned_queue(tmp_path):
+    """Обновление для упавшего шарда с полной очередью уходит в очередь перезапущенного"""
+    bot = ShardedBot(_EchoBot, "1:test", {}, 2)
+    context = multiprocessing.get_context("spawn")
+    shard = ShardState(0, tmp_path / "notes.json", tmp_path / "settings.json")
+    shard.updates_queue = context.Queue(maxsize=1)
+    shard.updates_queue.put({"update_id": 1})
+
+    async def scenario():
+        task = asyncio.create_task(bot._route(shard, {"update_id": 2}))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        # То же, что делает _spawn при перезапуске шарда
+        updates_queue = context.Queue(maxsize=10)
+        _move_pending(shard.updates_queue, updates_queue)
+        shard.updates_queue = updates_queue
+        assert await asyncio.wait_for(task, 5)
+        assert await bot._route(shard, None, deadline=0)
+
+    asyncio.run(scenario())
+    assert [shard.updates_queue.get(timeout=1) for _ in range(3)] == [{"update_id": 1}, {"update_id": 2}, None]
+
+
+def test_rate_limiter_per_chat_and_global():
+    """Повторная отправка в тот же чат ждёт, другие чаты ограничены только общим лимитом"""
+    limiter = RateLimiter(global_rate=100, private_rate=1)
+
+    assert limiter.reserve_chat(1) == 0
+    assert limiter.reserve_chat(1) > 0.9
+    assert limiter.reserve_chat(2) == 0
+    assert limiter.reserve_global() == 0
+    assert 0 < limiter.reserve_global() <= 0.01
+    assert is_rate_limited_method("sendMessage")
+    assert not is_rate_limited_method("answerCallbackQuery")
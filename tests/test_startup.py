@@ -0,0 +1,72 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.models import Note
+from src.core.note_manager import NoteManager
+from src.core.question_manager import QuestionManager
+from src.core.reminders import ReminderScheduler
+from src.core.startup_profiler import StartupProfiler
+from src.core.user_settings import UserSettingsManager
+
+
+def test_storage_is_lazy(tmp_path):
+    """Создание менеджеров не трогает диск; хранилище читается при первом обращении"""
+    NoteManager(str(tmp_path / "notes" / "notes.json"))
+    QuestionManager(str(tmp_path / "questions"))
+    assert not (tmp_path / "notes").exists() and not (tmp_path / "questions").exists()
+
+    path = str(tmp_path / "notes.json")
+    NoteManager(path).add_note(Note(user_id=1, text="a"))
+    manager = NoteManager(path)
+    assert not manager.is_loaded
+    assert [note.text for note in manager.get_all_notes(1)] == ["a"]
+    assert manager.is_loaded and manager.generation == 1
+
+
+def test_user_settings_are_lazy(tmp_path):
+    """Настройки читаются при первом обращении и заново после смены файла"""
+    path = tmp_path / "settings.json"
+    path.write_text('{"1": {"timezone": "Europe/Moscow"}}', encoding="utf-8")
+
+    settings = UserSettingsManager(str(tmp_path / "missing.json"))
+    settings.use_storage(str(path))
+    assert not settings.is_loaded
+    assert settings.get(1, "timezone") == "Europe/Moscow"
+    assert settings.is_loaded
+
+
+def test_restart_reuses_reminder_heap(tmp_path):
+    """Перезапуск планировщика в том же процессе не перестраивает кучу"""
+    manager = NoteManager(str(tmp_path / "notes.json"))
+    scheduler = ReminderScheduler(manager)
+    loads = []
+    original = scheduler.load
+    scheduler.load = lambda: (loads.append(1), original())
+
+    async def deliver(user_id, notes) -> bool:
+        return True
+
+    async def scenario():
+        for _ in range(2):
+            scheduler.start(deliver)
+            await asyncio.sleep(0.05)
+            await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert loads == [1]
+
+    manager.use_storage(str(tmp_path / "other.json"))
+    asyncio.run(scenario())
+    assert loads == [1, 1]
+
+
+def test_profiler_phases():
+    """Фазы запуска попадают в отчёт с длительностью"""
+    profiler = StartupProfiler()
+    with profiler.phase("create_bots"):
+        assert not profiler.idle
+    assert profiler.idle
+    assert profiler.phases[0][0] == "create_bots" and profiler.phases[0][2] is not None
+    assert "create_bots" in profiler.report()
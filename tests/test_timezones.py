@@ -0,0 +1,52 @@
+import sys
+import os
+from datetime import date, datetime, timezone
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core import timezones
+from src.core.models import Note
+from src.core.timezones import (
+    TIMEZONE_KEY, OffsetCache, get_zone, local_date, local_day_bounds, to_local,
+)
+from src.core.user_settings import user_settings
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    """Настройки во временном файле; после теста - прежний файл и пустой кэш поясов"""
+    original = str(user_settings.storage_path)
+    monkeypatch.setattr(timezones, "_user_zones", {})
+    user_settings.use_storage(str(tmp_path / "settings.json"))
+    yield user_settings
+    user_settings.use_storage(original)
+
+
+def test_user_local_days(settings):
+    """Записи раскладываются по дням в поясе пользователя, хранение - в UTC"""
+    user_settings.set(7, TIMEZONE_KEY, "Asia/Tokyo")
+
+    note = Note(user_id=7, text="a", created_at=datetime(2024, 1, 1, 20, 0, tzinfo=timezone.utc))
+    assert note.to_dict()["created_at"] == "2024-01-01T20:00:00+00:00"
+    assert local_date(note.created_at, 7) == date(2024, 1, 2)
+    assert to_local(note.created_at, 7) == datetime(2024, 1, 2, 5, 0)
+
+    start, end = local_day_bounds(date(2024, 1, 2), 7)
+    assert start == datetime(2024, 1, 1, 15, 0, tzinfo=timezone.utc)
+    assert (end - start).total_seconds() == 24 * 3600
+
+    user_settings.set(7, TIMEZONE_KEY, "-05:00")
+    assert local_date(note.created_at, 7) == date(2024, 1, 1)
+
+
+def test_offset_cache_handles_dst():
+    """Смещение берётся из кэша, но переход на летнее время учитывается"""
+    cache = OffsetCache()
+    berlin = get_zone("Europe/Berlin")
+    winter = datetime(2024, 3, 31, 0, 30, tzinfo=timezone.utc)
+    summer = datetime(2024, 3, 31, 1, 30, tzinfo=timezone.utc)
+    assert cache.local(winter, berlin) == datetime(2024, 3, 31, 1, 30)
+    assert cache.local(summer, berlin) == datetime(2024, 3, 31, 3, 30)
+    for _ in range(100):
+        cache.local_date(summer, berlin)
+    assert cache.misses == 2 and cache.hits == 100